@@ -0,0 +1,38 @@
+"""nullable extraction_metadata.product_isin for runs without a product
+
+Revision ID: 003_nullable_meta_isin
+Revises: 002_approved_meta
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "003_nullable_meta_isin"
+down_revision: Union[str, None] = "002_approved_meta"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "extraction_metadata",
+        "product_isin",
+        existing_type=sa.String(12),
+        nullable=True,
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM extraction_metadata WHERE product_isin IS NULL")
+    op.alter_column(
+        "extraction_metadata",
+        "product_isin",
+        existing_type=sa.String(12),
+        nullable=False,
+    )
@@ -0,0 +1,59 @@
+"""durable ingestion job queue and job progress events
+
+Revision ID: 004_ingestion_jobs
+Revises: 003_nullable_meta_isin
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "004_ingestion_jobs"
+down_revision: Union[str, None] = "003_nullable_meta_isin"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_jobs",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("filename", sa.String, nullable=False),
+        sa.Column("pdf_bytes", sa.LargeBinary, nullable=True),
+        sa.Column("status", sa.String, nullable=False, index=True),
+        sa.Column("stage", sa.String, nullable=True),
+        sa.Column("progress", sa.Integer, server_default=sa.text("0"), nullable=False),
+        sa.Column("attempts", sa.Integer, server_default=sa.text("0"), nullable=False),
+        sa.Column("worker_id", sa.String, nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True, index=True),
+        sa.Column("result", postgresql.JSONB, nullable=True),
+        sa.Column("error_message", sa.Text, nullable=True),
+    )
+
+    op.create_table(
+        "ingestion_job_events",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column(
+            "job_id",
+            sa.String(32),
+            sa.ForeignKey("ingestion_jobs.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True,
+        ),
+        sa.Column("payload", postgresql.JSONB, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ingestion_job_events")
+    op.drop_table("ingestion_jobs")
@@ -0,0 +1,36 @@
+"""extraction_metadata.content_sha256 for skipping already-ingested PDFs
+
+Revision ID: 005_meta_content_hash
+Revises: 004_ingestion_jobs
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "005_meta_content_hash"
+down_revision: Union[str, None] = "004_ingestion_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "extraction_metadata",
+        sa.Column("content_sha256", sa.String(64), nullable=True),
+    )
+    op.create_index(
+        "ix_extraction_metadata_content_sha256",
+        "extraction_metadata",
+        ["content_sha256"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_extraction_metadata_content_sha256", table_name="extraction_metadata")
+    op.drop_column("extraction_metadata", "content_sha256")
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
@@ -14,14 +15,85 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     ENVIRONMENT: str = "development"
     LOG_PATH: str | None = None
+    # Directory for the JSONL span export (see core/tracing.py); unset disables it.
+    # spans.jsonl is rotated like the log file: at TRACE_MAX_BYTES it becomes
+    # spans.jsonl.1 and at most TRACE_BACKUP_COUNT old files are kept
+    TRACE_PATH: str | None = None
+    TRACE_MAX_BYTES: int = 20 * 1024 * 1024
+    TRACE_BACKUP_COUNT: int = 5
     ALLOWED_ORIGINS: str | list[str] = ["*"]
 
     BLOBSTORE_PATH: str = "./blobstore"
+    # Pipeline run checkpoints (BLOBSTORE_PATH/runs) untouched this long are
+    # deleted; validation-failed runs stay resumable until then
+    RUN_STORE_TTL_SECONDS: int = 14 * 24 * 3600
+
+    # Uploads larger than this are rejected while they stream in
+    UPLOAD_MAX_BYTES: int = 25 * 1024 * 1024
+
+    # Max concurrent interactive pipeline runs in the API process (sync and
+    # SSE; batch files have their own lane of BATCH_LLM_CONCURRENCY); further
+    # runs wait in the admission queue, interactive uploads first, and are
+    # rejected with 503 once ADMISSION_MAX_QUEUED are waiting
+    PIPELINE_MAX_WORKERS: int = 4
+    ADMISSION_MAX_QUEUED: int = 100
+
+    # Batch uploads (many PDFs or a zip): file count and total size caps, and
+    # separate limits for CPU-bound parsing (processes) and LLM calls
+    BATCH_MAX_FILES: int = 500
+    BATCH_MAX_BYTES: int = 500 * 1024 * 1024
+    BATCH_PARSE_WORKERS: int = 2
+    BATCH_LLM_CONCURRENCY: int = 4
+
+    # Revalidating the stored product book: products per chunk (DB fetch and
+    # unit of work) and validation worker processes
+    REVALIDATE_CHUNK_SIZE: int = 1000
+    REVALIDATE_WORKERS: int = 2
+
+    # Async upload jobs: "memory" runs them in the API process that serves the
+    # SSE stream; "postgres" queues them for separate worker.py processes
+    JOB_QUEUE_BACKEND: Literal["memory", "postgres"] = "memory"
+    JOB_POLL_INTERVAL_SECONDS: float = 0.5
+    # Workers bump a running job's heartbeat this often; running jobs whose
+    # worker hasn't reported for JOB_STALE_AFTER_SECONDS are reclaimed
+    JOB_HEARTBEAT_SECONDS: int = 30
+    JOB_STALE_AFTER_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    # Postgres queue limits: uploads are rejected with 503 once this many jobs
+    # are queued, and finished jobs (with their events) are deleted this long
+    # after finishing; their PDFs are dropped as soon as they finish
+    JOB_QUEUE_MAX_QUEUED: int = 1000
+    JOB_RETENTION_SECONDS: int = 24 * 3600
+    # In-memory job store limits: total bytes held, per-job TTL, and the
+    # payload size above which PDFs are spilled to a temp dir
+    JOB_STORE_MAX_BYTES: int = 512 * 1024 * 1024
+    JOB_STORE_TTL_SECONDS: int = 15 * 60
+    JOB_STORE_SPILL_BYTES: int = 4 * 1024 * 1024
+    # SSE streams: comment heartbeat when idle (keeps proxies from closing the
+    # connection), how long a disconnected in-process run waits for the client
+    # to reconnect before it is cancelled, and how long finished streams stay
+    # replayable via Last-Event-ID
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_DISCONNECT_GRACE_SECONDS: float = 30.0
+    SSE_REPLAY_TTL_SECONDS: int = 10 * 60
+
+    # Bloom filter of stored ISINs so duplicate checks skip the DB for new ones
+    # (see services/pipeline/known_isins.py for the multi-process caveat)
+    ISIN_BLOOM_FILTER: bool = False
+    ISIN_BLOOM_CAPACITY: int = 1_000_000
+    ISIN_BLOOM_ERROR_RATE: float = 0.01
+
+    # Warn about extracted values that don't occur in the source markdown
+    GROUNDING_CHECK: bool = True
 
     # LLM settings (OpenAI-compatible API)
     LLM_API_KEY: str | None = None
     LLM_MODEL: str = "gpt-4o"
     LLM_API_URL: str | None = None
+    # Optional cheaper model tried first; escalates to LLM_MODEL on failure
+    LLM_FAST_MODEL: str | None = None
+    # Cap on prompt size per agent turn; older tool outputs are compacted to fit
+    LLM_PROMPT_CHAR_BUDGET: int = 60_000
 
     class Config:
         env_file = str(_BACKEND_DIR / ".env")
@@ -41,5 +113,9 @@ class Settings(BaseSettings):
     def LOG_FILE(self) -> str | None:
         return (self.LOG_PATH + "/bluebridge.log") if self.LOG_PATH else None
 
+    @property
+    def TRACE_FILE(self) -> str | None:
+        return (self.TRACE_PATH + "/spans.jsonl") if self.TRACE_PATH else None
+
 
 settings = Settings()  # type: ignore
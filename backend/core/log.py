@@ -4,6 +4,7 @@ import sys
 from logging.handlers import RotatingFileHandler
 
 from core.config import settings
+from core.tracing import TraceIdFilter
 
 
 def setup_logging() -> None:
@@ -46,10 +47,12 @@ def setup_logging() -> None:
     stream_handler.setLevel(logging.DEBUG)
     handlers.append(stream_handler)
 
-    # Formatter
-    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # Formatter; trace_id ties log lines to the spans in TRACE_FILE
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s")
+    trace_filter = TraceIdFilter()
     for h in handlers:
         h.setFormatter(formatter)
+        h.addFilter(trace_filter)
         logger.addHandler(h)
 
     # Attach file handler to uvicorn loggers if present
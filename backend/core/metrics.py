@@ -0,0 +1,266 @@
+"""In-process metrics with no external dependency, exposed in Prometheus text format.
+
+Metrics are registered once at import time and updated on hot paths with a
+single lock-protected increment, so observing is cheap. Gauges for state that
+already lives elsewhere (job store, pools, queues) take a ``collect`` callback
+that is only run when ``/metrics`` is scraped.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import time
+from threading import Lock
+from typing import Any, Callable
+
+# Seconds; covers sub-millisecond DB work up to multi-minute LLM runs
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, math.inf,
+)
+
+# Bytes; termsheet PDFs are typically 100 KB – 5 MB
+SIZE_BUCKETS: tuple[float, ...] = (
+    10e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6, 25e6, 50e6, math.inf,
+)
+
+# Per-run counts (tool calls) and token totals
+COUNT_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, math.inf)
+TOKEN_BUCKETS: tuple[float, ...] = (
+    1e3, 5e3, 10e3, 25e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, math.inf,
+)
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict[str, Any]) -> tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple[str, ...], key: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Bucketed distribution of observed values, optionally split by labels."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        if buckets[-1] != math.inf:
+            buckets = (*buckets, math.inf)
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = Lock()
+        # label values → (per-bucket counts, [sum, count])
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * len(self.buckets), [0.0, 0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def snapshot(self) -> dict[tuple[str, ...], dict]:
+        """Per label set: cumulative bucket counts, sum and count."""
+        with self._lock:
+            out = {}
+            for key, (counts, (total, count)) in self._series.items():
+                cumulative, running = [], 0
+                for c in counts:
+                    running += c
+                    cumulative.append(running)
+                out[key] = {"buckets": list(zip(self.buckets, cumulative)), "sum": total, "count": int(count)}
+            return out
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, series in sorted(self.snapshot().items()):
+            for bound, count in series["buckets"]:
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class Counter:
+    """Monotonically increasing total, optionally split by labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in values]
+
+
+class Gauge:
+    """Current value, set directly or read from ``collect`` when scraped.
+
+    ``collect`` returns a number, or for a labelled gauge a mapping of label
+    values (a tuple in ``labelnames`` order) to numbers.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        collect: Callable[[], float | dict[tuple[str, ...], float]] | None = None,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.collect = collect
+        self._lock = Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> list[str]:
+        if self.collect is not None:
+            collected = self.collect()
+            values = collected.items() if isinstance(collected, dict) else [((), collected)]
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in sorted(values)]
+
+
+Metric = Histogram | Counter | Gauge
+
+_registry_lock = Lock()
+_registry: dict[str, Metric] = {}
+
+
+def _register(name: str, factory: Callable[[], Metric]) -> Any:
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = factory()
+        return _registry[name]
+
+
+def histogram(
+    name: str,
+    help: str,
+    labelnames: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Register (or return the already registered) histogram called ``name``."""
+    return _register(name, lambda: Histogram(name, help, labelnames, buckets))
+
+
+def counter(name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    """Register (or return the already registered) counter called ``name``."""
+    return _register(name, lambda: Counter(name, help, labelnames))
+
+
+def gauge(
+    name: str,
+    help: str,
+    labelnames: tuple[str, ...] = (),
+    collect: Callable[[], float | dict[tuple[str, ...], float]] | None = None,
+) -> Gauge:
+    """Register (or return the already registered) gauge called ``name``."""
+    return _register(name, lambda: Gauge(name, help, labelnames, collect))
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format (0.0.4)."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template (streams: until the last byte)",
+    ("method", "route", "status"),
+)
+
+
+class HttpMetricsMiddleware:
+    """Pure ASGI middleware recording ``http_request_duration_seconds``.
+
+    Labelled by the matched route's path template (not the raw path) so
+    per-job and per-ISIN URLs don't create a series each.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - t0, method=scope["method"], route=route, status=str(status)
+            )
@@ -0,0 +1,286 @@
+"""Lightweight span tracing, exported as JSONL.
+
+A trace covers one HTTP request or one pipeline run (a run started inside a
+request, e.g. a sync upload, is nested in the request's trace). Spans are
+opened for the request, the run, each pipeline stage, each agent step (an LLM
+turn or a batch of tool calls) and each tool call.
+
+Finished spans are appended to ``TRACE_FILE`` as one JSON object per line, in
+the shape of OTLP span fields (trace/span/parent ids, start and duration,
+attributes, status). The file is rotated at ``TRACE_MAX_BYTES`` keeping
+``TRACE_BACKUP_COUNT`` old files, as ``RotatingFileHandler`` does for the
+log. Without ``TRACE_PATH`` set, ids are still generated for logs and events
+but nothing is written. Render a trace with
+``python scripts/trace_view.py <trace_id>``.
+
+The current span lives in a context variable, so nested spans and log records
+pick it up. Generators (the pipeline and the agent loop are generators) must
+not hold it across a ``yield``, or it would leak into the consumer between
+events: they use ``start_span`` / ``Span.end`` and ``activate`` only around
+their synchronous steps (see ``traced_steps``).
+"""
+
+from __future__ import annotations
+
+import functools
+import glob
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Generator, Iterator, TypeVar
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Longest string kept in a span attribute (tool queries, error messages)
+MAX_ATTRIBUTE_CHARS = 200
+
+
+def _attribute(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_ATTRIBUTE_CHARS else text[: MAX_ATTRIBUTE_CHARS - 1] + "…"
+
+
+@dataclass(eq=False)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    start: float = field(default_factory=time.time)
+    duration: float | None = None
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({k: _attribute(v) for k, v in attributes.items()})
+
+    def end(self, status: str | None = None) -> None:
+        """Finish the span and export it; later calls are ignored."""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._t0
+        if status is not None:
+            self.status = status
+        _export(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def current_trace_id() -> str | None:
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+def start_span(name: str, parent: Span | None = None, **attributes: Any) -> Span:
+    """Open a span under ``parent`` (default: the current span), or a new trace.
+
+    The span isn't made current; use ``activate`` or ``span`` for that.
+    """
+    parent = parent or _current.get()
+    span = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+    )
+    span.set(**attributes)
+    return span
+
+
+@contextmanager
+def activate(span: Span) -> Iterator[Span]:
+    """Make ``span`` current for a synchronous block."""
+    token = _current.set(span)
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Open a child of the current span, current for the block; ends with status error on exceptions."""
+    opened = start_span(name, **attributes)
+    try:
+        with activate(opened):
+            yield opened
+    except BaseException as exc:
+        opened.set(error=f"{type(exc).__name__}: {exc}")
+        opened.end("error")
+        raise
+    opened.end()
+
+
+def traced(name: str, record_args: bool = False) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator running each call in a span; ``record_args`` stores keyword arguments as attributes."""
+
+    def decorate(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs) -> T:
+            with span(name, **(kwargs if record_args else {})):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def traced_steps(gen: Generator[T, None, Any], active: Span) -> Generator[T, None, Any]:
+    """Drive ``gen`` with ``active`` current during each step but not while suspended.
+
+    Returns ``gen``'s return value; closing this generator closes ``gen``.
+    """
+    try:
+        while True:
+            with activate(active):
+                try:
+                    item = next(gen)
+                except StopIteration as stop:
+                    return stop.value
+            yield item
+    finally:
+        gen.close()
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+
+_export_lock = threading.Lock()
+_export_file = None
+
+
+def _rollover(path: str) -> None:
+    """Shift ``path`` to ``path.1``, ``path.1`` to ``path.2`` and so on, dropping the oldest."""
+    backups = settings.TRACE_BACKUP_COUNT
+    if backups <= 0:
+        os.remove(path)
+        return
+    for i in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def _export(span: Span) -> None:
+    global _export_file
+    path = settings.TRACE_FILE
+    if not path:
+        return
+    line = json.dumps(span.to_dict(), default=str) + "\n"
+    try:
+        with _export_lock:
+            if _export_file is None or _export_file.name != path:
+                if _export_file is not None:
+                    _export_file.close()
+                os.makedirs(settings.TRACE_PATH, exist_ok=True)
+                _export_file = open(path, "a", encoding="utf-8")
+            size = _export_file.tell()
+            if size and size + len(line.encode("utf-8")) > settings.TRACE_MAX_BYTES:
+                _export_file.close()
+                _rollover(path)
+                _export_file = open(path, "a", encoding="utf-8")
+            _export_file.write(line)
+            _export_file.flush()
+    except OSError as exc:
+        logger.warning(f"Could not export span '{span.name}': {exc}")
+
+
+def read_spans(path: str, trace_id: str | None = None) -> list[dict[str, Any]]:
+    """Spans from a JSONL trace file and its rotated backups (oldest first), optionally only ``trace_id``'s."""
+    backups = sorted(
+        (p for p in glob.glob(f"{glob.escape(path)}.*") if p.rsplit(".", 1)[1].isdigit()),
+        key=lambda p: int(p.rsplit(".", 1)[1]),
+        reverse=True,
+    )
+    spans = []
+    for file in [*backups, path]:
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if trace_id is None or record["trace_id"] == trace_id:
+                    spans.append(record)
+    return spans
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening an ``http.request`` span per request.
+
+    The span is current while the app handles the request (so a pipeline run
+    started by it joins its trace) and its trace id is returned in the
+    ``X-Trace-Id`` response header.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_span = start_span("http.request", method=scope["method"], path=scope["path"])
+
+        async def send_with_trace_id(message) -> None:
+            if message["type"] == "http.response.start":
+                request_span.set(status=message["status"])
+                headers = [*message.get("headers", []), (b"x-trace-id", request_span.trace_id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        status = "ok"
+        try:
+            with activate(request_span):
+                await self.app(scope, receive, send_with_trace_id)
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route is not None:
+                request_span.name = f"http {scope['method']} {route}"
+            request_span.end(status)
+
+
+# ── Logging ───────────────────────────────────────────────────────────────────
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds ``trace_id`` (the current span's, or "-") to every log record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or "-"
+        return True
@@ -1,12 +1,15 @@
 import logging
 import sys
 import time
-from typing import Generator
+from contextlib import contextmanager
+from threading import Lock
+from typing import Generator, Iterator
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import Session, sessionmaker
 
 from core.config import settings
+from core.metrics import gauge, histogram
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +20,19 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Pool checkout waits above this are logged as warnings (pool pressure)
+SLOW_CHECKOUT_SECONDS = 1.0
+
+_checkout_lock = Lock()
+_checkout_count = 0
+_checkout_wait_total = 0.0
+_checkout_wait_max = 0.0
+
+POOL_CHECKOUT_WAIT = histogram(
+    "db_pool_checkout_wait_seconds", "Wait for a pool connection (incl. pre-ping) in session_scope()"
+)
+gauge("db_pool_checked_out", "Pool connections currently checked out", collect=lambda: engine.pool.checkedout())
+
 
 def test_database_connection() -> None:
     """Test database connection and exit if it fails."""
@@ -52,3 +68,50 @@ def get_db() -> Generator[Session, None, None]:
         raise
     finally:
         db.close()
+
+
+def _record_checkout_wait(wait: float) -> None:
+    global _checkout_count, _checkout_wait_total, _checkout_wait_max
+    with _checkout_lock:
+        _checkout_count += 1
+        _checkout_wait_total += wait
+        _checkout_wait_max = max(_checkout_wait_max, wait)
+    POOL_CHECKOUT_WAIT.observe(wait)
+    if wait > SLOW_CHECKOUT_SECONDS:
+        logger.warning(f"Slow DB pool checkout: waited {wait:.2f}s ({engine.pool.status()})")
+
+
+def pool_checkout_stats() -> dict:
+    """Cumulative pool checkout count and wait times for session_scope() sessions."""
+    with _checkout_lock:
+        return {
+            "checkouts": _checkout_count,
+            "wait_seconds_total": _checkout_wait_total,
+            "wait_seconds_max": _checkout_wait_max,
+            "pool_status": engine.pool.status(),
+        }
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    Short-lived session for one unit of work: commit on success, rollback on error.
+
+    Use this around the DB-touching stages of long-running work (e.g. the
+    extraction pipeline) instead of holding a request-scoped session, so pool
+    connections are only pinned while queries actually run. The connection is
+    checked out up front so the pool wait time (incl. pre-ping) can be recorded.
+    """
+
+    db = SessionLocal()
+    try:
+        t0 = time.monotonic()
+        db.connection()
+        _record_checkout_wait(time.monotonic() - t0)
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
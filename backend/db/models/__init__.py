@@ -1,7 +1,8 @@
 from db.models.base import Base
 from db.models.event import Event
 from db.models.extraction_metadata import ExtractionMetadata
+from db.models.ingestion_job import IngestionJob, IngestionJobEvent
 from db.models.product import Product
 from db.models.underlying import Underlying
 
-__all__ = ["Base", "Event", "ExtractionMetadata", "Product", "Underlying"]
+__all__ = ["Base", "Event", "ExtractionMetadata", "IngestionJob", "IngestionJobEvent", "Product", "Underlying"]
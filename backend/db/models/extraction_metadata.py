@@ -18,11 +18,12 @@ class ExtractionMetadata(Base):
     __tablename__ = "extraction_metadata"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    product_isin: Mapped[str] = mapped_column(String(12), ForeignKey("products.product_isin", ondelete="CASCADE"), nullable=False, index=True)
+    product_isin: Mapped[str | None] = mapped_column(String(12), ForeignKey("products.product_isin", ondelete="CASCADE"), nullable=True, index=True, comment="NULL for runs that ended before a product was persisted")
     source_filename: Mapped[str] = mapped_column(String, nullable=False, comment="Original PDF filename")
     extracted_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
-    status: Mapped[str] = mapped_column(String, nullable=False, comment="success | failed | pending_review")
+    status: Mapped[str] = mapped_column(String, nullable=False, comment="success | failed | pending_review | cancelled")
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True, comment="Error details if extraction failed")
     blob_path: Mapped[str | None] = mapped_column(String, nullable=True, comment="Relative path to saved markdown blob")
+    content_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True, comment="SHA-256 of the source PDF, for skipping re-uploads")
 
-    product: Mapped["Product"] = relationship("Product", back_populates="extraction_metadata")
+    product: Mapped["Product | None"] = relationship("Product", back_populates="extraction_metadata")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import datetime
+from typing import Any
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, LargeBinary, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from db.models.base import Base
+
+
+class IngestionJob(Base):
+    """A queued termsheet upload, claimed and run by an ingestion worker."""
+
+    __tablename__ = "ingestion_jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True, comment="uuid4 hex")
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    pdf_bytes: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True, deferred=True, comment="Cleared when the job finishes")
+    status: Mapped[str] = mapped_column(String, nullable=False, index=True, comment="queued | running | succeeded | validation_failed | failed")
+    stage: Mapped[str | None] = mapped_column(String, nullable=True, comment="Last pipeline stage reported by the worker")
+    progress: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    worker_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    heartbeat_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, comment="Bumped on every event; stale running jobs are reclaimed")
+    finished_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True, comment="Finished jobs are deleted JOB_RETENTION_SECONDS after this")
+    result: Mapped[dict[str, Any] | None] = mapped_column(JSONB, nullable=True, comment="Payload of the complete / validation_failed event")
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    events: Mapped[list["IngestionJobEvent"]] = relationship("IngestionJobEvent", back_populates="job", cascade="all, delete-orphan", order_by="IngestionJobEvent.id")
+
+
+class IngestionJobEvent(Base):
+    """A progress event emitted by the worker, tailed by the SSE endpoint."""
+
+    __tablename__ = "ingestion_job_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    job_id: Mapped[str] = mapped_column(String(32), ForeignKey("ingestion_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False, comment="Serialised SSE event")
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    job: Mapped["IngestionJob"] = relationship("IngestionJob", back_populates="events")
@@ -0,0 +1,199 @@
+"""Bulk ingester: runs every PDF under a directory through the extraction pipeline.
+
+Parsing runs in a process pool and LLM calls run concurrently, with the same
+limits as the batch endpoint (overridable per run). Progress is appended to a
+checkpoint file as each file finishes, so an interrupted run picks up where it
+stopped; files that failed or were cancelled are retried. A CSV report of every
+file's outcome and stage timings is written alongside.
+
+Usage (from backend/):
+
+    poetry run python ingest.py ../data/issuer-x
+    poetry run python ingest.py ../data/issuer-x --llm-concurrency 8 --report issuer-x.csv
+
+SIGTERM/SIGINT cancel the files in flight; rerun the same command to resume.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from core.config import settings
+from core.log import setup_logging
+from db.db import test_database_connection
+from schemas.batch import BatchFileStatus
+from services.pipeline import batch, known_isins
+from services.pipeline.validate import BatchIsins
+from utils.upload import BatchFile, PDF_MAGIC
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = ".ingest-checkpoint.jsonl"
+
+# Outcomes that are not retried on resume
+DONE_STATUSES = frozenset({"extracted", "already_extracted", "validation_failed", "rejected"})
+
+REPORT_COLUMNS = [
+    "path", "status", "product_isin", "run_id", "trace_id", "error", "size_bytes", "seconds", "resumed",
+    *(stage.name for stage in batch.BATCH_STAGES), "llm_slot_wait",
+]
+
+
+class Checkpoint:
+    """Append-only JSONL record of finished files, keyed by path relative to the root."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.done: dict[str, dict] = {}
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted write
+                if entry["status"] in DONE_STATUSES:
+                    self.done[entry["path"]] = entry
+                else:
+                    self.done.pop(entry["path"], None)
+        self._file = path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, rel_path: str, status: BatchFileStatus) -> dict:
+        entry = {"path": rel_path, **status.model_dump(mode="json")}
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return entry
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _report_row(entry: dict, resumed: bool) -> dict:
+    return {
+        "path": entry["path"],
+        "status": entry["status"],
+        "product_isin": entry.get("product_isin") or "",
+        "run_id": entry.get("run_id") or "",
+        "trace_id": entry.get("trace_id") or "",
+        "error": entry.get("error") or "",
+        "size_bytes": entry.get("size_bytes", 0),
+        "seconds": entry.get("seconds", 0.0),
+        "resumed": "yes" if resumed else "",
+        **entry.get("stage_seconds", {}),
+    }
+
+
+def _load(index: int, path: Path, cancel: threading.Event, isins: BatchIsins) -> BatchFileStatus:
+    contents = path.read_bytes()
+    if not contents.startswith(PDF_MAGIC):
+        file = BatchFile(path.name, error="Not a PDF")
+    else:
+        file = BatchFile(path.name, contents, hashlib.sha256(contents).hexdigest())
+    return batch.run_file(index, file, cancel, source_path=path, isins=isins)
+
+
+def ingest(
+    root: Path,
+    checkpoint_path: Path,
+    report_path: Path,
+    cancel: threading.Event,
+    pattern: str = "*.pdf",
+) -> list[BatchFileStatus]:
+    """Ingest every file matching ``pattern`` under ``root`` that the checkpoint hasn't seen.
+
+    Returns the statuses of the files processed in this run.
+    """
+    paths = sorted(p for p in root.rglob(pattern) if p.is_file())
+    checkpoint = Checkpoint(checkpoint_path)
+    pending = [p for p in paths if p.relative_to(root).as_posix() not in checkpoint.done]
+    logger.info(
+        f"Ingesting {len(pending)} of {len(paths)} files under {root} "
+        f"({len(paths) - len(pending)} already done per {checkpoint_path.name})"
+    )
+
+    results: list[BatchFileStatus] = []
+    t0 = time.perf_counter()
+    with report_path.open("w", newline="", encoding="utf-8") as report_file:
+        report = csv.DictWriter(report_file, fieldnames=REPORT_COLUMNS, restval="", extrasaction="ignore")
+        report.writeheader()
+        for entry in checkpoint.done.values():
+            report.writerow(_report_row(entry, resumed=True))
+
+        workers = settings.BATCH_PARSE_WORKERS + settings.BATCH_LLM_CONCURRENCY
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+            isins = BatchIsins()
+            futures = {
+                pool.submit(_load, index, path, cancel, isins): (index, path) for index, path in enumerate(pending)
+            }
+            try:
+                for future in as_completed(futures):
+                    index, path = futures[future]
+                    rel_path = path.relative_to(root).as_posix()
+                    try:
+                        status = future.result()
+                    except OSError as exc:
+                        status = BatchFileStatus(
+                            index=index, filename=path.name, size_bytes=0, status="failed", error=str(exc)
+                        )
+                    results.append(status)
+                    if status.status != "cancelled":
+                        report.writerow(_report_row(checkpoint.record(rel_path, status), resumed=False))
+                        report_file.flush()
+                    logger.info(f"[{len(results)}/{len(pending)}] {rel_path}: {status.status}")
+            finally:
+                if len(results) < len(futures):
+                    cancel.set()
+                checkpoint.close()
+
+    summary = batch.summarize(results, time.perf_counter() - t0)
+    logger.info(
+        f"Ingest finished: {summary.by_status} in {summary.elapsed_seconds:.1f}s "
+        f"({summary.files_per_second:.2f} files/s); report at {report_path}"
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest a directory of termsheet PDFs.")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--pattern", default="*.pdf", help="glob matched recursively (default: *.pdf)")
+    parser.add_argument("--checkpoint", type=Path, help=f"default: <directory>/{CHECKPOINT_NAME}")
+    parser.add_argument("--report", type=Path, help="CSV report path (default: <directory>/ingest-report.csv)")
+    parser.add_argument("--parse-workers", type=int, default=settings.BATCH_PARSE_WORKERS)
+    parser.add_argument("--llm-concurrency", type=int, default=settings.BATCH_LLM_CONCURRENCY)
+    args = parser.parse_args()
+
+    root = args.directory.resolve()
+    if not root.is_dir():
+        parser.error(f"{root} is not a directory")
+
+    setup_logging()
+    test_database_connection()
+    known_isins.warm_if_enabled()
+    batch.configure_limits(args.parse_workers, args.llm_concurrency)
+
+    cancel = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: cancel.set())
+
+    ingest(
+        root,
+        args.checkpoint or root / CHECKPOINT_NAME,
+        args.report or root / "ingest-report.csv",
+        cancel,
+        args.pattern,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,28 @@ from fastapi.staticfiles import StaticFiles
 
 from core.config import settings
 from core.log import setup_logging
+from core.metrics import HttpMetricsMiddleware
+from core.tracing import TracingMiddleware
 from db.db import test_database_connection
 from routes.extraction import router as extraction_router
 from routes.health import router as health_router
+from routes.metrics import router as metrics_router
 from routes.products import router as products_router
+from services import job_listener
+from services.pipeline import known_isins
 
 setup_logging()
 
 # Test database connection before initialising the app
 test_database_connection()
 
+# Lets duplicate-ISIN checks skip the DB for new ISINs (ISIN_BLOOM_FILTER)
+known_isins.warm_if_enabled()
+
+# Wake SSE streams of queued jobs as workers log events (instead of polling)
+if settings.JOB_QUEUE_BACKEND == "postgres":
+    job_listener.start()
+
 fastapp = FastAPI(debug=True)
 
 fastapp.add_middleware(
@@ -26,6 +38,8 @@ fastapp.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+fastapp.add_middleware(HttpMetricsMiddleware)
+fastapp.add_middleware(TracingMiddleware)
 
 # ── API routers ───────────────────────────────────────────────────────────────
 
@@ -33,6 +47,9 @@ fastapp.include_router(health_router, prefix="/api")
 fastapp.include_router(extraction_router, prefix="/api")
 fastapp.include_router(products_router, prefix="/api")
 
+# Scraped by Prometheus at the conventional path, outside /api
+fastapp.include_router(metrics_router)
+
 # ── Serve frontend build (must be AFTER all /api routes) ──────────────────────
 
 frontend_dist_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dist")
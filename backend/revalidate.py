@@ -0,0 +1,52 @@
+"""Revalidate the stored product book against the current validation rules.
+
+Streams one NDJSON record per product with issues (every product with --all),
+in ISIN order, followed by a summary with counts per rule and throughput.
+Products are read in chunks over a server-side cursor and validated in a
+process pool, so memory stays flat however large the book is.
+
+Usage (from backend/):
+
+    poetry run python revalidate.py
+    poetry run python revalidate.py --all --workers 4 --output book-2026.ndjson
+
+SIGTERM/SIGINT stop after the chunks in flight; the summary is still written.
+"""
+
+import argparse
+import logging
+import signal
+import threading
+from pathlib import Path
+
+from core.config import settings
+from core.log import setup_logging
+from db.db import test_database_connection
+from services.pipeline.revalidate import run_revalidation
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Revalidate every stored product.")
+    parser.add_argument("--all", action="store_true", help="emit a record for valid products too")
+    parser.add_argument("--output", type=Path, default=Path("revalidation.ndjson"), help="NDJSON output path")
+    parser.add_argument("--chunk-size", type=int, default=settings.REVALIDATE_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=settings.REVALIDATE_WORKERS)
+    args = parser.parse_args()
+
+    setup_logging()
+    test_database_connection()
+
+    cancel = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: cancel.set())
+
+    with args.output.open("w", encoding="utf-8") as out:
+        for record in run_revalidation(cancel, args.all, args.chunk_size, args.workers):
+            out.write(record.model_dump_json() + "\n")
+    logger.info(f"Revalidation report at {args.output}")
+
+
+if __name__ == "__main__":
+    main()
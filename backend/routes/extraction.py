@@ -1,70 +1,284 @@
 """Termsheet upload and extraction endpoints."""
 
+import functools
 import logging
+import threading
+import time
+from typing import AsyncGenerator, Callable, Literal
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from db.db import get_db
-from schemas.product import ExtractionResponse, JobCreatedResponse
-from services.pipeline import run_sync, stream
-from utils.job_store import create_job, pop_job
+from core.config import settings
+from db.db import get_db, session_scope
+from schemas.product import ExtractionResponse, JobCreatedResponse, JobStatusResponse
+from schemas.termsheet import TermsheetData
+from schemas.sse import SSE_HEARTBEAT, TERMINAL_STAGES, SseQueuedEvent, sse_data
+from services import job_listener, jobs
+from services.pipeline import resume_run, run_events, run_sync
+from services.pipeline.admission import AdmissionRejected, Ticket
+from services.pipeline.admission import controller as admission
+from services.pipeline.batch import run_batch
+from services.pipeline.executor import run_in_pipeline_executor, submit_to_pipeline_executor
+from utils import event_buffer, job_store
+from utils.job_store import JobStoreFull, create_job, pop_job
+from utils.streaming import cancel_on_disconnect
+from utils.upload import BATCH_UPLOAD_OPENAPI, PDF_UPLOAD_OPENAPI, receive_batch_upload, receive_pdf_upload
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/upload-termsheet", response_model=ExtractionResponse)
-async def upload_termsheet(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-):
-    """Upload a termsheet PDF — extract, validate, and persist."""
-    if file.content_type != "application/pdf":
-        raise HTTPException(status_code=400, detail="Only PDF files are accepted")
+async def _receive_pdf(request: Request) -> tuple[str, bytes, str]:
+    """Stream the uploaded PDF in (size-capped, sniffed, hashed) and return its contents."""
+    upload = await receive_pdf_upload(request)
+    try:
+        contents = await run_in_threadpool(upload.read)
+    finally:
+        upload.close()
+    logger.info(f"Received termsheet: {upload.filename} ({upload.size_bytes} bytes, sha256 {upload.sha256[:12]})")
+    return upload.filename, contents, upload.sha256
 
-    contents = await file.read()
 
-    if len(contents) == 0:
-        raise HTTPException(status_code=400, detail="Uploaded file is empty")
-
-    filename = file.filename or "termsheet.pdf"
-    logger.info(f"Received termsheet: {filename} ({len(contents)} bytes)")
-
-    return run_sync(contents, filename, db)
+def _busy(exc: AdmissionRejected) -> HTTPException:
+    logger.warning(f"Rejected extraction: {exc}")
+    return HTTPException(
+        status_code=503,
+        detail="Too many extractions queued, try again later",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
-@router.post("/upload-termsheet-async", response_model=JobCreatedResponse)
-async def upload_termsheet_async(
-    file: UploadFile = File(...),
-):
-    """Accept a PDF, store it in memory, and return a job_id immediately."""
-    if file.content_type != "application/pdf":
-        raise HTTPException(status_code=400, detail="Only PDF files are accepted")
+@router.post("/upload-termsheet", response_model=ExtractionResponse, openapi_extra=PDF_UPLOAD_OPENAPI)
+async def upload_termsheet(request: Request):
+    """Upload a termsheet PDF — extract, validate, and persist.
 
-    contents = await file.read()
+    Waits for an admission slot; 503 with Retry-After when the queue is full.
+    """
+    try:
+        admission.check_room()  # before reading the body
+        filename, contents, sha256 = await _receive_pdf(request)
+        async with admission.slot("interactive"):
+            return await run_in_pipeline_executor(run_sync, contents, filename, sha256)
+    except AdmissionRejected as exc:
+        raise _busy(exc)
 
-    if len(contents) == 0:
-        raise HTTPException(status_code=400, detail="Uploaded file is empty")
 
-    filename = file.filename or "termsheet.pdf"
-    job_id = create_job(filename, contents)
+@router.post("/upload-termsheet-async", response_model=JobCreatedResponse, openapi_extra=PDF_UPLOAD_OPENAPI)
+async def upload_termsheet_async(request: Request):
+    """Accept a PDF, queue it (in memory or in Postgres), and return a job_id immediately."""
+    if settings.JOB_QUEUE_BACKEND == "memory":
+        try:
+            admission.check_room()
+        except AdmissionRejected as exc:
+            raise _busy(exc)
+    filename, contents, sha256 = await _receive_pdf(request)
+    try:
+        if settings.JOB_QUEUE_BACKEND == "postgres":
+            job_id = await run_in_threadpool(_enqueue, filename, contents)
+        else:
+            job_id = create_job(filename, contents, sha256)
+    except (JobStoreFull, jobs.JobQueueFull) as exc:
+        logger.warning(f"Rejected async upload {filename}: {exc}")
+        raise HTTPException(status_code=503, detail="Too many pending uploads, try again later")
     logger.info(f"Created async job {job_id} for {filename} ({len(contents)} bytes)")
 
     return JobCreatedResponse(job_id=job_id, filename=filename, size_bytes=len(contents))
 
 
-@router.get("/extraction-stream/{job_id}")
-def extraction_stream(job_id: str, db: Session = Depends(get_db)):
-    """SSE endpoint that runs the extraction pipeline and streams progress."""
+@router.post("/upload-termsheets-batch", openapi_extra=BATCH_UPLOAD_OPENAPI)
+async def upload_termsheets_batch(request: Request, format: Literal["ndjson", "sse"] = "ndjson"):
+    """Upload many PDFs (and/or zips of PDFs) and stream each file's status as it finishes.
+
+    Files run through the same pipeline as single uploads, with parsing and
+    LLM calls under separate concurrency limits. The last record is a summary
+    with counts per status and throughput. Disconnecting cancels the files
+    that haven't finished.
+    """
+    files = await receive_batch_upload(request)
+    logger.info(f"Received batch of {len(files)} files")
+    cancel = threading.Event()
+    if format == "sse":
+        records = (sse_data(record.model_dump(mode="json")) for record in run_batch(files, cancel))
+        media_type = "text/event-stream"
+    else:
+        records = (record.model_dump_json() + "\n" for record in run_batch(files, cancel))
+        media_type = "application/x-ndjson"
+    return StreamingResponse(cancel_on_disconnect(records, cancel), media_type=media_type)
+
+
+@router.post("/runs/{run_id}/resume", response_model=ExtractionResponse)
+def resume_extraction(run_id: str, corrected: TermsheetData):
+    """Validate and persist corrected data for a validation-failed run, without re-running the LLM."""
+    return resume_run(run_id, corrected)
+
+
+@router.get("/job-store/stats")
+def get_job_store_stats():
+    """Counts and bytes held by the in-memory job store."""
+    return job_store.stats()
+
+
+def _enqueue(filename: str, contents: bytes) -> str:
+    with session_scope() as db:
+        return jobs.enqueue(filename, contents, db, settings.JOB_QUEUE_MAX_QUEUED)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def get_job_status(job_id: str, db: Session = Depends(get_db)):
+    """Status and progress of a queued job (JOB_QUEUE_BACKEND=postgres)."""
+    return jobs.get_status(job_id, db)
+
+
+@router.get("/jobs/{job_id}/result", response_model=ExtractionResponse)
+def get_job_result(job_id: str, db: Session = Depends(get_db)):
+    """Result of a finished job; 409 while it is still queued or running."""
+    return jobs.get_result(job_id, db)
+
+
+def _job_events_after(job_id: str, after_id: int) -> tuple[list[tuple[int, dict]], str | None]:
+    with session_scope() as db:
+        return jobs.events_after(job_id, after_id, db), jobs.status_of(job_id, db)
+
+
+def _job_status(job_id: str) -> str | None:
+    with session_scope() as db:
+        return jobs.status_of(job_id, db)
+
+
+def _read_job_events(job_id: str, after_id: int) -> tuple[list[tuple[int, dict]], bool]:
+    """A queued job's events after ``after_id`` and whether the job has finished."""
+    events, status = _job_events_after(job_id, after_id)
+    return events, status is None or status in jobs.TERMINAL_JOB_STATUSES
+
+
+def _read_buffered_events(job_id: str, after_id: int) -> tuple[list[tuple[int, dict]], bool]:
+    """An in-process job's buffered events after ``after_id``; an expired buffer counts as finished."""
+    return event_buffer.events_after(job_id, after_id) or ([], True)
+
+
+async def _relay_events(
+    job_id: str,
+    last_event_id: int,
+    read: Callable[[str, int], tuple[list[tuple[int, dict]], bool]],
+    poll_seconds: float,
+) -> AsyncGenerator[str, None]:
+    """Relay a job's events with ids, starting after ``last_event_id``, until a terminal event.
+
+    Wakes when the job's events are notified and re-reads at least every
+    ``poll_seconds``; sends a heartbeat comment after ``SSE_HEARTBEAT_SECONDS``
+    without data so idle proxies keep the connection open.
+    """
+    subscription = event_buffer.subscribe(job_id)
+    last_id = last_event_id
+    last_sent = time.monotonic()
+    try:
+        while True:
+            subscription.clear()
+            events, finished = await run_in_threadpool(read, job_id, last_id)
+            for last_id, payload in events:
+                yield sse_data(payload, event_id=last_id)
+                if payload.get("stage") in TERMINAL_STAGES:
+                    return
+            if events:
+                last_sent = time.monotonic()
+            elif finished:
+                return
+            await subscription.wait(min(poll_seconds, settings.SSE_HEARTBEAT_SECONDS))
+            if time.monotonic() - last_sent >= settings.SSE_HEARTBEAT_SECONDS:
+                yield SSE_HEARTBEAT
+                last_sent = time.monotonic()
+    finally:
+        subscription.close()
+
+
+async def _relay_buffered(job_id: str, last_event_id: int) -> AsyncGenerator[str, None]:
+    """Relay an in-process job; a client leaving for good cancels the run after a grace period."""
+    event_buffer.attach(job_id)
+    try:
+        async for chunk in _relay_events(job_id, last_event_id, _read_buffered_events, settings.SSE_HEARTBEAT_SECONDS):
+            yield chunk
+    finally:
+        event_buffer.detach(job_id)
+
+
+def _run_buffered(
+    job_id: str, filename: str, contents: bytes, sha256: str | None, cancel: threading.Event, ticket: Ticket
+) -> None:
+    """Run an admitted in-process job, buffering its events for (re)connecting streams."""
+    try:
+        for event in run_events(contents, filename, cancel, sha256):
+            event_buffer.append(job_id, event.model_dump(mode="json"))
+    except Exception as exc:
+        logger.exception(f"Buffered job {job_id} crashed: {exc}")
+    finally:
+        admission.release(ticket)
+        event_buffer.finish(job_id)
+
+
+def _start_buffered(job_id: str, cancel: threading.Event) -> bool:
+    """Queue an in-process job for admission; its stream reports the queue position meanwhile.
+
+    Returns False if the job is not in the store (unknown, expired or already started).
+    """
     job = pop_job(job_id)
     if job is None:
-        raise HTTPException(status_code=404, detail="Job not found or already consumed")
+        return False
+    filename, contents, sha256 = job
 
-    filename, contents = job
-    return StreamingResponse(
-        stream(contents, filename, db),
-        media_type="text/event-stream",
+    def on_update(position: int, estimated_wait_seconds: float | None) -> None:
+        event = SseQueuedEvent(position=position, estimated_wait_seconds=estimated_wait_seconds)
+        event_buffer.append(job_id, event.model_dump(mode="json"))
+
+    admission.submit(
+        "interactive",
+        on_granted=lambda ticket: submit_to_pipeline_executor(
+            _run_buffered, job_id, filename, contents, sha256, cancel, ticket
+        ),
+        on_update=on_update,
+        reject_when_full=False,  # the job is already accepted; room was checked on upload
     )
+    return True
+
+
+def _last_event_id(request: Request) -> int:
+    value = request.headers.get("last-event-id", "")
+    return int(value) if value.isdigit() else 0
+
+
+@router.get("/extraction-stream/{job_id}")
+async def extraction_stream(job_id: str, request: Request):
+    """SSE endpoint that streams extraction progress for an async upload.
+
+    Events carry ids; a client reconnecting with ``Last-Event-ID`` gets the
+    events after that id replayed, then the live stream.
+
+    With the Postgres job queue, a worker runs the pipeline and this endpoint
+    tails the job's events, so any API process can serve any job. With the
+    in-memory store, the first connection queues the run for admission in this
+    process (reporting ``queued`` events with its position and estimated wait)
+    and its events are buffered for reconnects; the run is cancelled only if
+    no client comes back within ``SSE_DISCONNECT_GRACE_SECONDS``.
+
+    No request-scoped DB session: the pipeline opens short sessions for the
+    validate and persist stages only, so a slow LLM call doesn't pin a pool
+    connection for the lifetime of the stream.
+    """
+    last_event_id = _last_event_id(request)
+    if settings.JOB_QUEUE_BACKEND == "postgres":
+        if await run_in_threadpool(_job_status, job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        poll_seconds = settings.SSE_HEARTBEAT_SECONDS if job_listener.is_connected() else settings.JOB_POLL_INTERVAL_SECONDS
+        return StreamingResponse(
+            _relay_events(job_id, last_event_id, _read_job_events, poll_seconds),
+            media_type="text/event-stream",
+        )
+
+    # opening the buffer and starting the run is one step, so concurrent
+    # first connections start the job once and all find its stream
+    if not event_buffer.get_or_open(job_id, functools.partial(_start_buffered, job_id)):
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return StreamingResponse(_relay_buffered(job_id, last_event_id), media_type="text/event-stream")
@@ -5,6 +5,10 @@ from pathlib import Path
 
 from fastapi import APIRouter
 
+from db.db import pool_checkout_stats
+from services.pipeline import known_isins
+from services.pipeline.admission import controller as admission
+
 router = APIRouter()
 
 
@@ -24,5 +28,10 @@ async def get_version():
 
 @router.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {"status": "ok"}
+    """Health check endpoint, with DB pool checkout wait, admission queue and ISIN filter stats."""
+    return {
+        "status": "ok",
+        "db_pool": pool_checkout_stats(),
+        "admission": admission.stats(),
+        "isin_filter": known_isins.stats(),
+    }
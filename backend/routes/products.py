@@ -1,11 +1,16 @@
 """Product query and approval endpoints."""
 
+import threading
+
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from db.db import get_db
 from schemas.product import ProductDetail, ProductSummary
 from services import products
+from services.pipeline.revalidate import run_revalidation
+from utils.streaming import cancel_on_disconnect
 
 router = APIRouter()
 
@@ -22,6 +27,18 @@ def list_products(db: Session = Depends(get_db)):
     return products.list_all(db)
 
 
+@router.post("/products/revalidate")
+def revalidate_products(include_valid: bool = False):
+    """Re-run the validation rules over every stored product, streamed as NDJSON.
+
+    One record per product with issues (every product with ``include_valid``),
+    in ISIN order, then a summary. Disconnecting stops the run.
+    """
+    cancel = threading.Event()
+    records = (record.model_dump_json() + "\n" for record in run_revalidation(cancel, include_valid))
+    return StreamingResponse(cancel_on_disconnect(records, cancel), media_type="application/x-ndjson")
+
+
 @router.get("/products/{product_isin}", response_model=ProductDetail)
 def get_product(product_isin: str, db: Session = Depends(get_db)):
     """Get full details for a given extracted termsheet."""
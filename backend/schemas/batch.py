@@ -0,0 +1,35 @@
+"""NDJSON / SSE records streamed by the batch upload endpoint."""
+
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class BatchFileStatus(BaseModel):
+    """Outcome of one file in a batch, emitted as soon as it finishes."""
+
+    type: Literal["file"] = "file"
+    index: int  # position in the upload (zip entries in archive order)
+    filename: str
+    size_bytes: int
+    # extracted | already_extracted | validation_failed | failed | rejected | cancelled
+    status: str
+    product_isin: str | None = None
+    run_id: str | None = None  # resumable via /runs/{run_id}/resume when validation failed
+    trace_id: str | None = None  # spans of the run in TRACE_FILE
+    issues: list[str] = []
+    error: str | None = None
+    seconds: float = 0.0
+    stage_seconds: dict[str, float] = {}
+
+
+class BatchSummary(BaseModel):
+    """Aggregate emitted after the last file."""
+
+    type: Literal["summary"] = "summary"
+    files: int
+    by_status: dict[str, int]
+    elapsed_seconds: float
+    files_per_second: float
+    megabytes_per_second: float
+    stage_seconds: dict[str, float]  # summed over files
@@ -1,6 +1,6 @@
 """Pydantic response schemas for product endpoints."""
 
-from datetime import date
+from datetime import date, datetime
 from typing import Any
 
 from pydantic import BaseModel
@@ -82,6 +82,8 @@ class ExtractionResponse(BaseModel):
     approved: bool
     data: dict[str, Any]
     validation: ValidationResultOut
+    run_id: str | None = None  # set when the run was checkpointed and can be resumed
+    trace_id: str | None = None  # spans of the run in TRACE_FILE
 
 
 class JobCreatedResponse(BaseModel):
@@ -90,3 +92,18 @@ class JobCreatedResponse(BaseModel):
     job_id: str
     filename: str
     size_bytes: int
+
+
+class JobStatusResponse(BaseModel):
+    """Status of a queued ingestion job (Postgres job queue)."""
+
+    job_id: str
+    filename: str
+    status: str
+    stage: str | None
+    progress: int
+    attempts: int
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+    error_message: str | None
@@ -0,0 +1,27 @@
+"""NDJSON records streamed by product book revalidation."""
+
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+
+class RevalidationRecord(BaseModel):
+    """A stored product's result under the current rules."""
+
+    type: Literal["product"] = "product"
+    product_isin: str
+    is_valid: bool
+    issues: list[dict[str, Any]] = []  # ValidationResult.to_dict() issues
+
+
+class RevalidationSummary(BaseModel):
+    """Aggregate emitted after the last product."""
+
+    type: Literal["summary"] = "summary"
+    products: int
+    invalid: int
+    with_warnings: int
+    by_rule: dict[str, int]  # issues per rule
+    elapsed_seconds: float
+    products_per_second: float
+    cancelled: bool = False
@@ -11,23 +11,74 @@ class SseProgressEvent(BaseModel):
     progress: int
 
 
+class SseQueuedEvent(BaseModel):
+    """Waiting for a pipeline slot; sent whenever the run's place in the queue changes."""
+
+    stage: Literal["queued"] = "queued"
+    progress: Literal[0] = 0
+    position: int
+    estimated_wait_seconds: float | None = None
+
+
+class SseAgentProgressEvent(BaseModel):
+    """A tool call or phase transition during the ``llm_extraction`` stage."""
+
+    stage: Literal["llm_extraction"] = "llm_extraction"
+    progress: int
+    kind: Literal["tool_call", "phase"]
+    phase: str
+    tool: str | None = None
+    query: str | None = None
+
+
 class SseCompleteEvent(BaseModel):
     stage: Literal["complete"] = "complete"
     progress: Literal[100] = 100
     data: dict[str, Any]
+    trace_id: str | None = None
 
 
 class SseValidationFailedEvent(BaseModel):
     stage: Literal["validation_failed"] = "validation_failed"
     progress: Literal[100] = 100
     data: dict[str, Any]
+    trace_id: str | None = None
 
 
 class SseErrorEvent(BaseModel):
     stage: Literal["error"] = "error"
     message: str
+    trace_id: str | None = None
+
+
+SseEvent = (
+    SseProgressEvent
+    | SseQueuedEvent
+    | SseAgentProgressEvent
+    | SseCompleteEvent
+    | SseValidationFailedEvent
+    | SseErrorEvent
+)
+
+# Stages that end a pipeline run; nothing is emitted after them. Their events
+# carry the run's trace id (see core/tracing.py)
+TERMINAL_STAGES = ("complete", "validation_failed", "error")
+
+
+# Comment line sent on idle streams; clients ignore it
+SSE_HEARTBEAT = ": keepalive\n\n"
+
+
+def sse_data(payload: dict[str, Any], event_id: int | None = None) -> str:
+    """Serialise an already-dumped event payload to SSE ``data:`` format.
+
+    With ``event_id`` the event carries an ``id:`` line, which the client
+    sends back as ``Last-Event-ID`` when it reconnects.
+    """
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}data: {json.dumps(payload)}\n\n"
 
 
 def sse_event(model: BaseModel) -> str:
     """Serialise a Pydantic model instance to SSE ``data:`` format."""
-    return f"data: {json.dumps(model.model_dump(mode='json'))}\n\n"
+    return sse_data(model.model_dump(mode="json"))
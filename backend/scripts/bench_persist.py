@@ -0,0 +1,128 @@
+"""Benchmark persisting a product: per-row ORM adds vs bulk Core inserts.
+
+Persists a synthetic product with 30, 500 and 5000 events (by default) through
+the previous path (one ORM object and unit-of-work entry per row) and the
+current ``persist_extraction``, each inside a transaction that is rolled back,
+and prints the median time and the number of statements sent to the
+database. Requires a reachable DATABASE_URL with the schema migrated.
+
+Usage (from backend/):
+    python scripts/bench_persist.py [--events 30 500 5000] [--repeat 5]
+"""
+
+import argparse
+import datetime
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event as sa_event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from db.db import engine  # noqa: E402
+from db.models.event import Event  # noqa: E402
+from db.models.extraction_metadata import ExtractionMetadata  # noqa: E402
+from db.models.product import Product  # noqa: E402
+from db.models.underlying import Underlying  # noqa: E402
+from schemas import termsheet  # noqa: E402
+from services.pipeline.persist import persist_extraction  # noqa: E402
+
+BENCH_ISIN = "XS0000000017"
+
+
+def synthetic_termsheet(events: int) -> termsheet.TermsheetData:
+    start = datetime.date(2026, 2, 2)
+    return termsheet.TermsheetData(
+        product=termsheet.Product(
+            product_isin=BENCH_ISIN, short_description="Benchmark", issuer="Bench",
+            issue_date=start, currency="GBP", maturity=start + datetime.timedelta(days=events + 10),
+        ),
+        underlyings=[
+            termsheet.Underlying(bbg_code="UKX Index", initial_price=10148.85),
+            termsheet.Underlying(bbg_code="SX5E Index", initial_price=5957.8),
+        ],
+        events=[
+            termsheet.Event(
+                event_type="knock_in", event_level_pct=60.0,
+                event_date=start + datetime.timedelta(days=k), event_payment_date=start + datetime.timedelta(days=k + 7),
+            )
+            for k in range(events)
+        ],
+    )
+
+
+def persist_orm(data: termsheet.TermsheetData, db: Session) -> None:
+    """The previous path: every child row added to the session and flushed by the ORM."""
+    p = data.product
+    db.add(Product(
+        product_isin=p.product_isin, sedol=p.sedol, short_description=p.short_description, issuer=p.issuer,
+        issue_date=p.issue_date, currency=p.currency, maturity=p.maturity, product_type=p.product_type,
+        word_description=p.word_description, approved=False,
+    ))
+    for u in data.underlyings:
+        db.add(Underlying(product_isin=p.product_isin, bbg_code=u.bbg_code, weight=u.weight, initial_price=u.initial_price))
+    for e in data.events:
+        db.add(Event(
+            product_isin=p.product_isin, event_type=e.event_type, event_level_pct=e.event_level_pct,
+            event_strike_pct=e.event_strike_pct, event_date=e.event_date, event_amount=e.event_amount,
+            event_payment_date=e.event_payment_date,
+        ))
+    db.add(ExtractionMetadata(
+        product_isin=p.product_isin, source_filename="bench.pdf",
+        extracted_at=datetime.datetime.now(datetime.timezone.utc), status="success", blob_path="bench.md",
+    ))
+    db.flush()
+
+
+def persist_bulk(data: termsheet.TermsheetData, db: Session) -> None:
+    persist_extraction(data, "bench.pdf", "bench.md", "success", db)
+
+
+def measure(persist, data: termsheet.TermsheetData, repeat: int) -> tuple[float, int]:
+    """Median seconds and statements per persist, each run rolled back."""
+    statements = 0
+
+    def count(*_args) -> None:
+        nonlocal statements
+        statements += 1
+
+    timings = []
+    sa_event.listen(engine, "before_cursor_execute", count)
+    try:
+        for _ in range(repeat):
+            statements = 0
+            with engine.connect() as connection:
+                transaction = connection.begin()
+                db = Session(bind=connection)
+                t0 = time.perf_counter()
+                persist(data, db)
+                timings.append(time.perf_counter() - t0)
+                db.close()
+                transaction.rollback()
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", count)
+    return statistics.median(timings), statements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[30, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'events':>6}  {'orm':>9}  {'stmts':>5}  {'bulk':>9}  {'stmts':>5}  {'speedup':>7}")
+    for events in args.events:
+        data = synthetic_termsheet(events)
+        orm_seconds, orm_statements = measure(persist_orm, data, args.repeat)
+        bulk_seconds, bulk_statements = measure(persist_bulk, data, args.repeat)
+        print(
+            f"{events:>6}  {orm_seconds * 1000:>7.1f}ms  {orm_statements:>5}  "
+            f"{bulk_seconds * 1000:>7.1f}ms  {bulk_statements:>5}  {orm_seconds / bulk_seconds:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measure turn-by-turn agent prompt sizes, before and after compaction.
+
+Runs the extraction agent on each sample PDF and prints the prompt size of
+every model call with and without tool-output compaction. Requires LLM_API_KEY.
+
+Usage (from backend/):
+    python scripts/measure_prompt_sizes.py [../data/*.pdf ...]
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.llm import agent  # noqa: E402
+from services.llm.compaction import ToolOutputCompactionMiddleware  # noqa: E402
+from services.pipeline.parse import extract_markdown_from_path  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+
+
+class _RecordingCompaction(ToolOutputCompactionMiddleware):
+    instances: list["_RecordingCompaction"] = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.instances.append(self)
+
+
+def main(paths: list[Path]) -> None:
+    agent.ToolOutputCompactionMiddleware = _RecordingCompaction
+    for path in paths:
+        markdown = extract_markdown_from_path(path)
+        agent.extract_termsheet_data(markdown)
+        sizes = _RecordingCompaction.instances[-1].turn_sizes
+        print(f"\n{path.name}: {len(sizes)} turns")
+        print(f"{'turn':>4}  {'before':>8}  {'after':>8}  {'saved':>6}")
+        for turn, (before, after) in enumerate(sizes, start=1):
+            print(f"{turn:>4}  {before:>8}  {after:>8}  {1 - after / before:>6.0%}")
+        total_before = sum(b for b, _ in sizes)
+        total_after = sum(a for _, a in sizes)
+        print(f"total {total_before:>8}  {total_after:>8}  {1 - total_after / total_before:>6.0%}")
+
+
+if __name__ == "__main__":
+    args = [Path(p) for p in sys.argv[1:]] or sorted(DATA_DIR.glob("*Termsheet*.pdf"))
+    main(args)
@@ -0,0 +1,99 @@
+"""Render a trace from the JSONL span export as a text waterfall.
+
+Each span is one row: its name indented under its parent, its start offset and
+duration, and a bar placed on the trace's timeline. Failed and cancelled spans
+are marked. Without a trace id, lists the most recent traces instead.
+
+Usage (from backend/):
+    python scripts/trace_view.py [trace_id] [--file traces/spans.jsonl] [--width 60]
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import settings  # noqa: E402
+from core.tracing import read_spans  # noqa: E402
+
+NAME_WIDTH = 44
+_STATUS_MARKS = {"ok": " ", "error": "✗", "cancelled": "–"}
+
+
+def _label(span: dict) -> str:
+    attributes = span["attributes"]
+    detail = attributes.get("filename") or attributes.get("query") or attributes.get("heading") or ""
+    if "input_tokens" in attributes:
+        detail = f"{attributes['input_tokens']}→{attributes.get('output_tokens', 0)} tok"
+    return f"{span['name']} {detail}".rstrip()
+
+
+def waterfall(spans: list[dict], width: int = 60) -> list[str]:
+    """Rows of the waterfall for the spans of one trace, parents before children."""
+    if not spans:
+        return []
+    ids = {span["span_id"] for span in spans}
+    children: dict[str | None, list[dict]] = defaultdict(list)
+    for span in spans:
+        # spans whose parent wasn't exported (e.g. a still-open request) are shown as roots
+        parent = span["parent_id"] if span["parent_id"] in ids else None
+        children[parent].append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda s: s["start"])
+
+    t0 = min(span["start"] for span in spans)
+    total = max(span["start"] + span["duration"] - t0 for span in spans) or 1e-9
+    rows = []
+
+    def visit(span: dict, depth: int) -> None:
+        offset = span["start"] - t0
+        first = min(width - 1, int(offset / total * width))
+        length = max(1, round(span["duration"] / total * width))
+        bar = " " * first + "█" * min(length, width - first)
+        name = ("  " * depth + _label(span))[:NAME_WIDTH]
+        mark = _STATUS_MARKS.get(span["status"], "?")
+        rows.append(
+            f"{mark} {name:<{NAME_WIDTH}} {offset:>8.2f}s {span['duration']:>8.2f}s │{bar:<{width}}│"
+        )
+        for child in children[span["span_id"]]:
+            visit(child, depth + 1)
+
+    for root in children[None]:
+        visit(root, 0)
+    return rows
+
+
+def _recent_traces(spans: list[dict], limit: int) -> list[str]:
+    roots = [s for s in spans if s["parent_id"] is None]
+    roots.sort(key=lambda s: s["start"], reverse=True)
+    return [
+        f"{s['trace_id']}  {s['duration']:>8.2f}s  {_STATUS_MARKS.get(s['status'], '?')} {_label(s)}"
+        for s in roots[:limit]
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace_id", nargs="?", help="trace to render; omit to list recent traces")
+    parser.add_argument("--file", default=settings.TRACE_FILE, help="span export (default: TRACE_FILE)")
+    parser.add_argument("--width", type=int, default=60, help="timeline width in characters")
+    parser.add_argument("--limit", type=int, default=20, help="traces to list without a trace id")
+    args = parser.parse_args()
+
+    if not args.file or not Path(args.file).exists():
+        sys.exit(f"No span export found at {args.file!r}; set TRACE_PATH or pass --file")
+    if args.trace_id is None:
+        print("\n".join(_recent_traces(read_spans(args.file), args.limit)))
+        return
+
+    spans = read_spans(args.file, args.trace_id)
+    if not spans:
+        sys.exit(f"No spans for trace {args.trace_id}")
+    print(f"trace {args.trace_id} ({len(spans)} spans)")
+    print("\n".join(waterfall(spans, args.width)))
+
+
+if __name__ == "__main__":
+    main()
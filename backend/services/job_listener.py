@@ -0,0 +1,72 @@
+"""LISTEN for job events so SSE streams wake as soon as a worker logs one.
+
+One background thread per API process holds a dedicated connection (outside
+the pool) listening on ``jobs.EVENTS_CHANNEL`` and wakes the streams of the
+notified job. Streams still poll the events table as a fallback, slowly while
+the listener is connected and every ``JOB_POLL_INTERVAL_SECONDS`` otherwise,
+so a dropped connection only costs latency.
+"""
+
+import logging
+import select
+import threading
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from core.config import settings
+from services.jobs import EVENTS_CHANNEL
+from utils import event_buffer
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_SECONDS = 5.0
+
+_connected = threading.Event()
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+
+
+def is_connected() -> bool:
+    return _connected.is_set()
+
+
+def _listen_once() -> None:
+    conn = psycopg2.connect(settings.DATABASE_URL)
+    try:
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {EVENTS_CHANNEL}")
+        _connected.set()
+        logger.info(f"Listening for job events on '{EVENTS_CHANNEL}'")
+        while not _stop.is_set():
+            if select.select([conn], [], [], 1.0) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                event_buffer.notify(conn.notifies.pop(0).payload)
+    finally:
+        _connected.clear()
+        conn.close()
+
+
+def _run() -> None:
+    while not _stop.is_set():
+        try:
+            _listen_once()
+        except psycopg2.Error as exc:
+            logger.warning(f"Job event listener disconnected ({exc}); polling until it reconnects")
+            _stop.wait(RECONNECT_SECONDS)
+
+
+def start() -> None:
+    """Start the listener thread (idempotent)."""
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_run, name="job-event-listener", daemon=True)
+        _thread.start()
+
+
+def stop() -> None:
+    _stop.set()
@@ -0,0 +1,260 @@
+"""Durable ingestion job queue (Postgres) for the async upload → worker → SSE flow.
+
+The API enqueues uploads into ``ingestion_jobs``; ``worker.py`` processes claim
+them with ``SELECT ... FOR UPDATE SKIP LOCKED`` so any number of workers can
+poll the same table without handing a job out twice. Every pipeline event is
+appended to ``ingestion_job_events``, which the SSE endpoint tails, so the
+API process serving the stream need not be the one that ran the job. Each
+event is also announced with ``NOTIFY`` so streams wake without polling
+(``services.job_listener``).
+
+A worker owns a job while it holds the claim: it bumps ``heartbeat_at``
+while the job runs, and every write it makes is fenced on
+``worker_id``, so once a stale job has been reclaimed by another worker
+the old one's writes match no row and raise ``JobLost``.
+
+A job's PDF is dropped as soon as it finishes; the job and its events are
+deleted ``JOB_RETENTION_SECONDS`` later by ``sweep_finished``, which workers
+call from their poll loop. ``enqueue`` refuses new jobs with ``JobQueueFull``
+once the queue holds its limit (``JOB_QUEUE_MAX_QUEUED`` in the API).
+"""
+
+import datetime
+import logging
+import uuid
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from db.models.ingestion_job import IngestionJob, IngestionJobEvent
+from schemas.product import ExtractionResponse, JobStatusResponse
+from schemas.sse import SseErrorEvent, SseEvent
+
+logger = logging.getLogger(__name__)
+
+# Terminal SSE stage → final job status
+_TERMINAL_STATUS = {
+    "complete": "succeeded",
+    "validation_failed": "validation_failed",
+    "error": "failed",
+}
+TERMINAL_JOB_STATUSES = frozenset(_TERMINAL_STATUS.values())
+
+# NOTIFY channel carrying the job id whenever a job logs an event
+EVENTS_CHANNEL = "ingestion_job_events"
+
+
+class JobLost(Exception):
+    """The job is no longer this worker's: it was reclaimed or has already finished."""
+
+    def __init__(self, job_id: str, worker_id: str) -> None:
+        super().__init__(f"Job {job_id} is no longer held by worker {worker_id}")
+        self.job_id = job_id
+        self.worker_id = worker_id
+
+
+class JobQueueFull(Exception):
+    """Raised when enqueueing would exceed the queued-job limit."""
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _update_held(job_id: str, worker_id: str, db: Session, **values: Any) -> None:
+    """Update a running job only while ``worker_id`` holds it.
+
+    Raises:
+        JobLost: no row matched (the job was reclaimed or is finished).
+    """
+    result = db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id, IngestionJob.worker_id == worker_id, IngestionJob.status == "running")
+        .values(**values)
+    )
+    if result.rowcount == 0:
+        raise JobLost(job_id, worker_id)
+
+
+def _log_event(job_id: str, payload: dict[str, Any], now: datetime.datetime, db: Session) -> None:
+    db.add(IngestionJobEvent(job_id=job_id, payload=payload, created_at=now))
+    db.flush()
+    # delivered on commit, so listeners never see the id before the event is readable
+    db.execute(select(func.pg_notify(EVENTS_CHANNEL, job_id)))
+
+
+def enqueue(filename: str, pdf_bytes: bytes, db: Session, max_queued: int) -> str:
+    """Store an upload as a queued job and return its ID.
+
+    Raises:
+        JobQueueFull: ``max_queued`` jobs are already queued.
+    """
+    queued = db.execute(select(func.count()).where(IngestionJob.status == "queued")).scalar_one()
+    if queued >= max_queued:
+        raise JobQueueFull(f"{queued} jobs queued (limit {max_queued})")
+    job_id = uuid.uuid4().hex
+    db.add(IngestionJob(
+        id=job_id,
+        filename=filename,
+        pdf_bytes=pdf_bytes,
+        status="queued",
+        progress=0,
+        attempts=0,
+        created_at=_now(),
+    ))
+    db.flush()
+    return job_id
+
+
+def claim_next(
+    worker_id: str, db: Session, stale_after_seconds: float, max_attempts: int
+) -> IngestionJob | None:
+    """Lock and mark as running the oldest runnable job, or return None.
+
+    Runnable means queued, or running with a heartbeat older than
+    ``stale_after_seconds`` (its worker died). Stale jobs that have used up
+    ``max_attempts`` are failed instead of retried, with a terminal error
+    event in the same transaction so their streams end.
+    """
+    now = _now()
+    stale_before = now - datetime.timedelta(seconds=stale_after_seconds)
+    is_stale = and_(IngestionJob.status == "running", IngestionJob.heartbeat_at < stale_before)
+
+    message = "Worker lost; retry limit reached"
+    failed = db.execute(
+        update(IngestionJob)
+        .where(is_stale, IngestionJob.attempts >= max_attempts)
+        .values(status="failed", finished_at=now, error_message=message, pdf_bytes=None)
+        .returning(IngestionJob.id)
+    ).scalars().all()
+    for failed_id in failed:
+        logger.warning(f"Failing stale job {failed_id}: {message}")
+        _log_event(failed_id, SseErrorEvent(message=message).model_dump(mode="json"), now, db)
+
+    job = db.execute(
+        select(IngestionJob)
+        .where(or_(IngestionJob.status == "queued", is_stale))
+        .order_by(IngestionJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+    if job is None:
+        return None
+
+    if job.status == "running":
+        logger.warning(f"Reclaiming stale job {job.id} from worker {job.worker_id}")
+    job.status = "running"
+    job.worker_id = worker_id
+    job.attempts += 1
+    job.started_at = job.heartbeat_at = _now()
+    db.flush()
+    return job
+
+
+def heartbeat(job_id: str, worker_id: str, db: Session) -> None:
+    """Mark a running job as alive.
+
+    Raises:
+        JobLost: ``worker_id`` no longer holds the job.
+    """
+    _update_held(job_id, worker_id, db, heartbeat_at=_now())
+
+
+def record_event(job_id: str, worker_id: str, event: SseEvent, db: Session) -> None:
+    """Append a pipeline event to the job's log and update its status.
+
+    Raises:
+        JobLost: ``worker_id`` no longer holds the job; nothing is written.
+    """
+    payload = event.model_dump(mode="json")
+    now = _now()
+    values: dict[str, Any] = {"stage": event.stage, "heartbeat_at": now}
+    if hasattr(event, "progress"):
+        values["progress"] = event.progress
+
+    status = _TERMINAL_STATUS.get(event.stage)
+    if status is not None:
+        values.update(
+            status=status, finished_at=now, result=payload.get("data"), error_message=payload.get("message"),
+            pdf_bytes=None,
+        )
+    _update_held(job_id, worker_id, db, **values)
+    _log_event(job_id, payload, now, db)
+
+
+def fail(job_id: str, worker_id: str, message: str, db: Session) -> None:
+    """Mark a job failed when the worker could not run it to a terminal event.
+
+    Raises:
+        JobLost: ``worker_id`` no longer holds the job (or it already finished).
+    """
+    now = _now()
+    _update_held(job_id, worker_id, db, status="failed", finished_at=now, error_message=message, pdf_bytes=None)
+    _log_event(job_id, SseErrorEvent(message=message).model_dump(mode="json"), now, db)
+
+
+def sweep_finished(db: Session, retention_seconds: float) -> int:
+    """Delete jobs that finished over ``retention_seconds`` ago; their events go by cascade.
+
+    Returns the number of jobs deleted.
+    """
+    cutoff = _now() - datetime.timedelta(seconds=retention_seconds)
+    result = db.execute(
+        delete(IngestionJob).where(
+            IngestionJob.status.in_(TERMINAL_JOB_STATUSES), IngestionJob.finished_at < cutoff
+        )
+    )
+    return result.rowcount
+
+
+def events_after(job_id: str, after_id: int, db: Session) -> list[tuple[int, dict[str, Any]]]:
+    """Events logged for a job since ``after_id``, oldest first."""
+    rows = db.execute(
+        select(IngestionJobEvent.id, IngestionJobEvent.payload)
+        .where(IngestionJobEvent.job_id == job_id, IngestionJobEvent.id > after_id)
+        .order_by(IngestionJobEvent.id)
+    ).all()
+    return [(row.id, row.payload) for row in rows]
+
+
+def status_of(job_id: str, db: Session) -> str | None:
+    """A job's status, or None if there is no such job."""
+    return db.execute(select(IngestionJob.status).where(IngestionJob.id == job_id)).scalar_one_or_none()
+
+
+def _get_or_404(job_id: str, db: Session) -> IngestionJob:
+    job = db.get(IngestionJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def get_status(job_id: str, db: Session) -> JobStatusResponse:
+    """Current status and progress of a job."""
+    job = _get_or_404(job_id, db)
+    return JobStatusResponse(
+        job_id=job.id,
+        filename=job.filename,
+        status=job.status,
+        stage=job.stage,
+        progress=job.progress,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error_message=job.error_message,
+    )
+
+
+def get_result(job_id: str, db: Session) -> ExtractionResponse:
+    """Extraction result of a finished job; errors mirror the sync upload endpoint."""
+    job = _get_or_404(job_id, db)
+    if job.status not in TERMINAL_JOB_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if job.status == "validation_failed":
+        raise HTTPException(status_code=422, detail=job.result)
+    if job.status == "failed":
+        raise HTTPException(status_code=422, detail=job.error_message)
+    return ExtractionResponse(**job.result)
@@ -1,12 +1,20 @@
 """LLM-based structured data extraction from termsheet markdown."""
 
-from services.llm.agent import extract_termsheet_data
+from services.llm.agent import (
+    AgentProgress,
+    ExtractionCancelled,
+    extract_termsheet_data,
+    stream_termsheet_extraction,
+)
 from schemas.termsheet import Event, Product, TermsheetData, Underlying
 
 __all__ = [
+    "AgentProgress",
     "Event",
+    "ExtractionCancelled",
     "Product",
     "TermsheetData",
     "Underlying",
     "extract_termsheet_data",
+    "stream_termsheet_extraction",
 ]
@@ -1,21 +1,74 @@
 """LLM agent orchestration for termsheet extraction."""
 
 import logging
+import math
+import threading
 import time
+from dataclasses import dataclass
+from typing import Callable, Generator, Literal
 
 from langchain.agents import create_agent
 from langchain.agents.structured_output import ToolStrategy
 from langchain.chat_models import init_chat_model
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from pydantic import ValidationError
 
+from core import tracing
 from core.config import settings
+from core.metrics import COUNT_BUCKETS, TOKEN_BUCKETS, counter, histogram
+from services.llm.compaction import ToolOutputCompactionMiddleware
+from services.llm.entities import build_entity_index, format_digest
 from services.llm.prompts import SYSTEM_PROMPT
 from schemas.termsheet import TermsheetData
 from services.llm.tools import make_tools
 
 logger = logging.getLogger(__name__)
 
+# Phases of the extraction protocol in SYSTEM_PROMPT, with the share of the
+# agent run each one typically takes. Used to estimate completion.
+PHASE_BANDS: dict[str, tuple[float, float]] = {
+    "explore": (0.0, 0.05),
+    "product": (0.05, 0.3),
+    "underlyings": (0.3, 0.45),
+    "events": (0.45, 0.95),
+    "submit": (0.95, 1.0),
+}
+
+# Keywords in tool-call arguments that indicate which phase the agent is in.
+_PHASE_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "product": ("isin", "sedol", "issuer", "currency", "issue date", "maturity", "title", "description"),
+    "underlyings": ("underlying", "basket", "initial", "bloomberg", "index"),
+    "events": (
+        "barrier", "coupon", "interest", "autocall", "early redemption", "knock",
+        "strike", "valuation", "redemption", "trigger",
+    ),
+}
+
+_PHASE_ORDER = list(PHASE_BANDS)
+
+LLM_TOKENS = counter("llm_tokens_total", "LLM tokens used, as reported by the API", ("model", "direction"))
+LLM_TOKENS_PER_RUN = histogram(
+    "llm_tokens_per_run", "LLM tokens used per agent run", ("model", "direction"), TOKEN_BUCKETS
+)
+LLM_TOOL_CALLS_PER_RUN = histogram(
+    "llm_tool_calls_per_run", "Tool calls made per agent run", ("model",), COUNT_BUCKETS
+)
+
+
+class ExtractionCancelled(Exception):
+    """Raised when an extraction is cancelled cooperatively, e.g. the client disconnected."""
+
+
+@dataclass
+class AgentProgress:
+    """A tool call or phase transition observed while the agent runs."""
+
+    kind: Literal["tool_call", "phase"]
+    phase: str
+    fraction: float  # estimated completion of the agent run, 0.0 - 1.0
+    tool: str | None = None
+    query: str | None = None
+
 
 def _error_handler(e: Exception) -> str:
     """Custom error handler for termsheet extraction validation."""
@@ -36,42 +89,95 @@ Please ensure your extraction has:
     return f"Error: {str(e)}"
 
 
-def extract_termsheet_data(markdown_text: str) -> TermsheetData:
-    """Extract structured termsheet data from markdown using an LLM agent.
+def _infer_phase(tool: str, query: str | None) -> str | None:
+    """Map a tool call onto an extraction phase, or None if it's ambiguous."""
+    if tool == "list_sections":
+        return "explore"
+    if tool == TermsheetData.__name__:
+        return "submit"
+    if not query:
+        return None
+    query_lower = query.lower()
+    # Check the most specific phases first — "coupon barrier" is an events query
+    for phase in ("events", "underlyings", "product"):
+        if any(k in query_lower for k in _PHASE_KEYWORDS[phase]):
+            return phase
+    return None
+
+
+def _estimate_fraction(phase: str, calls_in_phase: int) -> float:
+    """Estimate run completion: within a phase, approach its upper bound asymptotically."""
+    start, end = PHASE_BANDS[phase]
+    return start + (end - start) * (1 - math.pow(0.5, calls_in_phase / 4))
+
+
+def _describe_call(tool_call: dict) -> str | None:
+    """Short human-readable summary of a tool call's arguments."""
+    args = tool_call.get("args") or {}
+    if tool_call["name"] == TermsheetData.__name__:
+        return None
+    if "query" in args:
+        return str(args["query"])
+    if "heading" in args:
+        return str(args["heading"])
+    if "start" in args and "end" in args:
+        return f"lines {args['start']}-{args['end']}"
+    return ", ".join(f"{k}={v}" for k, v in args.items()) or None
+
+
+def stream_termsheet_extraction(
+    markdown_text: str,
+    model_name: str | None = None,
+    cancel: threading.Event | None = None,
+) -> Generator[AgentProgress, None, TermsheetData]:
+    """Run the extraction agent, yielding progress for every tool call.
+
+    The agent is consumed with ``agent.stream`` so that callers (e.g. the SSE
+    orchestrator) can report progress while the run is in flight. The final
+    ``TermsheetData`` is the generator's return value::
+
+        data = yield from stream_termsheet_extraction(markdown)
 
     Args:
         markdown_text: Markdown output from pdf_extractor / pymupdf4llm.
-
-    Returns:
-        TermsheetData with product, underlyings, and events.
+        model_name: Chat model to use; defaults to ``settings.LLM_MODEL``.
+        cancel: Checked between agent turns; when set, the run is abandoned.
 
     Raises:
         ValueError: If the LLM fails to return valid structured data.
+        ExtractionCancelled: If ``cancel`` was set before the agent finished.
     """
     logger.info("Starting LLM extraction (%d chars of markdown)", len(markdown_text))
 
-    tools = make_tools(markdown_text)
+    index = build_entity_index(markdown_text)
+    tools = make_tools(markdown_text, index)
 
     messages = [
         SystemMessage(content=SYSTEM_PROMPT),
         HumanMessage(content=(
             "Extract all structured product data from this termsheet. "
             "Use your search tools to find each required field. "
-            "Work through all 5 phases before submitting."
+            "Work through all 5 phases before submitting.\n\n"
+            "Index of values in the document (label ×count, line range) — "
+            "use find_values(kind, near=...) or read_lines() to jump to them:\n"
+            + format_digest(index)
         )),
     ]
 
-    logger.info("Initialising model: %s via %s", settings.LLM_MODEL, settings.LLM_API_URL)
+    model_name = model_name or settings.LLM_MODEL
+    logger.info("Initialising model: %s via %s", model_name, settings.LLM_API_URL)
     model = init_chat_model(
-        model=settings.LLM_MODEL,
+        model=model_name,
         model_provider="openai",
         api_key=settings.LLM_API_KEY,
         base_url=settings.LLM_API_URL,
     )
 
+    compaction = ToolOutputCompactionMiddleware(char_budget=settings.LLM_PROMPT_CHAR_BUDGET)
     agent = create_agent(
         model,
         tools=tools,
+        middleware=[compaction],
         response_format=ToolStrategy(
             TermsheetData,
             handle_errors=_error_handler,
@@ -81,11 +187,81 @@ def extract_termsheet_data(markdown_text: str) -> TermsheetData:
 
     logger.info("Invoking LLM agent...")
     t0 = time.monotonic()
-    result = agent.invoke({"messages": messages}, config={"recursion_limit": 300})
+    structured: TermsheetData | None = None
+    phase = _PHASE_ORDER[0]
+    calls_in_phase = 0
+    tool_calls = 0
+    tokens = {"input": 0, "output": 0}
+    updates = agent.stream({"messages": messages}, config={"recursion_limit": 300}, stream_mode="updates")
+    try:
+        while True:
+            # One span per agent step (an LLM turn or a batch of tool calls); tool
+            # calls made during the step open child spans
+            step = tracing.start_span("agent.step", model=model_name)
+            try:
+                with tracing.activate(step):
+                    update = next(updates, None)
+            except Exception as exc:
+                step.set(error=str(exc))
+                step.end("error")
+                raise
+            if update is None:
+                break
+            step.name = "llm.turn" if "model" in update else "agent." + "+".join(update)
+            node_updates = [u for u in update.values() if isinstance(u, dict)]
+            ai_messages = [m for u in node_updates for m in u.get("messages", []) if isinstance(m, AIMessage)]
+            for message in ai_messages:
+                for direction in tokens:
+                    used = (message.usage_metadata or {}).get(f"{direction}_tokens", 0)
+                    tokens[direction] += used
+                    LLM_TOKENS.inc(used, model=model_name, direction=direction)
+                    step.set(**{f"{direction}_tokens": used})
+                step.set(tool_calls=len(message.tool_calls))
+                tool_calls += len(message.tool_calls)
+            step.end()
+
+            # Each update is one completed model or tools step — a safe point to stop
+            if cancel is not None and cancel.is_set():
+                logger.info("LLM agent cancelled after %.1fs", time.monotonic() - t0)
+                raise ExtractionCancelled("llm_extraction")
+            for node_update in node_updates:
+                if node_update.get("structured_response") is not None:
+                    structured = node_update["structured_response"]
+            for message in ai_messages:
+                for tool_call in message.tool_calls:
+                    query = _describe_call(tool_call)
+                    inferred = _infer_phase(tool_call["name"], query)
+                    # Phases only move forward; revisiting an earlier topic keeps the current phase
+                    if inferred and _PHASE_ORDER.index(inferred) > _PHASE_ORDER.index(phase):
+                        phase = inferred
+                        calls_in_phase = 0
+                        yield AgentProgress(kind="phase", phase=phase, fraction=PHASE_BANDS[phase][0])
+                    calls_in_phase += 1
+                    logger.debug("Tool call [%s] %s(%s)", phase, tool_call["name"], query or "")
+                    yield AgentProgress(
+                        kind="tool_call",
+                        phase=phase,
+                        fraction=_estimate_fraction(phase, calls_in_phase),
+                        tool=tool_call["name"],
+                        query=query,
+                    )
+    finally:
+        # Release the graph run (and its HTTP client) on cancellation or early close
+        updates.close()
+        LLM_TOOL_CALLS_PER_RUN.observe(tool_calls, model=model_name)
+        for direction, used in tokens.items():
+            LLM_TOKENS_PER_RUN.observe(used, model=model_name, direction=direction)
     elapsed = time.monotonic() - t0
     logger.info("LLM agent returned in %.1fs", elapsed)
+    if compaction.turn_sizes:
+        before, after = zip(*compaction.turn_sizes)
+        logger.info(
+            "Prompt sizes over %d turns: peak %d → %d chars, total %d → %d chars",
+            len(compaction.turn_sizes), max(before), max(after), sum(before), sum(after),
+        )
 
-    structured = result["structured_response"]
+    if structured is None:
+        raise ValueError("LLM agent finished without returning structured termsheet data")
     logger.info(
         "Extraction complete: product=%s, %d underlyings, %d events",
         structured.product.product_isin,
@@ -94,3 +270,29 @@ def extract_termsheet_data(markdown_text: str) -> TermsheetData:
     )
 
     return structured
+
+
+def extract_termsheet_data(
+    markdown_text: str,
+    on_progress: Callable[[AgentProgress], None] | None = None,
+) -> TermsheetData:
+    """Extract structured termsheet data from markdown using an LLM agent.
+
+    Args:
+        markdown_text: Markdown output from pdf_extractor / pymupdf4llm.
+        on_progress: Optional callback invoked for each tool call / phase transition.
+
+    Returns:
+        TermsheetData with product, underlyings, and events.
+
+    Raises:
+        ValueError: If the LLM fails to return valid structured data.
+    """
+    progress_stream = stream_termsheet_extraction(markdown_text)
+    while True:
+        try:
+            progress = next(progress_stream)
+        except StopIteration as stop:
+            return stop.value
+        if on_progress is not None:
+            on_progress(progress)
@@ -0,0 +1,147 @@
+"""Message-history compaction for long agent tool loops.
+
+Every tool result stays in the agent's conversation, so without compaction
+each model call re-sends the whole history and per-turn prompt size grows
+with the number of tool calls. Before each model call, older tool outputs are
+replaced with short summaries of the values they contained. Outputs the agent
+has cited (their values appear in a later AI message) and the most recent
+outputs are kept verbatim, unless the prompt is still over budget.
+
+The agent state itself is untouched — only the prompt sent to the model is
+compacted — so the structured response and logs keep the full history.
+"""
+
+import json
+import logging
+import re
+from typing import Callable
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+# Most recent tool outputs always kept verbatim (while within budget)
+KEEP_RECENT = 6
+
+# Value-bearing lines kept in a compacted summary
+MAX_SUMMARY_LINES = 12
+
+# Tokens that identify an extracted fact: ISINs, dates, percentages, decimals
+_VALUE_RE = re.compile(
+    r"\b[A-Z]{2}[A-Z0-9]{9}\d\b"
+    r"|\b\d{4}-\d{2}-\d{2}\b"
+    r"|\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b"
+    r"|\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}\b"
+    r"|\d+(?:[.,]\d+)?\s?%"
+    r"|\b\d[\d,]*\.\d+\b"
+)
+
+
+def _values(text: str) -> set[str]:
+    return {re.sub(r"\s", "", m.group(0)) for m in _VALUE_RE.finditer(text)}
+
+
+def _message_chars(message: AnyMessage) -> int:
+    size = len(message.content) if isinstance(message.content, str) else len(json.dumps(message.content))
+    if isinstance(message, AIMessage) and message.tool_calls:
+        size += len(json.dumps([tc["args"] for tc in message.tool_calls], default=str))
+    return size
+
+
+def _ai_text(message: AIMessage) -> str:
+    """Content plus tool-call arguments of an AI message, as searchable text."""
+    args = json.dumps([tc["args"] for tc in message.tool_calls], default=str) if message.tool_calls else ""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    return f"{content}\n{args}"
+
+
+def summarise_tool_output(content: str) -> str:
+    """Reduce a tool output to the lines that carry values (dates, %, codes, amounts)."""
+    lines = content.splitlines()
+    # search_termsheet marks the matching line with '>>>'; prefer those
+    hits = [line for line in lines if line.startswith(">>>")]
+    if not hits:
+        hits = [line for line in lines if _VALUE_RE.search(line)]
+    kept = [re.sub(r"\s+", " ", line).strip() for line in hits[:MAX_SUMMARY_LINES]]
+    header = lines[0].strip() if lines else ""
+    more = f" (+{len(hits) - len(kept)} more)" if len(hits) > len(kept) else ""
+    body = "\n".join(kept) if kept else "no values found"
+    return f"[compacted from {len(content)} chars] {header}\n{body}{more}"
+
+
+def _cited_tool_call_ids(messages: list[AnyMessage]) -> set[str]:
+    """Tool outputs whose values the agent repeated in a later AI message."""
+    cited: set[str] = set()
+    later_values: set[str] = set()
+    for message in reversed(messages):
+        if isinstance(message, AIMessage):
+            later_values |= _values(_ai_text(message))
+        elif isinstance(message, ToolMessage) and isinstance(message.content, str):
+            if _values(message.content) & later_values:
+                cited.add(message.tool_call_id)
+    return cited
+
+
+def compact_messages(
+    messages: list[AnyMessage],
+    char_budget: int,
+    keep_recent: int = KEEP_RECENT,
+) -> list[AnyMessage]:
+    """Return a copy of ``messages`` with old tool outputs summarised.
+
+    Pass 1 compacts tool outputs that are neither recent nor cited. If the
+    prompt is still over ``char_budget``, pass 2 compacts the remaining tool
+    outputs oldest-first, always keeping the latest one verbatim.
+    """
+    compacted = list(messages)
+    tool_indices = [
+        i for i, m in enumerate(messages)
+        if isinstance(m, ToolMessage) and isinstance(m.content, str)
+    ]
+    recent = set(tool_indices[-keep_recent:]) if keep_recent else set()
+    cited = _cited_tool_call_ids(messages)
+
+    def _compact(i: int) -> None:
+        original = messages[i]
+        summary = summarise_tool_output(original.content)
+        if len(summary) < len(original.content):
+            compacted[i] = original.model_copy(update={"content": summary})
+
+    for i in tool_indices:
+        if i not in recent and messages[i].tool_call_id not in cited:
+            _compact(i)
+
+    total = sum(_message_chars(m) for m in compacted)
+    for i in tool_indices[:-1]:
+        if total <= char_budget:
+            break
+        if compacted[i] is messages[i]:
+            before = _message_chars(compacted[i])
+            _compact(i)
+            total -= before - _message_chars(compacted[i])
+
+    return compacted
+
+
+class ToolOutputCompactionMiddleware(AgentMiddleware):
+    """Compact the prompt before every model call and record per-turn sizes."""
+
+    def __init__(self, char_budget: int, keep_recent: int = KEEP_RECENT) -> None:
+        super().__init__()
+        self.char_budget = char_budget
+        self.keep_recent = keep_recent
+        self.turn_sizes: list[tuple[int, int]] = []  # (chars before, chars after) per model call
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        system_chars = len(request.system_message.content) if request.system_message else 0
+        before = system_chars + sum(_message_chars(m) for m in request.messages)
+        messages = compact_messages(request.messages, self.char_budget - system_chars, self.keep_recent)
+        after = system_chars + sum(_message_chars(m) for m in messages)
+        self.turn_sizes.append((before, after))
+        logger.debug("Turn %d prompt: %d → %d chars", len(self.turn_sizes), before, after)
+        return handler(request.override(messages=messages))
@@ -0,0 +1,161 @@
+"""Typed index of the values in a termsheet's markdown.
+
+Pre-extracts every date, percentage, currency amount and ISIN-like token with
+its line number and a label taken from the surrounding text (table column
+header, bold field name, or "Label: value" prefix). The agent queries it via
+the find_values tool and gets a compact digest in its first message, so it can
+jump straight to the right lines instead of hunting with keyword searches.
+"""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Literal
+
+EntityKind = Literal["date", "percentage", "amount", "isin"]
+ENTITY_KINDS: tuple[EntityKind, ...] = ("date", "percentage", "amount", "isin")
+
+_MONTHS = r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)"
+_CURRENCIES = r"(?:GBP|EUR|USD|CHF|JPY|AUD|CAD|HKD|SGD|SEK|NOK|DKK|£|€|\$)"
+
+# Patterns for each entity kind, as written in termsheets (case-sensitive)
+ENTITY_PATTERNS: dict[EntityKind, re.Pattern] = {
+    "date": re.compile(
+        rf"\b\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTHS},?\s+\d{{4}}\b"
+        rf"|\b{_MONTHS}\s+\d{{1,2}},?\s+\d{{4}}\b"
+        r"|\b\d{4}-\d{2}-\d{2}\b"
+        r"|\b\d{1,2}[/.]\d{1,2}[/.]\d{4}\b"
+    ),
+    "percentage": re.compile(r"[-+]?\d+(?:[.,]\d+)?\s?%"),
+    "amount": re.compile(
+        rf"{_CURRENCIES}\s?\d[\d,]*(?:\.\d+)?\b"
+        rf"|\b\d[\d,]*(?:\.\d+)?\s?{_CURRENCIES}(?![A-Za-z])"
+    ),
+    "isin": re.compile(r"\b[A-Z]{2}[A-Z0-9]{9}\d\b"),
+}
+
+_TABLE_SEPARATOR = re.compile(r"^\|\s*:?-{3,}")
+_HEADING = re.compile(r"^#{1,6}\s+(.*)")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+MAX_LABEL_CHARS = 60
+MAX_RESULTS = 30
+
+
+@dataclass(frozen=True)
+class Entity:
+    kind: EntityKind
+    value: str
+    line: int  # 1-indexed, matching read_lines()
+    label: str
+    row: str | None = None  # first-column key for values in table rows
+
+
+def _clean(text: str) -> str:
+    text = re.sub(r"<br>|\*\*|\[|\]", " ", text)
+    return re.sub(r"\s+", " ", text).strip(" :|")[:MAX_LABEL_CHARS]
+
+
+def _cells(line: str) -> list[str]:
+    return line.strip().strip("|").split("|")
+
+
+def _tail(text: str) -> str:
+    """The last few whole words of ``text``, within the label length limit."""
+    words: list[str] = []
+    for word in reversed(text.split()):
+        if sum(len(w) + 1 for w in words) + len(word) > MAX_LABEL_CHARS:
+            break
+        words.insert(0, word)
+    return _clean(" ".join(words))
+
+
+def _prose_label(lines: list[str], idx: int, start: int) -> str:
+    """Label for a value in prose: 'Label: value', a bold field name, or the nearest heading."""
+    before = lines[idx][:start]
+    if ":" in before:
+        return _clean(before.rsplit(":", 1)[0].split(".")[-1])
+    bold = _BOLD.findall(before)
+    if bold:
+        return _clean(" ".join(bold))
+    if len(before.split()) >= 4:  # mid-sentence: the preceding words describe the value
+        return _tail(before)
+    # Field names are often on preceding lines (pymupdf4llm splits label cells)
+    for j in range(idx - 1, max(-1, idx - 6), -1):
+        heading = _HEADING.match(lines[j])
+        bold = _BOLD.findall(lines[j])
+        if heading:
+            return _clean(heading.group(1))
+        if bold:
+            return _clean(" ".join(bold))
+    return _tail(before)
+
+
+def build_entity_index(markdown: str) -> list[Entity]:
+    """Extract every typed value in the markdown with its line number and label."""
+    lines = markdown.splitlines()
+    entities: list[Entity] = []
+    header: list[str] | None = None
+
+    for idx, line in enumerate(lines):
+        is_table_row = line.lstrip().startswith("|")
+        if not is_table_row:
+            header = None
+        elif idx + 1 < len(lines) and _TABLE_SEPARATOR.match(lines[idx + 1]):
+            header = [_clean(c) for c in _cells(line)]
+        if _TABLE_SEPARATOR.match(line):
+            continue
+
+        for kind, pattern in ENTITY_PATTERNS.items():
+            for match in pattern.finditer(line):
+                row = None
+                if is_table_row and header:
+                    col = line[: match.start()].count("|") - 1
+                    label = header[col] if 0 <= col < len(header) else ""
+                    row_key = _clean(_cells(line)[0])
+                    if col > 0 and row_key and len(row_key) <= 12:
+                        row = row_key
+                else:
+                    label = _prose_label(lines, idx, match.start())
+                entities.append(Entity(kind=kind, value=match.group(0).strip(), line=idx + 1, label=label, row=row))
+
+    return entities
+
+
+def find_entities(index: list[Entity], kind: str, near: str | None = None) -> list[Entity]:
+    """Filter the index by kind, optionally to values whose label mentions ``near``."""
+    matches = [e for e in index if e.kind == kind]
+    if near:
+        near_lower = near.lower()
+        matches = [e for e in matches if near_lower in e.label.lower()]
+    return matches
+
+
+def format_entities(entities: list[Entity]) -> str:
+    shown = entities[:MAX_RESULTS]
+    rows = [
+        f"  L{e.line}: {e.value} — {e.label or '(no label)'}" + (f" [row {e.row}]" if e.row else "")
+        for e in shown
+    ]
+    more = f"\n  ... {len(entities) - len(shown)} more; narrow with near=" if len(entities) > len(shown) else ""
+    return "\n".join(rows) + more
+
+
+def format_digest(index: list[Entity], labels_per_kind: int = 12) -> str:
+    """Compact per-kind summary: the most common labels with counts and line ranges."""
+    sections = []
+    for kind in ENTITY_KINDS:
+        by_label: dict[str, list[int]] = defaultdict(list)
+        for e in index:
+            if e.kind == kind:
+                by_label[e.label or "(no label)"].append(e.line)
+        if not by_label:
+            continue
+        total = sum(len(v) for v in by_label.values())
+        top = sorted(by_label.items(), key=lambda kv: (-len(kv[1]), kv[1][0]))[:labels_per_kind]
+        parts = [
+            f"{label} ×{len(found)} L{min(found)}" + (f"-{max(found)}" if max(found) != min(found) else "")
+            for label, found in top
+        ]
+        sections.append(f"{kind} ({total}): " + "; ".join(parts))
+    return "\n".join(sections) if sections else "No dates, percentages, amounts or ISINs found."
@@ -8,7 +8,10 @@ extract ALL relevant data into the TermsheetData format.
 Work through the following phases using your tools:
 
 ## Phase 1: Explore
-Call list_sections() to understand the document structure.
+Call list_sections() to understand the document structure. Your first message \
+includes an index of every date, percentage, amount and ISIN in the document; \
+use find_values(kind, near=...) to list them with line numbers instead of \
+searching for dates and percentages by keyword.
 
 ## Phase 2: Product details
 Search for each product field:
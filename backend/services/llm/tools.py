@@ -1,20 +1,32 @@
 """Document search tools for LLM-based termsheet extraction.
 
 These tools close over a markdown string and allow the LLM agent to search,
-read sections, list headings, and read arbitrary line ranges.
+read sections, list headings, read arbitrary line ranges, and look up typed
+values (dates, percentages, amounts, ISINs) from a pre-built entity index.
 """
 
 import re
 
 from langchain_core.tools import tool
 
+from core.tracing import traced
+from services.llm.entities import ENTITY_KINDS, Entity, build_entity_index, find_entities, format_entities
 
-def make_tools(markdown: str):
-    """Create document search tools that close over the markdown text."""
+
+def make_tools(markdown: str, index: list[Entity] | None = None):
+    """Create document search tools that close over the markdown text.
+
+    Args:
+        markdown: The termsheet markdown.
+        index: Pre-built entity index; built from ``markdown`` if omitted.
+    """
 
     lines = markdown.splitlines()
+    if index is None:
+        index = build_entity_index(markdown)
 
     @tool
+    @traced("tool.search_termsheet", record_args=True)
     def search_termsheet(query: str) -> str:
         """Search the termsheet for lines matching a keyword query.
         Returns matching lines with ±5 lines of context.
@@ -41,6 +53,7 @@ def make_tools(markdown: str):
         return f"Found {len(matches)} match(es) for '{query}':\n\n" + "\n---\n".join(results)
 
     @tool
+    @traced("tool.read_section", record_args=True)
     def read_section(heading: str) -> str:
         """Read a specific section of the termsheet by its heading.
         Uses fuzzy matching — you don't need the exact heading text.
@@ -82,6 +95,7 @@ def make_tools(markdown: str):
         return f"Section '{lines[best_idx].strip()}':\n\n{section_text}"
 
     @tool
+    @traced("tool.list_sections", record_args=True)
     def list_sections() -> str:
         """List all section headings in the termsheet.
         Use this first to understand the document structure before searching."""
@@ -96,6 +110,7 @@ def make_tools(markdown: str):
         return "Document sections:\n" + "\n".join(headings)
 
     @tool
+    @traced("tool.read_lines", record_args=True)
     def read_lines(start: int, end: int) -> str:
         """Read a range of lines from the termsheet (1-indexed, inclusive).
         Use after search_termsheet to read broader context around a match.
@@ -109,4 +124,20 @@ def make_tools(markdown: str):
         numbered = [f"{i + start_idx + 1:4d} | {line}" for i, line in enumerate(selected)]
         return "\n".join(numbered)
 
-    return [search_termsheet, read_section, list_sections, read_lines]
+    @tool
+    @traced("tool.find_values", record_args=True)
+    def find_values(kind: str, near: str | None = None) -> str:
+        """Look up typed values pre-extracted from the termsheet.
+        kind is one of: 'date', 'percentage', 'amount', 'isin'.
+        near optionally filters to values whose label (table column header or
+        field name) contains this text, e.g. find_values('date', near='Coupon Valuation').
+        Returns each value with its line number — use read_lines() for context."""
+        if kind not in ENTITY_KINDS:
+            return f"Unknown kind '{kind}'. Use one of: {', '.join(ENTITY_KINDS)}."
+        found = find_entities(index, kind, near)
+        suffix = f" near '{near}'" if near else ""
+        if not found:
+            return f"No {kind} values found{suffix}. Try without near= or use search_termsheet()."
+        return f"Found {len(found)} {kind} value(s){suffix}:\n" + format_entities(found)
+
+    return [search_termsheet, read_section, list_sections, read_lines, find_values]
@@ -1,5 +1,5 @@
 """Termsheet ingest pipeline (PDF → markdown → LLM → validate → persist)."""
 
-from services.pipeline.orchestrator import run_sync, stream
+from services.pipeline.orchestrator import resume_run, run_events, run_sync, stream
 
-__all__ = ["run_sync", "stream"]
+__all__ = ["resume_run", "run_events", "run_sync", "stream"]
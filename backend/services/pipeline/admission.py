@@ -0,0 +1,262 @@
+"""Admission control for pipeline runs in the API process.
+
+At most ``PIPELINE_MAX_WORKERS`` interactive runs (sync and SSE uploads)
+execute at once; the rest wait in FIFO order. Batch files take a slot in
+their own lane, only for the LLM stage, up to ``BATCH_LLM_CONCURRENCY`` at
+once, and are granted only while no interactive run is waiting. So batches
+yield to interactive uploads without sharing their cap. Once
+``ADMISSION_MAX_QUEUED`` runs are waiting, new interactive runs are rejected
+with a ``Retry-After`` estimate. Batch files aren't rejected: the batch
+executor already bounds how many of them can wait.
+
+Waiters are told their position and estimated wait whenever the queue moves;
+the estimate uses a moving average of recent run durations in the waiter's
+lane (a batch slot covers only the LLM stage, an interactive one a whole run). Jobs on the
+Postgres queue are admitted by the worker processes instead (one run each).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterator, Literal
+
+from core.config import settings
+from core.metrics import counter, gauge
+from services.llm import ExtractionCancelled
+
+logger = logging.getLogger(__name__)
+
+Lane = Literal["interactive", "batch"]
+
+# Weight of the latest run in the moving average of run durations
+_EWMA_ALPHA = 0.2
+
+# Retry-After when there is no run duration to estimate from yet
+DEFAULT_RETRY_AFTER_SECONDS = 30
+
+ADMISSION_REJECTED = counter("admission_rejected_total", "Interactive runs rejected because the queue was full")
+
+
+class AdmissionRejected(Exception):
+    """The admission queue is full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Admission queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass(eq=False)
+class Ticket:
+    """A run's place in the admission queue, and then its running slot."""
+
+    lane: Lane
+    on_granted: Callable[[Ticket], None]
+    on_update: Callable[[int, float | None], None] | None = None
+    granted_at: float | None = None
+    released: bool = False
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class AdmissionController:
+    """``max_batch_running`` gives the batch lane its own cap; when None, batch
+    runs count towards ``max_running`` like interactive ones."""
+
+    def __init__(self, max_running: int, max_queued: int, max_batch_running: int | None = None) -> None:
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_batch_running = max_batch_running
+        self._lock = threading.Lock()
+        self._lanes: dict[Lane, deque[Ticket]] = {"interactive": deque(), "batch": deque()}
+        self._running: dict[Lane, int] = {"interactive": 0, "batch": 0}
+        self._mean_run_seconds: dict[Lane, float | None] = {"interactive": None, "batch": None}
+        self._rejected_total = 0
+
+    # ── Queue state (called with the lock held) ──
+
+    def _queued(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def _has_room(self, lane: Lane) -> bool:
+        if self.max_batch_running is None:
+            return sum(self._running.values()) < self.max_running
+        if lane == "batch":
+            return self._running["batch"] < self.max_batch_running
+        return self._running["interactive"] < self.max_running
+
+    def _reject_if_full(self) -> None:
+        if not self._has_room("interactive") and self._queued() >= self.max_queued:
+            self._rejected_total += 1
+            ADMISSION_REJECTED.inc()
+            raise AdmissionRejected(self._retry_after())
+
+    def _estimate(self, position: int, lane: Lane = "interactive") -> float | None:
+        """Wait at ``position`` in ``lane``, from the lane's mean run time."""
+        mean = self._mean_run_seconds[lane]
+        if mean is None:
+            return None
+        slots = self.max_batch_running if lane == "batch" and self.max_batch_running is not None else self.max_running
+        return math.ceil(position / slots) * mean
+
+    def _grant_next(self) -> list[Ticket]:
+        granted = []
+        while True:
+            if self._lanes["interactive"] and self._has_room("interactive"):
+                lane: Lane = "interactive"
+            elif self._lanes["batch"] and not self._lanes["interactive"] and self._has_room("batch"):
+                lane = "batch"
+            else:
+                break
+            ticket = self._lanes[lane].popleft()
+            ticket.granted_at = time.monotonic()
+            self._running[lane] += 1
+            granted.append(ticket)
+        return granted
+
+    def _positions(self) -> list[tuple[Ticket, int, float | None]]:
+        """Each waiter's overall position, and its wait estimated from its place in its lane."""
+        interactive, batch = self._lanes["interactive"], self._lanes["batch"]
+        positions = [(t, i, self._estimate(i)) for i, t in enumerate(interactive, start=1)]
+        positions += [
+            (t, len(interactive) + i, self._estimate(i, "batch")) for i, t in enumerate(batch, start=1)
+        ]
+        return [p for p in positions if p[0].on_update is not None]
+
+    def _dispatch(self, granted: list[Ticket], positions: list[tuple[Ticket, int, float | None]]) -> None:
+        """Run callbacks outside the lock; they may submit work or touch other locks."""
+        for ticket in granted:
+            ticket.on_granted(ticket)
+        for ticket, position, eta in positions:
+            ticket.on_update(position, eta)
+
+    # ── API ──
+
+    def submit(
+        self,
+        lane: Lane,
+        on_granted: Callable[[Ticket], None],
+        on_update: Callable[[int, float | None], None] | None = None,
+        reject_when_full: bool = True,
+    ) -> Ticket:
+        """Queue a run; ``on_granted`` is called (possibly right away) once it may start.
+
+        Raises:
+            AdmissionRejected: the queue already holds ``max_queued`` runs.
+        """
+        ticket = Ticket(lane=lane, on_granted=on_granted, on_update=on_update)
+        with self._lock:
+            if reject_when_full:
+                self._reject_if_full()
+            self._lanes[lane].append(ticket)
+            granted = self._grant_next()
+            positions = self._positions()
+        if ticket not in granted:
+            logger.info(
+                f"Queued {lane} run at position {self.position(ticket)} ({sum(self._running.values())} running)"
+            )
+        self._dispatch(granted, positions)
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """End a granted run (or withdraw a waiting one) and admit the next; idempotent."""
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.granted_at is None:
+                try:
+                    self._lanes[ticket.lane].remove(ticket)
+                except ValueError:
+                    return
+            else:
+                self._running[ticket.lane] -= 1
+                seconds = time.monotonic() - ticket.granted_at
+                mean = self._mean_run_seconds[ticket.lane]
+                self._mean_run_seconds[ticket.lane] = (
+                    seconds if mean is None else _EWMA_ALPHA * seconds + (1 - _EWMA_ALPHA) * mean
+                )
+            granted = self._grant_next()
+            positions = self._positions()
+        self._dispatch(granted, positions)
+
+    def resize_batch_lane(self, max_batch_running: int) -> None:
+        """Give the batch lane its own cap of ``max_batch_running`` and admit any waiters it now fits."""
+        with self._lock:
+            self.max_batch_running = max_batch_running
+            granted = self._grant_next()
+            positions = self._positions()
+        self._dispatch(granted, positions)
+
+    def position(self, ticket: Ticket) -> int | None:
+        """1-based place in the queue, or None once granted."""
+        with self._lock:
+            if ticket.granted_at is not None:
+                return None
+            waiting = [*self._lanes["interactive"], *self._lanes["batch"]]
+            return waiting.index(ticket) + 1 if ticket in waiting else None
+
+    def check_room(self) -> None:
+        """Raise ``AdmissionRejected`` if an interactive run submitted now would be rejected."""
+        with self._lock:
+            self._reject_if_full()
+
+    def _retry_after(self) -> int:
+        eta = self._estimate(self._queued() + 1)
+        return max(1, math.ceil(eta)) if eta is not None else DEFAULT_RETRY_AFTER_SECONDS
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": sum(self._running.values()),
+                "running_by_lane": dict(self._running),
+                "max_running": self.max_running,
+                "max_batch_running": self.max_batch_running,
+                "queued": {lane: len(q) for lane, q in self._lanes.items()},
+                "max_queued": self.max_queued,
+                "mean_run_seconds": dict(self._mean_run_seconds),
+                "rejected_total": self._rejected_total,
+            }
+
+    # ── Helpers for front-ends ──
+
+    @asynccontextmanager
+    async def slot(self, lane: Lane = "interactive") -> AsyncIterator[None]:
+        """Hold a running slot for the body of an ``async with`` (waits without a thread)."""
+        loop = asyncio.get_running_loop()
+        granted = asyncio.Event()
+        ticket = self.submit(lane, lambda _: loop.call_soon_threadsafe(granted.set))
+        try:
+            await granted.wait()
+            yield
+        finally:
+            self.release(ticket)
+
+    @contextmanager
+    def blocking_slot(self, lane: Lane, cancel: threading.Event | None = None) -> Iterator[None]:
+        """Hold a running slot in a worker thread; waiting stops if ``cancel`` is set."""
+        granted = threading.Event()
+        ticket = self.submit(lane, lambda _: granted.set(), reject_when_full=False)
+        try:
+            while not granted.wait(0.5):
+                if cancel is not None and cancel.is_set():
+                    raise ExtractionCancelled("queued")
+            yield
+        finally:
+            self.release(ticket)
+
+
+controller = AdmissionController(
+    settings.PIPELINE_MAX_WORKERS, settings.ADMISSION_MAX_QUEUED, settings.BATCH_LLM_CONCURRENCY
+)
+
+gauge("admission_running", "Pipeline runs holding an admission slot", collect=lambda: controller.stats()["running"])
+gauge(
+    "admission_queued", "Pipeline runs waiting for an admission slot", ("lane",),
+    collect=lambda: {(lane,): n for lane, n in controller.stats()["queued"].items()},
+)
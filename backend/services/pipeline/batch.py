@@ -0,0 +1,226 @@
+"""Batch ingestion: many PDFs through the stage engine with bounded concurrency.
+
+Parsing is CPU-bound and runs in a process pool of ``BATCH_PARSE_WORKERS``
+(threads would serialise on the GIL). The LLM stage is IO-bound and runs in
+a batch-lane slot of the admission controller, whose lane holds
+``BATCH_LLM_CONCURRENCY`` at once and yields to interactive uploads; the
+other stages hold no slot. Files are driven by a thread pool just
+large enough to keep both busy, so while some files wait on the LLM others are
+being parsed. Results are yielded as each file finishes, followed by a summary.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from pathlib import Path
+from typing import Generator
+
+from core.config import settings
+from schemas.batch import BatchFileStatus, BatchSummary
+from schemas.sse import SseCompleteEvent, SseErrorEvent, SseEvent, SseValidationFailedEvent
+from services.llm import ExtractionCancelled
+from services.pipeline import admission
+from services.pipeline.engine import PipelineContext
+from services.pipeline.orchestrator import (
+    CHECKPOINT,
+    EXTRACT,
+    KNOWN_DOCUMENT,
+    PARSE,
+    PERSIST,
+    SAVE_BLOB,
+    VALIDATE,
+    new_context,
+    pipeline_events,
+)
+from services.pipeline.parse import extract_markdown, extract_markdown_from_path
+from services.pipeline.validate import BatchIsins, is_valid_isin
+from utils.upload import BatchFile
+
+logger = logging.getLogger(__name__)
+
+_file_executor = ThreadPoolExecutor(
+    max_workers=settings.BATCH_PARSE_WORKERS + settings.BATCH_LLM_CONCURRENCY,
+    thread_name_prefix="batch",
+)
+_parse_pool: ProcessPoolExecutor | None = None
+_parse_pool_lock = threading.Lock()
+
+
+def _parse_executor() -> ProcessPoolExecutor:
+    """The parse process pool, started on first use (spawned: the API process has threads)."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=settings.BATCH_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _parse_pool
+
+
+def configure_limits(parse_workers: int, llm_concurrency: int) -> None:
+    """Override the parse pool size and LLM concurrency (before the first batch runs)."""
+    global _file_executor, _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown()
+            _parse_pool = None
+        settings.BATCH_PARSE_WORKERS = parse_workers
+        settings.BATCH_LLM_CONCURRENCY = llm_concurrency
+        _file_executor.shutdown(wait=False)
+        _file_executor = ThreadPoolExecutor(max_workers=parse_workers + llm_concurrency, thread_name_prefix="batch")
+    admission.controller.resize_batch_lane(llm_concurrency)
+
+
+# ── Stages ────────────────────────────────────────────────────────────────────
+
+
+def _parse_in_process(ctx: PipelineContext) -> None:
+    # from disk when the file is there, so the PDF isn't pickled to the worker
+    if ctx.source_path is not None:
+        future = _parse_executor().submit(extract_markdown_from_path, ctx.source_path)
+    else:
+        future = _parse_executor().submit(extract_markdown, ctx.contents, ctx.filename)
+    ctx.markdown_text = future.result()
+
+
+def _extract_with_slot(ctx: PipelineContext):
+    """Run the LLM stage in a batch-lane admission slot.
+
+    The wait is recorded as ``llm_slot_wait`` (and is included in the stage's
+    own ``llm_extraction`` timing). The extracted ISIN is registered with the
+    batch so the duplicate check looks it up together with the others.
+    """
+    t0 = time.perf_counter()
+    with admission.controller.blocking_slot("batch", ctx.cancel):
+        ctx.timings["llm_slot_wait"] = time.perf_counter() - t0
+        result = yield from EXTRACT.run(ctx)
+    if ctx.batch_isins is not None and ctx.termsheet_data is not None:
+        isin = ctx.termsheet_data.product.product_isin
+        if is_valid_isin(isin):
+            ctx.batch_isins.expect(isin)
+    return result
+
+
+BATCH_STAGES = [
+    replace(PARSE, run=_parse_in_process),
+    KNOWN_DOCUMENT,
+    SAVE_BLOB,
+    replace(EXTRACT, run=_extract_with_slot),
+    CHECKPOINT,
+    VALIDATE,
+    PERSIST,
+]
+
+
+# ── Front-end ─────────────────────────────────────────────────────────────────
+
+
+def _file_status(
+    index: int, file: BatchFile, terminal: SseEvent | None, ctx: PipelineContext, elapsed: float
+) -> BatchFileStatus:
+    status = BatchFileStatus(index=index, filename=file.filename, size_bytes=file.size_bytes, status="cancelled")
+    if isinstance(terminal, (SseCompleteEvent, SseValidationFailedEvent)):
+        data = terminal.data
+        status.status = data["status"]
+        status.product_isin = data["product_isin"]
+        status.run_id = data.get("run_id")
+        status.issues = [i["message"] for i in data["validation"]["issues"] if i["severity"] == "error"]
+    elif isinstance(terminal, SseErrorEvent):
+        status.status = "failed"
+        status.error = terminal.message
+    status.trace_id = ctx.trace_id
+    status.seconds = round(elapsed, 3)
+    status.stage_seconds = {name: round(seconds, 3) for name, seconds in ctx.timings.items()}
+    return status
+
+
+def run_file(
+    index: int,
+    file: BatchFile,
+    cancel: threading.Event,
+    source_path: Path | None = None,
+    isins: BatchIsins | None = None,
+) -> BatchFileStatus:
+    """Run one file through the batch stages and report its outcome and stage timings.
+
+    Files sharing ``isins`` are checked for duplicate ISINs among each other.
+    """
+    if file.error is not None:
+        return BatchFileStatus(index=index, filename=file.filename, size_bytes=0, status="rejected", error=file.error)
+    t0 = time.perf_counter()
+    try:
+        ctx = new_context(file.read(), file.filename, cancel, file.sha256)
+    finally:
+        file.close()
+    ctx.source_path = source_path
+    ctx.batch_isins = isins
+    terminal = None
+    try:
+        for event in pipeline_events(ctx, BATCH_STAGES):
+            terminal = event
+    except ExtractionCancelled:
+        pass  # reported as cancelled
+    return _file_status(index, file, terminal, ctx, time.perf_counter() - t0)
+
+
+def summarize(results: list[BatchFileStatus], elapsed: float) -> BatchSummary:
+    """Counts per status, throughput and summed stage time for finished files."""
+    stage_seconds: Counter[str] = Counter()
+    for result in results:
+        stage_seconds.update(result.stage_seconds)
+    processed = [r for r in results if r.status != "rejected"]
+    total_bytes = sum(r.size_bytes for r in processed)
+    return BatchSummary(
+        files=len(results),
+        by_status=dict(Counter(r.status for r in results)),
+        elapsed_seconds=round(elapsed, 3),
+        files_per_second=round(len(processed) / elapsed, 3) if elapsed else 0.0,
+        megabytes_per_second=round(total_bytes / 1e6 / elapsed, 3) if elapsed else 0.0,
+        stage_seconds={name: round(seconds, 3) for name, seconds in stage_seconds.items()},
+    )
+
+
+def run_batch(
+    files: list[BatchFile], cancel: threading.Event | None = None
+) -> Generator[BatchFileStatus | BatchSummary, None, None]:
+    """Run every file through the pipeline, yielding each status as it finishes, then a summary.
+
+    ``cancel`` stops the files still queued or running (e.g. when the client
+    disconnects); closing the generator early has the same effect.
+    """
+    cancel = cancel or threading.Event()
+    logger.info(
+        f"Batch of {len(files)} files (parse workers {settings.BATCH_PARSE_WORKERS}, "
+        f"LLM concurrency {settings.BATCH_LLM_CONCURRENCY})"
+    )
+    t0 = time.perf_counter()
+    isins = BatchIsins()
+    futures: list[Future[BatchFileStatus]] = [
+        _file_executor.submit(run_file, index, file, cancel, isins=isins) for index, file in enumerate(files)
+    ]
+    results: list[BatchFileStatus] = []
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            yield result
+    finally:
+        if len(results) < len(futures):
+            cancel.set()
+            for future, file in zip(futures, files):
+                if future.cancel():
+                    file.close()  # never started, so nothing else releases its spool
+
+    summary = summarize(results, time.perf_counter() - t0)
+    logger.info(
+        f"Batch finished: {summary.by_status} in {summary.elapsed_seconds:.1f}s "
+        f"({summary.files_per_second:.2f} files/s)"
+    )
+    yield summary
@@ -0,0 +1,113 @@
+"""Skip the LLM for documents and ISINs that are already ingested.
+
+Checked right after PDF parsing, cheapest first:
+
+1. The PDF's SHA-256 against ``extraction_metadata.content_sha256`` (indexed)
+   of a successful run — the stored product is returned as the result.
+2. The most frequent Luhn-valid ISIN in the markdown against ``products``
+   (primary key lookup) — reported as the ``duplicate_isin`` validation error
+   that ``validate_termsheet`` would otherwise raise after a full LLM run.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from threading import Lock
+from typing import Literal
+
+from sqlalchemy.orm import Session
+
+from db.models.extraction_metadata import ExtractionMetadata
+from db.models.product import Product
+from schemas.termsheet import TermsheetData
+from services.pipeline import known_isins
+from services.pipeline.routing import mean_primary_latency
+from services.products import stored_termsheet
+from services.pipeline.validate import ValidationIssue, ValidationResult, is_valid_isin
+
+logger = logging.getLogger(__name__)
+
+_ISIN_RE = re.compile(r"\b[A-Z]{2}[A-Z0-9]{9}\d\b")
+
+
+@dataclass
+class KnownDocument:
+    """A document whose extraction can be answered from the database."""
+
+    reason: Literal["content_hash", "isin"]
+    data: TermsheetData  # the stored product
+    approved: bool
+    validation: ValidationResult
+
+
+_lock = Lock()
+_skips: Counter[str] = Counter()
+_seconds_saved = 0.0
+
+
+def sniff_isin(markdown: str) -> str | None:
+    """Most frequent Luhn-valid ISIN in the text — usually the product's own."""
+    counts = Counter(m for m in _ISIN_RE.findall(markdown) if is_valid_isin(m))
+    return counts.most_common(1)[0][0] if counts else None
+
+
+def find_known_document(content_sha256: str, markdown: str, db: Session) -> KnownDocument | None:
+    """Return the stored result for an already-ingested document or ISIN, else None."""
+    metadata = (
+        db.query(ExtractionMetadata)
+        .filter(
+            ExtractionMetadata.content_sha256 == content_sha256,
+            ExtractionMetadata.status == "success",
+            ExtractionMetadata.product_isin.isnot(None),
+        )
+        .order_by(ExtractionMetadata.extracted_at.desc())
+        .first()
+    )
+    if metadata is not None and metadata.product is not None:
+        product = metadata.product
+        return KnownDocument(
+            reason="content_hash",
+            data=stored_termsheet(product),
+            approved=product.approved,
+            validation=ValidationResult(),
+        )
+
+    isin = sniff_isin(markdown)
+    if isin is None or not known_isins.might_exist(isin):
+        return None
+    product = db.query(Product).filter_by(product_isin=isin).first()
+    if product is None:
+        return None
+    return KnownDocument(
+        reason="isin",
+        data=stored_termsheet(product),
+        approved=product.approved,
+        validation=ValidationResult(issues=[ValidationIssue(
+            field="product_isin", rule="duplicate_isin",
+            message=f"Product with ISIN '{isin}' already exists in the database",
+            severity="error",
+        )]),
+    )
+
+
+def record_skip(known: KnownDocument, filename: str) -> float:
+    """Count a skipped LLM run and return the estimated seconds saved."""
+    global _seconds_saved
+    saved = mean_primary_latency() or 0.0
+    with _lock:
+        _skips[known.reason] += 1
+        _seconds_saved += saved
+    logger.info(
+        f"Skipped LLM for '{filename}': {known.reason} matches {known.data.product.product_isin} "
+        f"(saved ~{saved:.1f}s)"
+    )
+    return saved
+
+
+def dedupe_stats() -> dict:
+    """LLM runs skipped per reason and the estimated LLM time saved."""
+    with _lock:
+        return {"skipped": dict(_skips), "llm_seconds_saved": _seconds_saved}
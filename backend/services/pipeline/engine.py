@@ -0,0 +1,153 @@
+"""Stage-based pipeline engine shared by the sync, SSE and batch front-ends.
+
+A pipeline is a list of ``Stage`` objects run in order against a
+``PipelineContext``. The engine gives every stage the same treatment:
+
+- a cooperative cancellation check before it starts,
+- a progress event when it starts (unless the stage is silent),
+- wall-clock timing, logged per run and recorded in the
+  ``pipeline_stage_duration_seconds`` histogram,
+- mapping of the stage's expected exceptions to a terminal error event,
+- a tracing span (``stage.<name>``) under the run's ``pipeline.run`` span,
+  whose trace id is stamped on the terminal event.
+
+A stage may yield progress events of its own (e.g. agent tool calls) and ends
+the run early by returning a terminal event (complete / validation_failed).
+Unexpected exceptions propagate to the front-end.
+"""
+
+from __future__ import annotations
+
+import inspect
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Generator
+
+from core import tracing
+from core.metrics import histogram
+from schemas.sse import TERMINAL_STAGES, SseEvent, SseErrorEvent, SseProgressEvent
+from schemas.termsheet import TermsheetData
+from services.llm import ExtractionCancelled
+from services.pipeline.dedupe import KnownDocument
+from services.pipeline.validate import BatchIsins, ValidationResult
+from utils.run_store import RunManifest
+
+logger = logging.getLogger(__name__)
+
+STAGE_DURATION = histogram(
+    "pipeline_stage_duration_seconds",
+    "Wall time of each pipeline stage",
+    ("stage", "outcome"),
+)
+
+
+@dataclass
+class PipelineContext:
+    """State threaded through the stages of one pipeline run."""
+
+    filename: str
+    contents: bytes
+    content_sha256: str
+    cancel: threading.Event | None = None
+    source_path: Path | None = None  # the PDF on disk, when ingesting from a directory
+    batch_isins: BatchIsins | None = None  # shared by the files of a batch
+    stage: str | None = None  # stage currently running
+    trace_id: str | None = None  # set when the run starts
+    run: RunManifest | None = None
+    markdown_text: str | None = None
+    known: KnownDocument | None = None
+    termsheet_data: TermsheetData | None = None
+    validation: ValidationResult | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+StageResult = SseEvent | None
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One registered pipeline step.
+
+    Args:
+        name: Stage id, used in progress events, logs and metrics.
+        run: Does the work; may be a generator yielding progress events.
+            Returning an event ends the run with it.
+        progress: Overall progress reported when the stage starts; None for
+            silent stages that the frontend doesn't show.
+        errors: Exceptions mapped to an ``SseErrorEvent``.
+        error_message: Prefix for the mapped error message.
+    """
+
+    name: str
+    run: Callable[[PipelineContext], StageResult | Generator[SseEvent, None, StageResult]]
+    progress: int | None = None
+    errors: tuple[type[Exception], ...] = ()
+    error_message: str | None = None
+
+
+def _check_cancelled(ctx: PipelineContext, stage: str) -> None:
+    if ctx.cancel is not None and ctx.cancel.is_set():
+        raise ExtractionCancelled(stage)
+
+
+def _stamp(event: SseEvent, ctx: PipelineContext) -> SseEvent:
+    if event.stage in TERMINAL_STAGES:
+        event.trace_id = ctx.trace_id
+    return event
+
+
+def run_stages(ctx: PipelineContext, stages: list[Stage]) -> Generator[SseEvent, None, None]:
+    """Run ``stages`` in order, yielding progress events and a terminal event."""
+    run_span = tracing.start_span("pipeline.run", filename=ctx.filename)
+    ctx.trace_id = run_span.trace_id
+    status = "ok"
+    try:
+        for stage in stages:
+            ctx.stage = stage.name
+            _check_cancelled(ctx, stage.name)
+            if stage.progress is not None:
+                yield SseProgressEvent(stage=stage.name, progress=stage.progress)
+
+            outcome = "ok"
+            stage_span = tracing.start_span(f"stage.{stage.name}", parent=run_span)
+            t0 = time.perf_counter()
+            try:
+                with tracing.activate(stage_span):
+                    result = stage.run(ctx)
+                if inspect.isgenerator(result):
+                    result = yield from tracing.traced_steps(result, stage_span)
+            except (ExtractionCancelled, GeneratorExit):
+                outcome = "cancelled"
+                raise
+            except stage.errors as exc:
+                outcome = "error"
+                stage_span.set(error=str(exc))
+                with tracing.activate(stage_span):
+                    logger.error(f"{stage.error_message}: {exc}")
+                yield _stamp(SseErrorEvent(message=f"{stage.error_message}: {exc}"), ctx)
+                return
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                elapsed = time.perf_counter() - t0
+                ctx.timings[stage.name] = elapsed
+                STAGE_DURATION.observe(elapsed, stage=stage.name, outcome=outcome)
+                stage_span.end(outcome)
+                status = outcome
+
+            if result is not None:
+                run_span.set(outcome=result.stage)
+                yield _stamp(result, ctx)
+                return
+    finally:
+        run_span.set(last_stage=ctx.stage, run_id=ctx.run.run_id if ctx.run else None)
+        run_span.end(status)
+        with tracing.activate(run_span):
+            logger.info(
+                f"Stage timings for '{ctx.filename}': "
+                + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in ctx.timings.items())
+            )
@@ -0,0 +1,33 @@
+"""Bounded thread pool for running the blocking pipeline off the event loop."""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from core.config import settings
+
+T = TypeVar("T")
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PIPELINE_MAX_WORKERS,
+    thread_name_prefix="pipeline",
+)
+
+
+async def run_in_pipeline_executor(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking pipeline call on the bounded executor and await its result.
+
+    Keeps the event loop free for health checks, listings and SSE streams while
+    PDF parsing and the LLM call run; at most PIPELINE_MAX_WORKERS run at once.
+    Runs in a copy of the caller's context, so the run joins the request's trace.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+
+def submit_to_pipeline_executor(func: Callable[..., T], *args, **kwargs) -> Future[T]:
+    """Start a blocking pipeline run on the bounded executor without awaiting it."""
+    return _executor.submit(func, *args, **kwargs)
@@ -0,0 +1,204 @@
+"""Check that extracted values occur in the termsheet's markdown.
+
+The agent is told to ground every value in the source text; this verifies it
+after the fact. The markdown is normalized (lowercase, markdown markup and
+thousands separators dropped, whitespace collapsed), every surface form of
+every checked value (a date in each common format, a number at each
+precision) goes into one Aho–Corasick automaton, and the document is scanned
+once. A match counts only on token boundaries, so 5% is not found in 75%.
+
+Checked: ISIN, SEDOL, product and event dates, event levels, strikes and
+amounts (as percentages, with or without the % sign, since schedule tables
+often put it in the header) and underlying initial prices. Values not found
+are reported as warnings with the nearest candidates of the same kind and
+their line numbers, e.g. the closest date actually in the document.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Iterator
+
+from schemas.termsheet import TermsheetData
+from services.llm.entities import ENTITY_PATTERNS
+from utils.aho_corasick import AhoCorasick
+
+# Ungrounded values reported before the rest are counted
+MAX_FINDINGS = 10
+# Nearest candidates shown per ungrounded value
+MAX_CANDIDATES = 3
+
+_MARKUP = re.compile(r"<br\s*/?>|\*\*|__|[|\[\]`]")
+_THOUSANDS = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+_SPACE_BEFORE_PERCENT = re.compile(r"[ \t]+%")
+_ORDINAL = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)\b")
+_SPACES = re.compile(r"[ \t]+")
+
+_DATE = re.compile(ENTITY_PATTERNS["date"].pattern, re.IGNORECASE)
+_NUMBER = re.compile(r"(?<![\w./-])\d+(?:\.\d+)?(?![\w/-]|\.\d)")
+_IDENTIFIERS = {
+    "isin": re.compile(r"\b[a-z]{2}[a-z0-9]{9}\d\b"),
+    "sedol": re.compile(r"\b(?=[a-z]*\d)[a-z0-9]{7}\b"),
+}
+_DATE_FORMATS = ("%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y", "%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y", "%m/%d/%Y")
+
+
+def normalize(markdown: str) -> str:
+    """Lowercase, markup-free text with the same lines as ``markdown``."""
+    text = _MARKUP.sub(" ", markdown.lower())
+    text = _THOUSANDS.sub("", text)
+    text = _SPACE_BEFORE_PERCENT.sub("%", text)
+    text = _ORDINAL.sub(r"\1", text)
+    return "\n".join(_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+
+
+def date_forms(d: date) -> set[str]:
+    """The ways ``d`` is commonly written, normalized."""
+    months = {d.strftime("%B").lower(), d.strftime("%b").lower()}
+    if d.month == 9:
+        months.add("sept")
+    forms = {d.isoformat()}
+    for day in {str(d.day), f"{d.day:02d}"}:
+        for month_number in {str(d.month), f"{d.month:02d}"}:
+            for sep in "/.-":
+                forms.add(f"{day}{sep}{month_number}{sep}{d.year}")
+                forms.add(f"{month_number}{sep}{day}{sep}{d.year}")
+        for month in months:
+            forms.update({f"{day} {month} {d.year}", f"{day} {month}, {d.year}"})
+            forms.update({f"{month} {day} {d.year}", f"{month} {day}, {d.year}"})
+    return forms
+
+
+def number_forms(x: float) -> set[str]:
+    """``x`` at each precision up to four decimals that still reads as ``x``."""
+    return {text for places in range(5) if abs(float(text := f"{x:.{places}f}") - x) < 1e-9}
+
+
+@dataclass(frozen=True)
+class Target:
+    field: str
+    kind: str  # "date", "number", "isin" or "sedol"
+    value: str
+    forms: frozenset[str]
+
+
+def _targets(data: TermsheetData) -> Iterator[Target]:
+    def of_date(field_name: str, value: date | None) -> Iterator[Target]:
+        if value is not None:
+            yield Target(field_name, "date", value.isoformat(), frozenset(date_forms(value)))
+
+    def of_number(field_name: str, value: float | None, suffix: str = "") -> Iterator[Target]:
+        if value is not None:
+            shown = f"{value:.4f}".rstrip("0").rstrip(".")
+            yield Target(field_name, "number", f"{shown}{suffix}", frozenset(number_forms(value)))
+
+    product = data.product
+    yield Target("product_isin", "isin", product.product_isin, frozenset({product.product_isin.lower()}))
+    if product.sedol:
+        yield Target("sedol", "sedol", product.sedol, frozenset({product.sedol.lower()}))
+    yield from of_date("issue_date", product.issue_date)
+    yield from of_date("maturity", product.maturity)
+    for i, underlying in enumerate(data.underlyings):
+        yield from of_number(f"underlyings[{i}].initial_price", underlying.initial_price)
+    for i, event in enumerate(data.events):
+        yield from of_date(f"events[{i}].event_date", event.event_date)
+        yield from of_date(f"events[{i}].event_payment_date", event.event_payment_date)
+        yield from of_number(f"events[{i}].event_level_pct", event.event_level_pct, "%")
+        yield from of_number(f"events[{i}].event_strike_pct", event.event_strike_pct, "%")
+        yield from of_number(f"events[{i}].event_amount", event.event_amount, "%")
+
+
+def _on_boundary(text: str, start: int, end: int) -> bool:
+    """Not part of a longer word or number (``5`` in ``75`` or ``2.5``)."""
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    if before.isalnum() or after.isalnum():
+        return False
+    if before in ".," and start > 1 and text[start - 2].isdigit():
+        return False
+    return not (after in ".," and end + 1 < len(text) and text[end + 1].isdigit())
+
+
+def found_forms(text: str, forms: set[str]) -> set[str]:
+    """Which of ``forms`` occur in ``text`` on token boundaries, in one scan."""
+    found: set[str] = set()
+    for start, form in AhoCorasick(forms).finditer(text):
+        if form not in found and _on_boundary(text, start, start + len(form)):
+            found.add(form)
+    return found
+
+
+# ── Nearest candidates ────────────────────────────────────────────────────────
+
+
+def _parse_date(token: str) -> date | None:
+    token = token.replace(",", "").replace("sept", "sep")
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(token, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _candidates(lines: list[str], kind: str) -> list[tuple[int, str, object]]:
+    """``(line number, token, parsed value)`` of every value of ``kind`` in the text."""
+    pattern = {"date": _DATE, "number": _NUMBER}.get(kind) or _IDENTIFIERS[kind]
+    found = []
+    for number, line in enumerate(lines, start=1):
+        for match in pattern.finditer(line):
+            token = match.group(0)
+            value: object = token
+            if kind == "date":
+                value = _parse_date(token)
+            elif kind == "number":
+                value = float(token)
+            if value is not None:
+                found.append((number, token, value))
+    return found
+
+
+def _distance(target: Target, value: object) -> float:
+    if target.kind == "date":
+        return abs((date.fromisoformat(target.value) - value).days)
+    if target.kind == "number":
+        wanted = float(target.value.rstrip("%"))
+        return abs(value - wanted) / max(abs(wanted), 1e-9)
+    wanted = target.value.lower()  # identifiers: differing characters
+    return sum(a != b for a, b in zip(wanted, value)) + abs(len(wanted) - len(value))
+
+
+def _nearest(target: Target, candidates: list[tuple[int, str, object]]) -> str:
+    ranked = sorted(candidates, key=lambda c: (_distance(target, c[2]), c[0]))
+    shown, seen = [], set()
+    for line, token, _ in ranked:
+        if (line, token) not in seen:
+            seen.add((line, token))
+            shown.append(f"L{line} '{token}'")
+        if len(shown) == MAX_CANDIDATES:
+            break
+    return ", ".join(shown)
+
+
+# ── Check ─────────────────────────────────────────────────────────────────────
+
+
+def ungrounded(data: TermsheetData, markdown: str) -> Iterator[tuple[str, str]]:
+    """``(field, message)`` for each extracted value that doesn't occur in ``markdown``."""
+    text = normalize(markdown)
+    targets = list(_targets(data))
+    found = found_forms(text, {form for target in targets for form in target.forms})
+    missing = [target for target in targets if not target.forms & found]
+
+    lines = text.split("\n")
+    candidates: dict[str, list] = {}
+    for target in missing[:MAX_FINDINGS]:
+        if target.kind not in candidates:
+            candidates[target.kind] = _candidates(lines, target.kind)
+        nearest = _nearest(target, candidates[target.kind])
+        hint = f"; nearest: {nearest}" if nearest else ""
+        yield target.field, f"'{target.value}' not found in the source document{hint}"
+    if len(missing) > MAX_FINDINGS:
+        yield "termsheet", f"... and {len(missing) - MAX_FINDINGS} more values not found in the source document"
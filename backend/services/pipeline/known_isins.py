@@ -0,0 +1,105 @@
+"""In-process Bloom filter of the ISINs already in ``products``.
+
+Lets the duplicate-ISIN checks skip the database round trip for ISINs that
+are certainly new. Enabled with ``ISIN_BLOOM_FILTER``: warmed from the
+database at startup and updated as products are persisted. Until it is warmed
+(or when disabled) every ISIN is reported as possibly known, so callers
+always fall back to the database.
+
+Only products persisted by this process are added. With several processes
+persisting (API replicas, queue workers), an ISIN stored by another process
+reads as new here until the next warm-up; the ``products`` primary key still
+rejects the duplicate at persist time.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from threading import Lock
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.db import session_scope
+from db.models.product import Product
+from utils.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+_lock = Lock()
+_filter: BloomFilter | None = None
+# ISINs persisted while a warm-up is reading the table; merged into its filter
+_pending: set[str] | None = None
+_skipped_lookups = 0
+
+
+def warm(db: Session) -> int:
+    """(Re)build the filter from every ISIN in ``products``; returns the count."""
+    global _filter, _pending
+    t0 = time.monotonic()
+    with _lock:
+        _pending = set()
+    try:
+        bloom = BloomFilter(settings.ISIN_BLOOM_CAPACITY, settings.ISIN_BLOOM_ERROR_RATE)
+        rows = db.execute(select(Product.product_isin).execution_options(yield_per=10_000)).scalars()
+        for isin in rows:
+            bloom.add(isin)
+        with _lock:
+            for isin in _pending:
+                bloom.add(isin)
+            _filter = bloom
+    finally:
+        with _lock:
+            _pending = None
+    if bloom.count > bloom.capacity:
+        logger.warning(
+            f"ISIN Bloom filter holds {bloom.count} ISINs, over its capacity of {bloom.capacity}; "
+            "raise ISIN_BLOOM_CAPACITY to keep false positives low"
+        )
+    logger.info(f"Warmed ISIN Bloom filter with {bloom.count} ISINs in {time.monotonic() - t0:.2f}s")
+    return bloom.count
+
+
+def warm_if_enabled() -> None:
+    """Warm the filter at process startup when ``ISIN_BLOOM_FILTER`` is set."""
+    if settings.ISIN_BLOOM_FILTER:
+        with session_scope() as db:
+            warm(db)
+
+
+def add(isin: str) -> None:
+    """Record a persisted ISIN (a rolled-back one only costs a false positive)."""
+    with _lock:
+        if _filter is not None:
+            _filter.add(isin)
+        if _pending is not None:
+            _pending.add(isin)
+
+
+def might_exist(isin: str) -> bool:
+    """False only if ``isin`` is certainly not in ``products``."""
+    global _skipped_lookups
+    with _lock:
+        if _filter is None or isin in _filter:
+            return True
+        _skipped_lookups += 1
+        return False
+
+
+def reset() -> None:
+    """Drop the filter; every ISIN reads as possibly known again."""
+    global _filter
+    with _lock:
+        _filter = None
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "warm": _filter is not None,
+            "isins": _filter.count if _filter else 0,
+            "size_bytes": _filter.size_bytes if _filter else 0,
+            "skipped_lookups": _skipped_lookups,
+        }
@@ -1,158 +1,290 @@
-"""Multi-step termsheet ingest pipeline (PDF → markdown → LLM → validate → persist)."""
+"""Multi-step termsheet ingest pipeline (PDF → markdown → LLM → validate → persist).
 
+The stages are registered in ``EXTRACTION_STAGES`` and run by the engine
+(``services.pipeline.engine``); ``run_sync``, ``run_events`` / ``stream`` and
+``resume_run`` are thin front-ends that differ only in how they report
+progress and map the terminal event.
+
+The pipeline does not take a request-scoped DB session: parsing and the LLM
+call can run for minutes, so a pooled connection is only checked out (via
+``session_scope``) for the validate and persist stages.
+
+Each run checkpoints its markdown, LLM output and validation result under a
+run id (``utils.run_store``); ``resume_run`` re-runs only validation and
+persistence for a validation-failed run with reviewer-corrected data. The
+markdown lives only in the run's checkpoint until the run is persisted, when
+it is saved under the product's ISIN and the checkpoints are deleted.
+"""
+
+import hashlib
 import logging
+import threading
 from typing import Generator
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
 
-from schemas.product import (
-    ExtractionResponse,
-    ValidationIssueOut,
-    ValidationResultOut,
-)
+from db.db import session_scope
+from schemas.product import ExtractionResponse
 from schemas.sse import (
+    SseAgentProgressEvent,
     SseCompleteEvent,
     SseErrorEvent,
-    SseProgressEvent,
+    SseEvent,
     SseValidationFailedEvent,
     sse_event,
 )
+from schemas.termsheet import TermsheetData
+from services.llm import ExtractionCancelled
+from utils import run_store
 from utils.markdown_store import save_markdown
-from services.llm import extract_termsheet_data
+from services.pipeline.dedupe import find_known_document, record_skip
+from services.pipeline.engine import PipelineContext, Stage, run_stages
 from services.pipeline.parse import extract_markdown
-from services.pipeline.persist import persist_extraction
+from services.pipeline.persist import persist_extraction, record_cancelled_run
+from services.pipeline.routing import stream_routed_extraction
 from services.pipeline.validate import validate_termsheet
 
 logger = logging.getLogger(__name__)
 
+# Overall progress band reported while the LLM agent runs
+LLM_PROGRESS_START = 50
+LLM_PROGRESS_END = 79
+
+
+# ── Stages ────────────────────────────────────────────────────────────────────
+
+
+def _parse(ctx: PipelineContext) -> None:
+    ctx.markdown_text = extract_markdown(ctx.contents, filename=ctx.filename)
+
+
+def _check_known_document(ctx: PipelineContext) -> SseEvent | None:
+    """Already ingested (same PDF or same ISIN)? Answer from the DB, skip the LLM."""
+    with session_scope() as db:
+        ctx.known = find_known_document(ctx.content_sha256, ctx.markdown_text, db)
+    if ctx.known is None:
+        return None
+    known = ctx.known
+    record_skip(known, ctx.filename)
+    payload = {
+        "filename": ctx.filename,
+        "size_bytes": len(ctx.contents),
+        "status": "already_extracted" if known.validation.is_valid else "validation_failed",
+        "product_isin": known.data.product.product_isin,
+        "approved": known.approved,
+        "data": known.data.model_dump(mode="json"),
+        "validation": known.validation.to_dict(),
+    }
+    if known.validation.is_valid:
+        return SseCompleteEvent(data=payload)
+    return SseValidationFailedEvent(data=payload)
+
+
+def _save_blob(ctx: PipelineContext) -> None:
+    """Checkpoint the markdown under a new run; it is the run's blob until persisted."""
+    ctx.run = run_store.create_run(ctx.filename, len(ctx.contents), ctx.content_sha256, ctx.markdown_text)
+    ctx.run.blob_path = run_store.markdown_blob_path(ctx.run.run_id)
+
+
+def _extract(ctx: PipelineContext) -> Generator[SseAgentProgressEvent, None, None]:
+    """Run the LLM agent, yielding an event per tool call / phase transition."""
+    progress_stream = stream_routed_extraction(ctx.markdown_text, ctx.cancel)
+    while True:
+        try:
+            progress = next(progress_stream)
+        except StopIteration as stop:
+            ctx.termsheet_data = stop.value
+            return None
+        yield SseAgentProgressEvent(
+            progress=LLM_PROGRESS_START + round(progress.fraction * (LLM_PROGRESS_END - LLM_PROGRESS_START)),
+            kind=progress.kind,
+            phase=progress.phase,
+            tool=progress.tool,
+            query=progress.query,
+        )
+
+
+def _checkpoint_extraction(ctx: PipelineContext) -> None:
+    """Checkpoint the LLM (or corrected) output."""
+    run = ctx.run
+    run_store.save_llm_output(run.run_id, ctx.termsheet_data)
+    run.status = "extracted"
+    run_store.update_run(run)
+
+
+def _validate(ctx: PipelineContext) -> SseEvent | None:
+    with session_scope() as db:
+        ctx.validation = validate_termsheet(ctx.termsheet_data, db, ctx.markdown_text, ctx.batch_isins)
+    run_store.save_validation(ctx.run.run_id, ctx.validation.to_dict())
+    if ctx.validation.is_valid:
+        return None
+    ctx.run.status = "validation_failed"
+    run_store.update_run(ctx.run)
+    return SseValidationFailedEvent(data=_result_payload(ctx, "validation_failed"))
+
+
+def _persist(ctx: PipelineContext) -> SseEvent:
+    """Save the markdown under its ISIN, persist the product, then drop the run's checkpoints."""
+    run = ctx.run
+    run.blob_path = save_markdown(ctx.termsheet_data.product.product_isin, run.filename, ctx.markdown_text)
+    with session_scope() as db:
+        persist_extraction(ctx.termsheet_data, run.filename, run.blob_path, "success", db, run.content_sha256)
+    run.status = "persisted"
+    run_store.update_run(run)
+    run_store.discard_checkpoints(run.run_id)
+    return SseCompleteEvent(data=_result_payload(ctx, "extracted"))
+
+
+def _result_payload(ctx: PipelineContext, status: str) -> dict:
+    return {
+        "filename": ctx.run.filename,
+        "size_bytes": ctx.run.size_bytes,
+        "status": status,
+        "product_isin": ctx.termsheet_data.product.product_isin,
+        "approved": False,
+        "data": ctx.termsheet_data.model_dump(mode="json"),
+        "validation": ctx.validation.to_dict(),
+        "run_id": ctx.run.run_id,
+    }
+
+
+PARSE = Stage("extracting_pdf", _parse, progress=15, errors=(ValueError,), error_message="PDF extraction failed")
+KNOWN_DOCUMENT = Stage("known_document", _check_known_document)
+SAVE_BLOB = Stage("saving_blob", _save_blob, progress=30)
+EXTRACT = Stage(
+    "llm_extraction", _extract, progress=LLM_PROGRESS_START,
+    errors=(Exception,), error_message="LLM extraction failed",
+)
+CHECKPOINT = Stage("checkpoint", _checkpoint_extraction)
+VALIDATE = Stage("validation", _validate, progress=80)
+PERSIST = Stage("persisting", _persist, progress=90)
+
+EXTRACTION_STAGES = [PARSE, KNOWN_DOCUMENT, SAVE_BLOB, EXTRACT, CHECKPOINT, VALIDATE, PERSIST]
+RESUME_STAGES = [CHECKPOINT, VALIDATE, PERSIST]
+
+
+# ── Front-ends ────────────────────────────────────────────────────────────────
+
+
+def _sha256(contents: bytes) -> str:
+    return hashlib.sha256(contents).hexdigest()
+
+
+def new_context(
+    contents: bytes,
+    filename: str,
+    cancel: threading.Event | None = None,
+    content_sha256: str | None = None,
+) -> PipelineContext:
+    """Context for a fresh run; ``content_sha256`` is computed if the caller hasn't."""
+    content_sha256 = content_sha256 or _sha256(contents)
+    logger.info(f"Running pipeline for {filename} (sha256 {content_sha256[:12]})")
+    return PipelineContext(filename=filename, contents=contents, content_sha256=content_sha256, cancel=cancel)
+
+
+def response_or_raise(events: Generator[SseEvent, None, None]) -> ExtractionResponse:
+    """Drive the engine to its terminal event and map it to the sync HTTP contract.
+
+    Raises:
+        HTTPException: 422 with the data + validation on validation failure
+            (no DB write), or with the message if parsing or the LLM failed.
+    """
+    terminal: SseEvent | None = None
+    for terminal in events:
+        pass
+    if isinstance(terminal, SseCompleteEvent):
+        return ExtractionResponse(**terminal.data, trace_id=terminal.trace_id)
+    if isinstance(terminal, SseValidationFailedEvent):
+        raise HTTPException(status_code=422, detail=terminal.data)
+    if isinstance(terminal, SseErrorEvent):
+        raise HTTPException(status_code=422, detail=terminal.message)
+    raise HTTPException(status_code=500, detail="Pipeline ended without a result")
+
 
 def run_sync(
-    contents: bytes, filename: str, db: Session
+    contents: bytes, filename: str, content_sha256: str | None = None
 ) -> ExtractionResponse:
-    """Run the full 7-step extraction pipeline synchronously."""
+    """Run the full extraction pipeline synchronously.
+
+    ``content_sha256`` is the upload's hash if the caller already computed it
+    while streaming the body; otherwise it is computed here.
+    """
+    ctx = new_context(contents, filename, content_sha256=content_sha256)
+    return response_or_raise(run_stages(ctx, EXTRACTION_STAGES))
+
+
+def resume_run(run_id: str, corrected: TermsheetData) -> ExtractionResponse:
+    """Re-run validation and persistence for a checkpointed run with corrected data.
 
-    # 1. PDF → markdown
+    Skips parsing and the LLM entirely: the run's markdown is taken from its
+    checkpoint and ``corrected`` replaces the LLM output. The run is claimed
+    for the duration, so concurrent resumes of one run get a 409 rather than
+    both persisting it.
+    """
+    if run_store.load_run(run_id) is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if not run_store.claim_run(run_id):
+        raise HTTPException(status_code=409, detail="Run is already being resumed")
     try:
-        markdown_text = extract_markdown(contents, filename=filename)
-    except ValueError as exc:
-        raise HTTPException(status_code=422, detail=str(exc))
+        run = run_store.load_run(run_id)  # re-read under the claim
+        if run.status == "persisted":
+            raise HTTPException(status_code=409, detail="Run has already been persisted")
+
+        logger.info(f"Resuming run {run_id} ({run.filename}) with corrected data")
+        ctx = PipelineContext(
+            filename=run.filename,
+            contents=b"",
+            content_sha256=run.content_sha256,
+            run=run,
+            markdown_text=run_store.load_markdown(run_id),
+            termsheet_data=corrected,
+        )
+        return response_or_raise(run_stages(ctx, RESUME_STAGES))
+    finally:
+        run_store.release_run(run_id)
 
-    # 2. Save markdown blob under "pending" before LLM call
-    save_markdown("pending", filename, markdown_text)
 
-    # 3. LLM extraction
+def pipeline_events(ctx: PipelineContext, stages: list[Stage]) -> Generator[SseEvent, None, None]:
+    """Run ``stages`` for ``ctx``, turning cancellation and unexpected errors into outcomes.
+
+    A cancelled run is recorded in extraction metadata and yields nothing
+    further; any other exception becomes a terminal error event.
+    """
     try:
-        termsheet_data = extract_termsheet_data(markdown_text)
+        yield from run_stages(ctx, stages)
+    except ExtractionCancelled:
+        logger.info(f"Extraction of '{ctx.filename}' cancelled during {ctx.stage}")
+        with session_scope() as db:
+            record_cancelled_run(ctx.filename, ctx.run.blob_path if ctx.run else None, ctx.stage, db)
     except Exception as exc:
-        logger.error(f"LLM extraction failed: {exc}")
-        raise HTTPException(status_code=422, detail=f"LLM extraction failed: {exc}")
-
-    # 4. Re-save under correct ISIN
-    blob_path = save_markdown(termsheet_data.product.product_isin, filename, markdown_text)
-
-    # 5. Validate
-    validation = validate_termsheet(termsheet_data, db)
-
-    # 6. If validation errors → return 422 with data + validation (no DB write)
-    if not validation.is_valid:
-        raise HTTPException(
-            status_code=422,
-            detail={
-                "filename": filename,
-                "size_bytes": len(contents),
-                "status": "validation_failed",
-                "product_isin": termsheet_data.product.product_isin,
-                "approved": False,
-                "data": termsheet_data.model_dump(mode="json"),
-                "validation": validation.to_dict(),
-            },
-        )
+        logger.exception(f"Unexpected error in extraction of '{ctx.filename}': {exc}")
+        yield SseErrorEvent(message=str(exc), trace_id=ctx.trace_id)
+
+
+def run_events(
+    contents: bytes,
+    filename: str,
+    cancel: threading.Event | None = None,
+    content_sha256: str | None = None,
+) -> Generator[SseEvent, None, None]:
+    """Run the extraction pipeline, yielding typed progress events.
+
+    The last event is always terminal (complete / validation_failed / error)
+    unless the run is cancelled.
 
-    # 7. Persist with approved=False
-    persist_extraction(termsheet_data, filename, blob_path, "success", db)
-
-    return ExtractionResponse(
-        filename=filename,
-        size_bytes=len(contents),
-        status="extracted",
-        product_isin=termsheet_data.product.product_isin,
-        approved=False,
-        data=termsheet_data.model_dump(mode="json"),
-        validation=ValidationResultOut(
-            is_valid=validation.is_valid,
-            issues=[
-                ValidationIssueOut(
-                    field=i.field, rule=i.rule, message=i.message, severity=i.severity,
-                )
-                for i in validation.issues
-            ],
-        ),
-    )
+    ``cancel`` is set by the route when the client disconnects; it is checked
+    between stages and between agent turns. A cancelled run is recorded in
+    extraction metadata and nothing is persisted.
+    """
+    yield from pipeline_events(new_context(contents, filename, cancel, content_sha256), EXTRACTION_STAGES)
 
 
 def stream(
-    contents: bytes, filename: str, db: Session
+    contents: bytes,
+    filename: str,
+    cancel: threading.Event | None = None,
+    content_sha256: str | None = None,
 ) -> Generator[str, None, None]:
     """SSE generator that runs the extraction pipeline and yields progress events."""
-    try:
-        # 1. PDF → markdown
-        yield sse_event(SseProgressEvent(stage="extracting_pdf", progress=15))
-        try:
-            markdown_text = extract_markdown(contents, filename=filename)
-        except ValueError as exc:
-            yield sse_event(SseErrorEvent(message=f"PDF extraction failed: {exc}"))
-            return
-
-        # 2. Save markdown blob under "pending"
-        yield sse_event(SseProgressEvent(stage="saving_blob", progress=30))
-        save_markdown("pending", filename, markdown_text)
-
-        # 3. LLM extraction (the slow step)
-        yield sse_event(SseProgressEvent(stage="llm_extraction", progress=50))
-        try:
-            termsheet_data = extract_termsheet_data(markdown_text)
-        except Exception as exc:
-            logger.error(f"LLM extraction failed: {exc}")
-            yield sse_event(SseErrorEvent(message=f"LLM extraction failed: {exc}"))
-            return
-
-        # 4. Re-save under correct ISIN
-        blob_path = save_markdown(termsheet_data.product.product_isin, filename, markdown_text)
-
-        # 5. Validate
-        yield sse_event(SseProgressEvent(stage="validation", progress=80))
-        validation = validate_termsheet(termsheet_data, db)
-
-        if not validation.is_valid:
-            yield sse_event(SseValidationFailedEvent(
-                data={
-                    "filename": filename,
-                    "size_bytes": len(contents),
-                    "status": "validation_failed",
-                    "product_isin": termsheet_data.product.product_isin,
-                    "approved": False,
-                    "data": termsheet_data.model_dump(mode="json"),
-                    "validation": validation.to_dict(),
-                },
-            ))
-            return
-
-        # 6. Persist
-        yield sse_event(SseProgressEvent(stage="persisting", progress=90))
-        persist_extraction(termsheet_data, filename, blob_path, "success", db)
-
-        yield sse_event(SseCompleteEvent(
-            data={
-                "filename": filename,
-                "size_bytes": len(contents),
-                "status": "extracted",
-                "product_isin": termsheet_data.product.product_isin,
-                "approved": False,
-                "data": termsheet_data.model_dump(mode="json"),
-                "validation": validation.to_dict(),
-            },
-        ))
-    except Exception as exc:
-        logger.exception(f"Unexpected error in extraction stream: {exc}")
-        yield sse_event(SseErrorEvent(message=str(exc)))
+    for event in run_events(contents, filename, cancel, content_sha256):
+        yield sse_event(event)
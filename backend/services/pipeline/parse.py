@@ -7,11 +7,20 @@ import logging
 import tempfile
 from pathlib import Path
 
+import pymupdf
 import pymupdf4llm
 
 logger = logging.getLogger(__name__)
 
 
+def _to_markdown(path: str) -> str:
+    # pymupdf reports unreadable files as FileDataError (a RuntimeError)
+    try:
+        return pymupdf4llm.to_markdown(path)
+    except pymupdf.FileDataError as exc:
+        raise ValueError(str(exc)) from exc
+
+
 def extract_markdown(pdf_bytes: bytes, filename: str = "document.pdf") -> str:
     """Extract structured markdown from a PDF.
 
@@ -36,7 +45,7 @@ def extract_markdown(pdf_bytes: bytes, filename: str = "document.pdf") -> str:
         tmp.flush()
 
         logger.info(f"Extracting markdown from '{filename}' ({len(pdf_bytes)} bytes)")
-        md_text = pymupdf4llm.to_markdown(tmp.name)
+        md_text = _to_markdown(tmp.name)
 
     if not md_text or not md_text.strip():
         raise ValueError(f"No text extracted from '{filename}' — the PDF may be image-only or corrupted")
@@ -63,7 +72,7 @@ def extract_markdown_from_path(pdf_path: str | Path) -> str:
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
     logger.info(f"Extracting markdown from '{pdf_path.name}'")
-    md_text = pymupdf4llm.to_markdown(str(pdf_path))
+    md_text = _to_markdown(str(pdf_path))
 
     if not md_text or not md_text.strip():
         raise ValueError(f"No text extracted from '{pdf_path.name}'")
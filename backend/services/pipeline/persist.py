@@ -1,7 +1,15 @@
-"""Transactional DB write for extracted termsheet data."""
+"""Transactional DB write for extracted termsheet data.
+
+The product and its metadata row go through the ORM; underlyings and events
+(30 to several thousand rows per product) are written with one Core
+``INSERT`` per table from plain dicts, which the driver sends as multi-row
+``VALUES`` batches (insertmanyvalues) without building an ORM object or
+unit-of-work entry per row. ``scripts/bench_persist.py`` compares the two.
+"""
 
 import datetime
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from db.models.event import Event
@@ -9,6 +17,7 @@ from db.models.extraction_metadata import ExtractionMetadata
 from db.models.product import Product
 from db.models.underlying import Underlying
 from schemas.termsheet import TermsheetData
+from services.pipeline import known_isins
 
 
 def persist_extraction(
@@ -17,10 +26,12 @@ def persist_extraction(
     blob_path: str,
     status: str,
     db: Session,
+    content_sha256: str | None = None,
 ) -> Product:
     """Create Product with child Events, Underlyings, and ExtractionMetadata.
 
-    Uses db.flush() so the caller (get_db dependency) handles commit/rollback.
+    Uses db.flush() so the caller (session_scope or get_db) handles commit/rollback.
+    The returned product's ``events`` and ``underlyings`` are loaded on access.
     """
     p = data.product
     product = Product(
@@ -36,25 +47,32 @@ def persist_extraction(
         approved=False,
     )
     db.add(product)
+    db.flush()  # the parent row must exist before the bulk child inserts
 
-    for u in data.underlyings:
-        db.add(Underlying(
-            product_isin=p.product_isin,
-            bbg_code=u.bbg_code,
-            weight=u.weight,
-            initial_price=u.initial_price,
-        ))
+    if data.underlyings:
+        db.execute(insert(Underlying.__table__), [
+            {
+                "product_isin": p.product_isin,
+                "bbg_code": u.bbg_code,
+                "weight": u.weight,
+                "initial_price": u.initial_price,
+            }
+            for u in data.underlyings
+        ])
 
-    for e in data.events:
-        db.add(Event(
-            product_isin=p.product_isin,
-            event_type=e.event_type,
-            event_level_pct=e.event_level_pct,
-            event_strike_pct=e.event_strike_pct,
-            event_date=e.event_date,
-            event_amount=e.event_amount,
-            event_payment_date=e.event_payment_date,
-        ))
+    if data.events:
+        db.execute(insert(Event.__table__), [
+            {
+                "product_isin": p.product_isin,
+                "event_type": e.event_type,
+                "event_level_pct": e.event_level_pct,
+                "event_strike_pct": e.event_strike_pct,
+                "event_date": e.event_date,
+                "event_amount": e.event_amount,
+                "event_payment_date": e.event_payment_date,
+            }
+            for e in data.events
+        ])
 
     db.add(ExtractionMetadata(
         product_isin=p.product_isin,
@@ -62,7 +80,29 @@ def persist_extraction(
         extracted_at=datetime.datetime.now(datetime.timezone.utc),
         status=status,
         blob_path=blob_path,
+        content_sha256=content_sha256,
     ))
 
     db.flush()
+    known_isins.add(p.product_isin)
     return product
+
+
+def record_cancelled_run(
+    source_filename: str,
+    blob_path: str | None,
+    stage: str,
+    db: Session,
+) -> ExtractionMetadata:
+    """Record an extraction abandoned before persistence (e.g. client disconnected)."""
+    metadata = ExtractionMetadata(
+        product_isin=None,
+        source_filename=source_filename,
+        extracted_at=datetime.datetime.now(datetime.timezone.utc),
+        status="cancelled",
+        error_message=f"Client disconnected during {stage}",
+        blob_path=blob_path,
+    )
+    db.add(metadata)
+    db.flush()
+    return metadata
@@ -0,0 +1,169 @@
+"""Revalidate the stored product book against the current validation rules.
+
+Products are read with a server-side cursor (``yield_per``) in chunks of
+``REVALIDATE_CHUNK_SIZE``, each chunk's underlyings and events with one
+``selectinload`` query per relationship. A chunk is converted to
+``TermsheetData``, the session is cleared, and the chunk is validated in a
+process pool of ``REVALIDATE_WORKERS`` with at most two chunks per worker in
+flight, so memory stays flat however large the book is.
+
+Only pure rules run: DB rules such as ``duplicate_isin`` would find each
+product itself. Results come back in ISIN order: one record per product with
+issues (every product with ``include_valid``), then a summary.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Generator, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from core.config import settings
+from db.db import session_scope
+from db.models.product import Product
+from schemas.revalidation import RevalidationRecord, RevalidationSummary
+from schemas.termsheet import TermsheetData
+from services.pipeline.validate import validate_many
+from services.products import stored_termsheet
+
+logger = logging.getLogger(__name__)
+
+# Chunks queued per worker; enough to keep workers busy while the next chunk is read
+_CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _schema_error(isin: str, exc: ValidationError) -> RevalidationRecord:
+    """A stored product that no longer fits ``TermsheetData`` at all."""
+    return RevalidationRecord(
+        product_isin=isin,
+        is_valid=False,
+        issues=[{
+            "field": ".".join(str(part) for part in error["loc"]),
+            "rule": "schema",
+            "message": error["msg"],
+            "severity": "error",
+        } for error in exc.errors()],
+    )
+
+
+def read_chunks(
+    db: Session, chunk_size: int
+) -> Iterator[tuple[list[TermsheetData], list[RevalidationRecord]]]:
+    """Stored products in ISIN order, ``chunk_size`` at a time.
+
+    Yields each chunk's termsheets and the records of products that fail
+    schema validation. The session is cleared after every chunk.
+    """
+    statement = (
+        select(Product)
+        .options(selectinload(Product.underlyings), selectinload(Product.events))
+        .order_by(Product.product_isin)
+        .execution_options(yield_per=chunk_size)
+    )
+    for partition in db.scalars(statement).partitions():
+        termsheets, failures = [], []
+        for product in partition:
+            try:
+                termsheets.append(stored_termsheet(product))
+            except ValidationError as exc:
+                failures.append(_schema_error(product.product_isin, exc))
+        db.expunge_all()
+        yield termsheets, failures
+
+
+def validate_chunk(termsheets: list[TermsheetData]) -> list[dict]:
+    """Pure rules over one chunk (runs in a worker process); ``to_dict()`` per termsheet."""
+    return [result.to_dict() for result in validate_many(termsheets, None, include_db_rules=False)]
+
+
+def _records(
+    termsheets: list[TermsheetData], results: list[dict], include_valid: bool
+) -> Iterator[RevalidationRecord]:
+    for data, result in zip(termsheets, results):
+        if result["issues"] or include_valid:
+            yield RevalidationRecord(
+                product_isin=data.product.product_isin, is_valid=result["is_valid"], issues=result["issues"]
+            )
+
+
+class _Tally:
+    def __init__(self) -> None:
+        self.products = 0
+        self.invalid = 0
+        self.with_warnings = 0
+        self.by_rule: Counter[str] = Counter()
+
+    def add(self, is_valid: bool, issues: list[dict]) -> None:
+        self.products += 1
+        self.invalid += not is_valid
+        self.with_warnings += any(i["severity"] == "warning" for i in issues)
+        self.by_rule.update(i["rule"] for i in issues)
+
+    def summary(self, elapsed: float, cancelled: bool) -> RevalidationSummary:
+        return RevalidationSummary(
+            products=self.products,
+            invalid=self.invalid,
+            with_warnings=self.with_warnings,
+            by_rule=dict(self.by_rule),
+            elapsed_seconds=round(elapsed, 3),
+            products_per_second=round(self.products / elapsed, 1) if elapsed else 0.0,
+            cancelled=cancelled,
+        )
+
+
+def run_revalidation(
+    cancel: threading.Event | None = None,
+    include_valid: bool = False,
+    chunk_size: int | None = None,
+    workers: int | None = None,
+) -> Generator[RevalidationRecord | RevalidationSummary, None, None]:
+    """Revalidate every stored product, yielding records in ISIN order and then a summary.
+
+    ``cancel`` stops reading further chunks (e.g. when the client disconnects);
+    closing the generator early has the same effect.
+    """
+    cancel = cancel or threading.Event()
+    chunk_size = chunk_size or settings.REVALIDATE_CHUNK_SIZE
+    workers = workers or settings.REVALIDATE_WORKERS
+    logger.info(f"Revalidating product book (chunks of {chunk_size}, {workers} workers)")
+    t0 = time.perf_counter()
+    tally = _Tally()
+    pending: deque[tuple[list[TermsheetData], list[RevalidationRecord], Future[list[dict]]]] = deque()
+
+    def finish_oldest() -> Iterator[RevalidationRecord]:
+        termsheets, failures, future = pending.popleft()
+        results = future.result()
+        for result in results:
+            tally.add(result["is_valid"], result["issues"])
+        for failure in failures:
+            tally.add(False, failure.issues)
+        yield from sorted([*failures, *_records(termsheets, results, include_valid)], key=lambda r: r.product_isin)
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        with session_scope() as db:
+            for termsheets, failures in read_chunks(db, chunk_size):
+                if cancel.is_set():
+                    break
+                pending.append((termsheets, failures, pool.submit(validate_chunk, termsheets)))
+                if len(pending) >= workers * _CHUNKS_IN_FLIGHT_PER_WORKER:
+                    yield from finish_oldest()
+        while pending and not cancel.is_set():
+            yield from finish_oldest()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    summary = tally.summary(time.perf_counter() - t0, cancel.is_set())
+    logger.info(
+        f"Revalidated {summary.products} products in {summary.elapsed_seconds:.1f}s: "
+        f"{summary.invalid} invalid, {summary.with_warnings} with warnings ({summary.by_rule})"
+    )
+    yield summary
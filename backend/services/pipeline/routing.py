@@ -0,0 +1,165 @@
+"""Cheap/expensive model routing for the LLM extraction step.
+
+When ``settings.LLM_FAST_MODEL`` is configured, every document is first sent
+to the fast model. The run escalates to ``settings.LLM_MODEL`` only if the
+fast model's structured output fails ``TermsheetData`` parsing or the result
+fails the field and schema rules. Database rules (duplicate ISIN) are left
+to the validation stage: a stronger model can't fix them. Routing outcomes
+are recorded per issuer.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from threading import Lock
+from typing import Generator, Iterator
+
+from core.config import settings
+from schemas.termsheet import TermsheetData
+from services.llm import AgentProgress, ExtractionCancelled, stream_termsheet_extraction
+from services.pipeline.validate import validate_many
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IssuerRoutingStats:
+    runs: int = 0
+    escalations: int = 0
+    fast_seconds: float = 0.0
+    primary_seconds: float = 0.0
+    seconds_saved: float = 0.0  # net of fast-model time wasted on escalations
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalations / self.runs if self.runs else 0.0
+
+
+_lock = Lock()
+_stats: dict[str, IssuerRoutingStats] = {}
+_primary_runs = 0
+_primary_seconds = 0.0
+
+
+def _escalation_reason(data: TermsheetData) -> str | None:
+    """Return why the fast model's result should be escalated, or None to accept it."""
+    [validation] = validate_many([data], None, include_db_rules=False)
+    rules = sorted({i.rule for i in validation.issues if i.severity == "error"})
+    if rules:
+        return f"validation errors: {', '.join(rules)}"
+    return None
+
+
+def _record_primary_latency(elapsed: float) -> None:
+    """Update the primary-model latency baseline used to estimate time saved."""
+    global _primary_runs, _primary_seconds
+    with _lock:
+        _primary_runs += 1
+        _primary_seconds += elapsed
+
+
+def mean_primary_latency() -> float | None:
+    """Mean wall time of a primary-model extraction, or None if none has run yet."""
+    with _lock:
+        return _primary_seconds / _primary_runs if _primary_runs else None
+
+
+def _record(issuer: str, fast_elapsed: float, primary_elapsed: float | None) -> float:
+    """Record a routed run and return the estimated seconds saved (negative if wasted)."""
+    if primary_elapsed is not None:
+        _record_primary_latency(primary_elapsed)
+        saved = -fast_elapsed
+    else:
+        baseline = mean_primary_latency()
+        saved = baseline - fast_elapsed if baseline is not None else 0.0
+    with _lock:
+        stats = _stats.setdefault(issuer, IssuerRoutingStats())
+        stats.runs += 1
+        stats.fast_seconds += fast_elapsed
+        if primary_elapsed is not None:
+            stats.escalations += 1
+            stats.primary_seconds += primary_elapsed
+        stats.seconds_saved += saved
+    return saved
+
+
+def routing_stats() -> dict[str, dict]:
+    """Snapshot of routing decisions, escalation rate and latency saved per issuer."""
+    with _lock:
+        return {
+            issuer: {**asdict(stats), "escalation_rate": stats.escalation_rate}
+            for issuer, stats in _stats.items()
+        }
+
+
+class _Relay:
+    """Relays an agent run's progress with its fraction mapped into [start, 1]."""
+
+    def __init__(self, start: float = 0.0) -> None:
+        self.start = start
+        self.fraction = start  # latest fraction relayed
+
+    def __call__(self, stream: Iterator[AgentProgress]) -> Generator[AgentProgress, None, TermsheetData]:
+        try:
+            while True:
+                try:
+                    progress = next(stream)
+                except StopIteration as stop:
+                    return stop.value
+                self.fraction = self.start + progress.fraction * (1.0 - self.start)
+                yield replace(progress, fraction=self.fraction)
+        finally:
+            stream.close()
+
+
+def stream_routed_extraction(
+    markdown_text: str, cancel: threading.Event | None = None
+) -> Generator[AgentProgress, None, TermsheetData]:
+    """Run the extraction agent with fast-model-first routing.
+
+    Yields the agent's progress like ``stream_termsheet_extraction``; if the
+    run escalates, a ``phase="escalation"`` event precedes the primary run,
+    whose progress continues from where the fast run stopped.
+    """
+    t0 = time.monotonic()
+    if not settings.LLM_FAST_MODEL:
+        data = yield from stream_termsheet_extraction(markdown_text, cancel=cancel)
+        _record_primary_latency(time.monotonic() - t0)
+        return data
+
+    data: TermsheetData | None = None
+    fast = _Relay()
+    try:
+        data = yield from fast(stream_termsheet_extraction(
+            markdown_text, model_name=settings.LLM_FAST_MODEL, cancel=cancel,
+        ))
+        reason = _escalation_reason(data)
+    except ExtractionCancelled:
+        raise
+    except Exception as exc:
+        reason = f"structured output failed: {exc}"
+    fast_elapsed = time.monotonic() - t0
+
+    if reason is None:
+        issuer = data.product.issuer or "unknown"
+        saved = _record(issuer, fast_elapsed, None)
+        logger.info(
+            "Routing [%s]: fast model %s accepted in %.1fs (saved ~%.1fs)",
+            issuer, settings.LLM_FAST_MODEL, fast_elapsed, saved,
+        )
+        return data
+
+    logger.warning("Routing: escalating to %s after %.1fs — %s", settings.LLM_MODEL, fast_elapsed, reason)
+    yield AgentProgress(kind="phase", phase="escalation", fraction=fast.fraction)
+    t1 = time.monotonic()
+    data = yield from _Relay(start=fast.fraction)(stream_termsheet_extraction(markdown_text, cancel=cancel))
+    primary_elapsed = time.monotonic() - t1
+
+    issuer = data.product.issuer or "unknown"
+    _record(issuer, fast_elapsed, primary_elapsed)
+    logger.info("Routing [%s]: primary model %s returned in %.1fs", issuer, settings.LLM_MODEL, primary_elapsed)
+    return data
+
@@ -0,0 +1,255 @@
+"""Vectorized consistency checks over a termsheet's event schedule.
+
+``TermsheetData.events`` is converted once into NumPy arrays (event type code,
+observation date, payment date, level) and every schedule rule works on those
+arrays, so a daily-observation product with thousands of rows costs a few
+array operations rather than a Python loop per rule.
+
+The checks yield ``(field, message)`` findings like the other rules in
+``validate.RULES``; a rule reports at most ``MAX_FINDINGS`` rows and then one
+line counting the rest, so a systematically wrong schedule stays readable.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+from schemas.termsheet import Event, TermsheetData
+
+Findings = Iterator[tuple[str, str]]
+
+# Rows reported per rule before the rest are summarised
+MAX_FINDINGS = 10
+
+# Schedules kept converted between rules; validate_many runs rule by rule over a batch
+_CACHE_SIZE = 2048
+
+# Event types whose levels are barriers, as a percentage of the initial level
+BARRIER_TYPES = ("coupon", "knock_in")
+
+# Nominal spacing in days of the observation frequencies we see in termsheets
+FREQUENCIES: dict[str, float] = {
+    "daily": 1.0,
+    "weekly": 7.0,
+    "monthly": 365.25 / 12,
+    "quarterly": 365.25 / 4,
+    "semi-annual": 365.25 / 2,
+    "annual": 365.25,
+}
+
+# A gap is irregular when it is further than this from the inferred spacing:
+# business-day adjustment moves dates by a few days, and daily schedules skip
+# weekends and holidays
+MIN_SPACING_TOLERANCE_DAYS = 4
+SPACING_TOLERANCE = 0.2
+
+
+@dataclass(frozen=True)
+class EventArrays:
+    """Column view of a schedule; row ``i`` is ``events[i]``."""
+
+    types: np.ndarray  # int codes into ``type_names``
+    type_names: np.ndarray
+    dates: np.ndarray  # datetime64[D]
+    payment_dates: np.ndarray  # datetime64[D], NaT when absent
+    levels: np.ndarray  # float64, NaN when absent
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def of_type(self, event_type: str) -> np.ndarray:
+        """Row indices of ``event_type``, in schedule order."""
+        matches = np.flatnonzero(self.type_names == event_type)
+        return np.flatnonzero(self.types == matches[0]) if matches.size else matches
+
+    @classmethod
+    def from_events(cls, events: list[Event]) -> EventArrays:
+        type_names, types = np.unique(np.array([e.event_type for e in events], dtype=str), return_inverse=True)
+        return cls(
+            types=types,
+            type_names=type_names,
+            dates=np.array([e.event_date for e in events], dtype="datetime64[D]"),
+            payment_dates=np.array([e.event_payment_date for e in events], dtype="datetime64[D]"),
+            levels=np.array([e.event_level_pct for e in events], dtype=np.float64),
+        )
+
+
+ScheduleKey = tuple[tuple, ...]
+
+_cache: OrderedDict[ScheduleKey, EventArrays] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _schedule_key(events: list[Event]) -> ScheduleKey:
+    """The fields the arrays are built from, so equal schedules share arrays and edits miss."""
+    return tuple((e.event_type, e.event_date, e.event_payment_date, e.event_level_pct) for e in events)
+
+
+def event_arrays(data: TermsheetData) -> EventArrays:
+    """``data.events`` as arrays, converted once per schedule across rules."""
+    key = _schedule_key(data.events)
+    with _cache_lock:
+        arrays = _cache.get(key)
+        if arrays is not None:
+            _cache.move_to_end(key)
+            return arrays
+    arrays = EventArrays.from_events(data.events)
+    with _cache_lock:
+        _cache[key] = arrays
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return arrays
+
+
+def _capped(rows: np.ndarray, finding) -> Findings:
+    """``finding(row)`` for the first ``MAX_FINDINGS`` rows, then a count of the rest."""
+    for row in rows[:MAX_FINDINGS]:
+        yield finding(int(row))
+    if rows.size > MAX_FINDINGS:
+        yield "events", f"... and {rows.size - MAX_FINDINGS} more"
+
+
+def _by_type_then_date(arrays: EventArrays) -> np.ndarray:
+    return np.lexsort((np.arange(len(arrays)), arrays.dates, arrays.types))
+
+
+# ── Checks ────────────────────────────────────────────────────────────────────
+
+
+def barrier_range(data: TermsheetData) -> Findings:
+    arrays = event_arrays(data)
+    barrier = np.isin(arrays.type_names[arrays.types], BARRIER_TYPES)
+    rows = np.flatnonzero(barrier & ((arrays.levels < 0) | (arrays.levels > 100)))
+    yield from _capped(rows, lambda i: (
+        f"events[{i}].event_level_pct", f"Event level {float(arrays.levels[i])}% is outside 0-100 range"
+    ))
+
+
+def event_within_lifetime(data: TermsheetData) -> Findings:
+    product = data.product
+    arrays = event_arrays(data)
+    issue, maturity = np.datetime64(product.issue_date, "D"), np.datetime64(product.maturity, "D")
+    rows = np.flatnonzero((arrays.dates < issue) | (arrays.dates > maturity))
+    yield from _capped(rows, lambda i: (
+        f"events[{i}].event_date",
+        f"Event date {arrays.dates[i]} is outside product lifetime ({product.issue_date} to {product.maturity})",
+    ))
+
+
+def duplicate_dates(data: TermsheetData) -> Findings:
+    """Two rows of the same event type on the same observation date."""
+    arrays = event_arrays(data)
+    order = _by_type_then_date(arrays)
+    types, dates = arrays.types[order], arrays.dates[order]
+    repeat = np.zeros(len(order), dtype=bool)
+    repeat[1:] = (types[1:] == types[:-1]) & (dates[1:] == dates[:-1])
+    run_start = np.maximum.accumulate(np.where(repeat, 0, np.arange(len(order))))
+    first = dict(zip(order[repeat].tolist(), order[run_start[repeat]].tolist()))
+    yield from _capped(np.sort(order[repeat]), lambda i: (
+        f"events[{i}].event_date",
+        f"Duplicate {arrays.type_names[arrays.types[i]]} event on {arrays.dates[i]} (same date as events[{first[i]}])",
+    ))
+
+
+def schedule_order(data: TermsheetData) -> Findings:
+    """Rows of one event type listed out of date order."""
+    arrays = event_arrays(data)
+    order = np.lexsort((np.arange(len(arrays)), arrays.types))  # grouped by type, schedule order
+    types, dates = arrays.types[order], arrays.dates[order]
+    backwards = (types[1:] == types[:-1]) & (dates[1:] < dates[:-1])
+    yield from _capped(np.sort(order[1:][backwards]), lambda i: (
+        f"events[{i}].event_date",
+        f"{arrays.type_names[arrays.types[i]].capitalize()} event on {arrays.dates[i]} "
+        f"is listed after a later one",
+    ))
+
+
+def payment_lag(data: TermsheetData) -> Findings:
+    """Payment dates before their observation date."""
+    arrays = event_arrays(data)
+    rows = np.flatnonzero(arrays.payment_dates < arrays.dates)  # NaT compares False
+    yield from _capped(rows, lambda i: (
+        f"events[{i}].event_payment_date",
+        f"Payment date {arrays.payment_dates[i]} is before the observation date {arrays.dates[i]}",
+    ))
+
+
+def infer_frequency(gaps: np.ndarray) -> tuple[str, float]:
+    """Name and nominal spacing of the frequency closest to the median gap (in days)."""
+    median = float(np.median(gaps))
+    names = list(FREQUENCIES)
+    nominal = np.array([FREQUENCIES[name] for name in names])
+    nearest = int(np.argmin(np.abs(np.log(nominal / max(median, 0.5)))))
+    if abs(nominal[nearest] - median) <= max(MIN_SPACING_TOLERANCE_DAYS, SPACING_TOLERANCE * nominal[nearest]):
+        return names[nearest], float(nominal[nearest])
+    return f"every ~{median:g} days", median
+
+
+def schedule_spacing(data: TermsheetData) -> Findings:
+    """Gaps between consecutive dates of an event type that don't fit its inferred frequency.
+
+    A gap close to a multiple of the frequency usually means missing rows.
+    Types with fewer than three dates have no frequency to infer.
+    """
+    arrays = event_arrays(data)
+    rows, messages = [], []
+    for code, event_type in enumerate(arrays.type_names):
+        indices = np.flatnonzero(arrays.types == code)
+        indices = indices[np.argsort(arrays.dates[indices], kind="stable")]
+        if indices.size < 3:
+            continue
+        gaps = np.diff(arrays.dates[indices]).astype(np.int64)
+        name, period = infer_frequency(gaps)
+        tolerance = max(MIN_SPACING_TOLERANCE_DAYS, SPACING_TOLERANCE * period)
+        for gap_index in np.flatnonzero(np.abs(gaps - period) > tolerance):
+            gap = int(gaps[gap_index])
+            start, end = indices[gap_index], indices[gap_index + 1]
+            missing = round(gap / period) - 1
+            hint = f"; {missing} {event_type} row(s) may be missing" if missing >= 1 else ""
+            rows.append(int(end))
+            messages.append(
+                f"{gap} days between {event_type} events on {arrays.dates[start]} and {arrays.dates[end]}, "
+                f"expected ~{period:.0f} ({name}){hint}"
+            )
+    by_row = dict(zip(rows, messages))
+    yield from _capped(np.array(sorted(by_row), dtype=np.int64), lambda i: (f"events[{i}].event_date", by_row[i]))
+
+
+def level_consistency(data: TermsheetData) -> Findings:
+    """Barrier levels ordered as a Phoenix-style structure expects across event types.
+
+    The knock-in barrier should not sit above a coupon barrier, and a coupon
+    barrier should not sit above the autocall trigger observed on the same date.
+    """
+    arrays = event_arrays(data)
+    knock_in, coupon, autocall = (arrays.of_type(t) for t in ("knock_in", "coupon", "auto_early_redemption"))
+    knock_in = knock_in[~np.isnan(arrays.levels[knock_in])]
+    coupon = coupon[~np.isnan(arrays.levels[coupon])]
+    autocall = autocall[~np.isnan(arrays.levels[autocall])]
+
+    if knock_in.size and coupon.size:
+        lowest_coupon = coupon[np.argmin(arrays.levels[coupon])]
+        above = knock_in[arrays.levels[knock_in] > arrays.levels[lowest_coupon]]
+        yield from _capped(above, lambda i: (
+            f"events[{i}].event_level_pct",
+            f"Knock-in barrier {arrays.levels[i]:g}% is above the coupon barrier "
+            f"{arrays.levels[lowest_coupon]:g}% (events[{lowest_coupon}])",
+        ))
+
+    if coupon.size and autocall.size:
+        _, in_coupon, in_autocall = np.intersect1d(
+            arrays.dates[coupon], arrays.dates[autocall], assume_unique=False, return_indices=True
+        )
+        pairs = np.column_stack((coupon[in_coupon], autocall[in_autocall]))
+        above = pairs[arrays.levels[pairs[:, 0]] > arrays.levels[pairs[:, 1]]]
+        trigger = dict(above.tolist())
+        yield from _capped(above[:, 0], lambda i: (
+            f"events[{i}].event_level_pct",
+            f"Coupon barrier {arrays.levels[i]:g}% on {arrays.dates[i]} is above the autocall trigger "
+            f"{arrays.levels[trigger[i]]:g}% (events[{trigger[i]}])",
+        ))
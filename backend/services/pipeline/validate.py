@@ -1,15 +1,51 @@
-"""Business-rule validation for extracted termsheet data."""
+"""Business-rule validation for extracted termsheet data.
+
+Rules are declared once in ``RULES`` with their severity, the rules they
+depend on and whether they query the database. Pure rules run before DB
+rules, and a rule is skipped when one it depends on reported an issue (or was
+itself skipped), e.g. no checksum check on a malformed ISIN. Each rule's run
+time is recorded in the ``validation_rule_duration_seconds`` histogram.
+Event-schedule rules live in ``schedule`` and work on NumPy arrays.
+Given the source markdown, ``validate_termsheet`` also warns about extracted
+values that don't occur in it (``grounding``).
+
+``validate_many`` runs rule by rule over a whole batch, using a rule's
+set-based ``check_many`` where it has one: the duplicate-ISIN check is then a
+single ``= ANY(:isins)`` query that also catches repeats within the batch.
+Batch files are validated one at a time as they finish, so they share a
+``BatchIsins`` instead: it looks up the ISINs extracted so far together and
+reports the second file of the batch with an ISIN as a repeat.
+"""
 
 from __future__ import annotations
 
 import re
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Literal
+from typing import Callable, Iterable, Iterator, Literal
 
+from sqlalchemy import String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 
+from core.config import settings
+from core.metrics import histogram
 from db.models.product import Product
 from schemas.termsheet import TermsheetData
+from services.pipeline import grounding, known_isins, schedule
+
+Severity = Literal["error", "warning"]
+
+# Rules take microseconds; DB rules a round trip
+RULE_BUCKETS: tuple[float, ...] = (1e-6, 1e-5, 1e-4, 1e-3, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+RULE_DURATION = histogram(
+    "validation_rule_duration_seconds",
+    "Time spent in each validation rule per validation pass (one termsheet or a batch)",
+    ("rule",),
+    RULE_BUCKETS,
+)
 
 
 @dataclass
@@ -17,12 +53,14 @@ class ValidationIssue:
     field: str
     rule: str
     message: str
-    severity: Literal["error", "warning"]
+    severity: Severity
 
 
 @dataclass
 class ValidationResult:
     issues: list[ValidationIssue] = field(default_factory=list)
+    # Run time of each rule for this termsheet; not part of the API payload
+    rule_seconds: dict[str, float] = field(default_factory=dict)
 
     @property
     def is_valid(self) -> bool:
@@ -63,69 +101,277 @@ def _check_isin_luhn(isin: str) -> bool:
     return total % 10 == 0
 
 
-def validate_termsheet(data: TermsheetData, db: Session) -> ValidationResult:
-    """Run all business-rule checks against extracted data."""
-    result = ValidationResult()
-    product = data.product
+def is_valid_isin(isin: str) -> bool:
+    """Well-formed ISIN whose check digit is correct."""
+    return _check_isin_format(isin) and _check_isin_luhn(isin)
+
+
+# ── Rules ─────────────────────────────────────────────────────────────────────
 
-    # isin_format
-    if not _check_isin_format(product.product_isin):
-        result.issues.append(ValidationIssue(
-            field="product_isin", rule="isin_format",
-            message=f"ISIN '{product.product_isin}' does not match expected format (2 letters + 9 alphanumeric + 1 digit)",
-            severity="error",
-        ))
-
-    # isin_luhn
-    if _check_isin_format(product.product_isin) and not _check_isin_luhn(product.product_isin):
-        result.issues.append(ValidationIssue(
-            field="product_isin", rule="isin_luhn",
-            message=f"ISIN '{product.product_isin}' fails Luhn checksum validation",
-            severity="error",
-        ))
-
-    # issue_before_maturity
+# A check yields (field, message) for each violation it finds
+Findings = Iterator[tuple[str, str]]
+
+
+def _isin_format(data: TermsheetData) -> Findings:
+    isin = data.product.product_isin
+    if not _check_isin_format(isin):
+        yield "product_isin", f"ISIN '{isin}' does not match expected format (2 letters + 9 alphanumeric + 1 digit)"
+
+
+def _isin_luhn(data: TermsheetData) -> Findings:
+    isin = data.product.product_isin
+    if not _check_isin_luhn(isin):
+        yield "product_isin", f"ISIN '{isin}' fails Luhn checksum validation"
+
+
+def _issue_before_maturity(data: TermsheetData) -> Findings:
+    product = data.product
     if product.issue_date >= product.maturity:
-        result.issues.append(ValidationIssue(
-            field="issue_date", rule="issue_before_maturity",
-            message=f"Issue date ({product.issue_date}) must be before maturity ({product.maturity})",
-            severity="error",
-        ))
+        yield "issue_date", f"Issue date ({product.issue_date}) must be before maturity ({product.maturity})"
+
 
-    # min_underlyings
+def _min_underlyings(data: TermsheetData) -> Findings:
     if len(data.underlyings) < 1:
-        result.issues.append(ValidationIssue(
-            field="underlyings", rule="min_underlyings",
-            message="At least one underlying is required",
-            severity="error",
-        ))
-
-    # barrier_range — check coupon and knock_in event_level_pct
-    for i, event in enumerate(data.events):
-        if event.event_type in ("coupon", "knock_in") and event.event_level_pct is not None:
-            if not (0 <= event.event_level_pct <= 100):
-                result.issues.append(ValidationIssue(
-                    field=f"events[{i}].event_level_pct", rule="barrier_range",
-                    message=f"Event level {event.event_level_pct}% is outside 0-100 range",
-                    severity="error",
-                ))
-
-    # duplicate_isin
-    existing = db.query(Product).filter_by(product_isin=product.product_isin).first()
-    if existing:
-        result.issues.append(ValidationIssue(
-            field="product_isin", rule="duplicate_isin",
-            message=f"Product with ISIN '{product.product_isin}' already exists in the database",
-            severity="error",
-        ))
-
-    # event_within_lifetime (warning)
-    for i, event in enumerate(data.events):
-        if event.event_date < product.issue_date or event.event_date > product.maturity:
-            result.issues.append(ValidationIssue(
-                field=f"events[{i}].event_date", rule="event_within_lifetime",
-                message=f"Event date {event.event_date} is outside product lifetime ({product.issue_date} to {product.maturity})",
-                severity="warning",
-            ))
+        yield "underlyings", "At least one underlying is required"
+
+
+def _exists_message(isin: str) -> str:
+    return f"Product with ISIN '{isin}' already exists in the database"
+
+
+def _duplicate_isin(data: TermsheetData, db: Session) -> Findings:
+    isin = data.product.product_isin
+    if not known_isins.might_exist(isin):
+        return
+    if db.scalar(select(Product.product_isin).where(Product.product_isin == isin).limit(1)) is not None:
+        yield "product_isin", _exists_message(isin)
+
+
+def existing_isins(isins: set[str], db: Session) -> set[str]:
+    """Which of ``isins`` are in ``products``, in one query (none for certainly-new ones)."""
+    candidates = sorted(isin for isin in isins if known_isins.might_exist(isin))
+    if not candidates:
+        return set()
+    param = bindparam("isins", candidates, type_=ARRAY(String))
+    return set(db.scalars(select(Product.product_isin).where(Product.product_isin == any_(param))))
+
+
+def _repeat_message(isin: str) -> str:
+    return f"ISIN '{isin}' appears more than once in this batch"
+
+
+class BatchIsins:
+    """The ISINs of one batch whose files are validated one at a time.
+
+    Files register their ISIN once it is extracted (``expect``); a file being
+    validated looks up every registered ISIN not yet looked up in one
+    ``existing_isins`` query, and later files reuse the answer. The first file
+    to ``claim`` an ISIN owns it, later ones are repeats.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._expected: set[str] = set()
+        self._existing: dict[str, bool] = {}
+        self._claimed: set[str] = set()
+
+    def expect(self, isin: str) -> None:
+        with self._lock:
+            if isin not in self._existing:
+                self._expected.add(isin)
+
+    def exists(self, isin: str, db: Session) -> bool:
+        """Whether ``isin`` is in ``products``; held across the query so each ISIN is looked up once."""
+        with self._lock:
+            if isin not in self._existing:
+                lookup = self._expected | {isin}
+                self._expected = set()
+                found = existing_isins(lookup, db)
+                self._existing.update((i, i in found) for i in lookup)
+            return self._existing[isin]
+
+    def claim(self, isin: str) -> bool:
+        """Claim ``isin`` for the calling file; False if another file of the batch has it."""
+        with self._lock:
+            if isin in self._claimed:
+                return False
+            self._claimed.add(isin)
+            return True
+
+
+def _duplicate_isin_in_batch(data: TermsheetData, db: Session, batch: BatchIsins) -> Findings:
+    isin = data.product.product_isin
+    if batch.exists(isin, db):
+        yield "product_isin", _exists_message(isin)
+    elif not batch.claim(isin):
+        yield "product_isin", _repeat_message(isin)
+
+
+def _duplicate_isins(items: list[TermsheetData], db: Session) -> list[list[tuple[str, str]]]:
+    isins = [data.product.product_isin for data in items]
+    existing = existing_isins(set(isins), db)
+    seen: set[str] = set()
+    findings = []
+    for isin in isins:
+        if isin in existing:
+            findings.append([("product_isin", _exists_message(isin))])
+        elif isin in seen:
+            findings.append([("product_isin", _repeat_message(isin))])
+        else:
+            findings.append([])
+        seen.add(isin)
+    return findings
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One business rule.
+
+    Args:
+        name: Rule id reported on its issues.
+        severity: Severity of every issue the rule reports.
+        check: Yields ``(field, message)`` per violation; called with the DB
+            session as second argument when ``needs_db``.
+        depends_on: Rules that must have passed for this one to run.
+        needs_db: Queries the database; DB rules run after all pure rules.
+        check_many: Optional set-based form used by ``validate_many``: takes
+            the items (and session) and returns the findings of each item.
+        check_in_batch: Optional form used instead of ``check`` when the
+            item is one file of a running batch: takes the item, the session
+            and the batch's ``BatchIsins``.
+    """
+
+    name: str
+    severity: Severity
+    check: Callable[..., Iterable[tuple[str, str]]]
+    depends_on: tuple[str, ...] = ()
+    needs_db: bool = False
+    check_many: Callable[..., list[list[tuple[str, str]]]] | None = None
+    check_in_batch: Callable[..., Iterable[tuple[str, str]]] | None = None
+
+
+RULES = [
+    Rule("isin_format", "error", _isin_format),
+    Rule("isin_luhn", "error", _isin_luhn, depends_on=("isin_format",)),
+    Rule("issue_before_maturity", "error", _issue_before_maturity),
+    Rule("min_underlyings", "error", _min_underlyings),
+    Rule("barrier_range", "error", schedule.barrier_range),
+    Rule("event_within_lifetime", "warning", schedule.event_within_lifetime, depends_on=("issue_before_maturity",)),
+    Rule("duplicate_dates", "error", schedule.duplicate_dates),
+    Rule("payment_lag", "error", schedule.payment_lag),
+    Rule("schedule_order", "warning", schedule.schedule_order),
+    Rule("schedule_spacing", "warning", schedule.schedule_spacing, depends_on=("duplicate_dates",)),
+    Rule("level_consistency", "warning", schedule.level_consistency, depends_on=("barrier_range",)),
+    Rule(
+        "duplicate_isin", "error", _duplicate_isin,
+        depends_on=("isin_format", "isin_luhn"), needs_db=True,
+        check_many=_duplicate_isins, check_in_batch=_duplicate_isin_in_batch,
+    ),
+]
+
+
+def _execution_order(rules: list[Rule]) -> list[Rule]:
+    """Pure rules first, otherwise in declaration order; dependencies must come earlier."""
+    ordered = sorted(rules, key=lambda r: r.needs_db)
+    seen: set[str] = set()
+    for rule in ordered:
+        missing = set(rule.depends_on) - seen
+        if missing:
+            raise ValueError(f"Rule '{rule.name}' depends on {sorted(missing)}, which must run before it")
+        seen.add(rule.name)
+    return ordered
+
+
+_EXECUTION_ORDER = _execution_order(RULES)
+
+
+# ── Entry points ──────────────────────────────────────────────────────────────
+
+
+def _issues(rule: Rule, findings: Iterable[tuple[str, str]]) -> list[ValidationIssue]:
+    return [ValidationIssue(field=f, rule=rule.name, message=message, severity=rule.severity) for f, message in findings]
+
+
+def _validate(
+    items: list[TermsheetData],
+    db: Session | None,
+    set_based: bool,
+    include_db_rules: bool = True,
+    batch: BatchIsins | None = None,
+) -> list[ValidationResult]:
+    results = [ValidationResult() for _ in items]
+    # per item: rules that reported an issue or were skipped
+    blocked: list[set[str]] = [set() for _ in items]
+    for rule in _EXECUTION_ORDER:
+        if rule.needs_db and not include_db_rules:
+            continue
+        rule_t0 = time.perf_counter()
+        active = []
+        for index, item_blocked in enumerate(blocked):
+            if item_blocked.intersection(rule.depends_on):
+                item_blocked.add(rule.name)
+            else:
+                active.append(index)
+
+        if set_based and rule.check_many is not None and active:
+            t0 = time.perf_counter()
+            args = ([items[i] for i in active], db) if rule.needs_db else ([items[i] for i in active],)
+            per_item = [_issues(rule, findings) for findings in rule.check_many(*args)]
+            share = (time.perf_counter() - t0) / len(active)
+            for index, issues in zip(active, per_item):
+                results[index].rule_seconds[rule.name] = share
+                results[index].issues.extend(issues)
+                if issues:
+                    blocked[index].add(rule.name)
+        else:
+            for index in active:
+                t0 = time.perf_counter()
+                data = items[index]
+                if batch is not None and rule.check_in_batch is not None:
+                    findings = rule.check_in_batch(data, db, batch)
+                else:
+                    findings = rule.check(data, db) if rule.needs_db else rule.check(data)
+                issues = _issues(rule, findings)
+                results[index].rule_seconds[rule.name] = time.perf_counter() - t0
+                results[index].issues.extend(issues)
+                if issues:
+                    blocked[index].add(rule.name)
+        RULE_DURATION.observe(time.perf_counter() - rule_t0, rule=rule.name)
+    return results
+
+
+def validate_many(
+    items: list[TermsheetData], db: Session | None, include_db_rules: bool = True
+) -> list[ValidationResult]:
+    """Validate several termsheets in one pass, one result per item in order.
+
+    Each rule runs over the whole list before the next rule starts, so its
+    time is recorded once per pass, and set-based rules (``check_many``) see
+    the whole batch: repeats of an ISIN within ``items`` are reported too.
+    Without ``include_db_rules`` only pure rules run and ``db`` may be None.
+    """
+    return _validate(items, db, set_based=True, include_db_rules=include_db_rules)
+
+
+GROUNDING_RULE = "grounding"
+
+
+def validate_termsheet(
+    data: TermsheetData, db: Session, markdown: str | None = None, batch: BatchIsins | None = None
+) -> ValidationResult:
+    """Run all business-rule checks against extracted data.
 
+    With ``markdown`` (and ``GROUNDING_CHECK`` on), values that don't occur
+    in it are reported as ``grounding`` warnings. With ``batch`` the
+    duplicate-ISIN check goes through the batch's ``BatchIsins``.
+    """
+    [result] = _validate([data], db, set_based=False, batch=batch)
+    if markdown is not None and settings.GROUNDING_CHECK:
+        t0 = time.perf_counter()
+        result.issues.extend(
+            ValidationIssue(field=f, rule=GROUNDING_RULE, message=message, severity="warning")
+            for f, message in grounding.ungrounded(data, markdown)
+        )
+        result.rule_seconds[GROUNDING_RULE] = time.perf_counter() - t0
+        RULE_DURATION.observe(result.rule_seconds[GROUNDING_RULE], rule=GROUNDING_RULE)
     return result
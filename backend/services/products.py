@@ -12,6 +12,7 @@ from schemas.product import (
     ProductSummary,
     UnderlyingOut,
 )
+from schemas.termsheet import Event, Product as ProductData, TermsheetData, Underlying
 
 
 def approve(product_isin: str, db: Session) -> dict[str, Any]:
@@ -71,3 +72,35 @@ def get_by_isin(product_isin: str, db: Session) -> ProductDetail:
             for e in sorted(product.events, key=lambda e: e.event_date)
         ],
     )
+
+
+def stored_termsheet(product: Product) -> TermsheetData:
+    """A stored product (with its underlyings and events loaded) as extraction data."""
+    return TermsheetData(
+        product=ProductData(
+            product_isin=product.product_isin,
+            sedol=product.sedol,
+            short_description=product.short_description,
+            issuer=product.issuer,
+            issue_date=product.issue_date,
+            currency=product.currency,
+            maturity=product.maturity,
+            product_type=product.product_type,
+            word_description=product.word_description,
+        ),
+        underlyings=[
+            Underlying(bbg_code=u.bbg_code, weight=u.weight, initial_price=u.initial_price)
+            for u in product.underlyings
+        ],
+        events=[
+            Event(
+                event_type=e.event_type,
+                event_level_pct=e.event_level_pct,
+                event_strike_pct=e.event_strike_pct,
+                event_date=e.event_date,
+                event_amount=e.event_amount,
+                event_payment_date=e.event_payment_date,
+            )
+            for e in sorted(product.events, key=lambda e: e.event_date)
+        ],
+    )
@@ -138,6 +138,7 @@ def mock_db_session() -> MagicMock:
     """A mock SQLAlchemy Session with no existing products."""
     session = MagicMock()
     session.query.return_value.filter_by.return_value.first.return_value = None
+    session.scalar.return_value = None
     return session
 
 
@@ -1,5 +1,6 @@
 """Synthetic data factories for building test TermsheetData without Excel/LLM."""
 
+from contextlib import contextmanager
 from datetime import date
 from unittest.mock import MagicMock
 
@@ -56,4 +57,18 @@ def mock_db(existing_product=None) -> MagicMock:
     """Build a mock SQLAlchemy Session, optionally with an existing product."""
     db = MagicMock()
     db.query.return_value.filter_by.return_value.first.return_value = existing_product
+    db.scalar.return_value = None if existing_product is None else existing_product.product_isin
     return db
+
+
+def mock_session_scope(db: MagicMock | None = None, entered: list | None = None):
+    """Stand-in for db.db.session_scope yielding ``db``; appends to ``entered`` on each use."""
+    db = db if db is not None else mock_db()
+
+    @contextmanager
+    def scope():
+        if entered is not None:
+            entered.append(db)
+        yield db
+
+    return scope
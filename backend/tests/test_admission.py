@@ -0,0 +1,125 @@
+"""Admission controller: concurrency cap, priority lane, queue positions and rejection."""
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routes import extraction
+from routes.extraction import router as extraction_router
+from services.llm import ExtractionCancelled
+from services.pipeline.admission import DEFAULT_RETRY_AFTER_SECONDS, AdmissionController, AdmissionRejected
+
+
+def _controller(max_running=1, max_queued=2) -> tuple[AdmissionController, list[str]]:
+    return AdmissionController(max_running, max_queued), []
+
+
+class TestAdmissionController:
+    def test_runs_are_capped_and_interactive_jumps_batch(self):
+        controller, started = _controller()
+        first = controller.submit("batch", lambda t: started.append("batch-1"))
+        controller.submit("batch", lambda t: started.append("batch-2"))
+        upload = controller.submit("interactive", lambda t: started.append("upload"))
+        assert started == ["batch-1"]
+        assert controller.position(upload) == 1
+
+        controller.release(first)
+        assert started == ["batch-1", "upload"]
+
+    def test_batch_lane_has_its_own_cap(self):
+        controller = AdmissionController(max_running=1, max_queued=10, max_batch_running=2)
+        started: list[str] = []
+        for i in range(3):
+            controller.submit("batch", lambda t, i=i: started.append(f"batch-{i}"))
+        controller.submit("interactive", lambda t: started.append("upload"))
+        assert started == ["batch-0", "batch-1", "upload"]
+
+        controller.resize_batch_lane(3)
+        assert started[-1] == "batch-2"
+        assert controller.stats()["running_by_lane"] == {"interactive": 1, "batch": 3}
+
+    def test_waiters_get_position_updates(self):
+        controller, _ = _controller()
+        updates: list[tuple[int, float | None]] = []
+        running = controller.submit("interactive", lambda t: None)
+        controller.submit("batch", lambda t: None, on_update=lambda pos, eta: updates.append((pos, eta)))
+        controller.submit("interactive", lambda t: None)  # jumps ahead of the batch file
+        assert [pos for pos, _ in updates] == [1, 2]
+
+        controller.release(running)  # the interactive waiter starts
+        assert updates[-1][0] == 1
+        assert updates[-1][1] is None  # no batch run has finished to estimate from
+
+    def test_batch_runs_do_not_move_the_interactive_estimate(self):
+        controller = AdmissionController(max_running=1, max_queued=10, max_batch_running=1)
+        updates: list[tuple[int, float | None]] = []
+        upload = controller.submit("interactive", lambda t: None)
+        batch_file = controller.submit("batch", lambda t: None)
+        controller.submit("interactive", lambda t: None)
+        controller.submit("interactive", lambda t: None, on_update=lambda pos, eta: updates.append((pos, eta)))
+
+        batch_file.granted_at -= 100  # a long LLM stage
+        controller.release(batch_file)
+        assert updates[-1] == (2, None)
+        assert controller._retry_after() == DEFAULT_RETRY_AFTER_SECONDS
+
+        upload.granted_at -= 10
+        controller.release(upload)
+        position, eta = updates[-1]
+        assert position == 1 and 10 <= eta < 11
+        means = controller.stats()["mean_run_seconds"]
+        assert 100 <= means["batch"] < 101 and 10 <= means["interactive"] < 11
+
+    def test_full_queue_rejects_with_retry_after(self):
+        controller, _ = _controller(max_running=1, max_queued=1)
+        controller.submit("interactive", lambda t: None)
+        controller.submit("interactive", lambda t: None)
+        with pytest.raises(AdmissionRejected) as exc_info:
+            controller.submit("interactive", lambda t: None)
+        assert exc_info.value.retry_after > 0
+        controller.submit("batch", lambda t: None, reject_when_full=False)  # batches are never rejected
+        assert controller.stats()["rejected_total"] == 1
+
+    def test_release_is_idempotent_and_withdraws_waiters(self):
+        controller, started = _controller()
+        running = controller.submit("interactive", lambda t: started.append("a"))
+        waiting = controller.submit("interactive", lambda t: started.append("b"))
+        controller.release(waiting)
+        controller.release(running)
+        controller.release(running)
+        assert started == ["a"]
+        assert controller.stats()["running"] == 0
+
+    def test_blocking_slot_stops_waiting_when_cancelled(self):
+        controller, _ = _controller()
+        controller.submit("interactive", lambda t: None)
+        cancel = threading.Event()
+        cancel.set()
+        with pytest.raises(ExtractionCancelled):
+            with controller.blocking_slot("batch", cancel):
+                pytest.fail("should not be admitted")
+        assert controller.stats()["queued"] == {"interactive": 0, "batch": 0}
+
+
+class TestRejection:
+    def test_sync_upload_is_503_with_retry_after_when_full(self, monkeypatch):
+        full = AdmissionController(max_running=1, max_queued=0)
+        full.submit("interactive", lambda t: None)
+        monkeypatch.setattr(extraction, "admission", full)
+
+        app = FastAPI()
+        app.include_router(extraction_router, prefix="/api")
+
+        async def request():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(
+                    "/api/upload-termsheet", files={"file": ("ts.pdf", b"%PDF-1.7", "application/pdf")}
+                )
+
+        response = asyncio.run(request())
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "30"
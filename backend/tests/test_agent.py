@@ -0,0 +1,133 @@
+"""Unit tests for the extraction agent loop (scripted fake model, no LLM)."""
+
+import asyncio
+import threading
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from tests.factories import make_termsheet
+from services.llm import agent as agent_module
+from services.llm.agent import (
+    AgentProgress,
+    ExtractionCancelled,
+    _estimate_fraction,
+    _infer_phase,
+    extract_termsheet_data,
+    stream_termsheet_extraction,
+)
+from utils.streaming import cancel_on_disconnect
+
+MARKDOWN = "# Termsheet\n\nISIN: XS3184638594\n\nCoupon Barrier: 75%\n"
+
+
+class ScriptedToolModel(GenericFakeChatModel):
+    """Fake chat model that replays scripted AIMessages and ignores tool binding."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _tool_call(name: str, args: dict, call_id: str) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}])
+
+
+@pytest.fixture()
+def scripted_model(monkeypatch):
+    """Patch the agent's model factory to replay a scripted tool-call sequence."""
+    submission = make_termsheet().model_dump(mode="json")
+    script = iter([
+        _tool_call("list_sections", {}, "1"),
+        _tool_call("search_termsheet", {"query": "ISIN"}, "2"),
+        _tool_call("search_termsheet", {"query": "Coupon Barrier"}, "3"),
+        _tool_call("TermsheetData", submission, "4"),
+    ])
+    monkeypatch.setattr(agent_module, "init_chat_model", lambda **kwargs: ScriptedToolModel(messages=script))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Progress streaming
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestProgressStreaming:
+    def test_yields_every_tool_call_and_returns_data(self, scripted_model):
+        progress: list[AgentProgress] = []
+        gen = stream_termsheet_extraction(MARKDOWN)
+        while True:
+            try:
+                progress.append(next(gen))
+            except StopIteration as stop:
+                data = stop.value
+                break
+
+        tool_calls = [p for p in progress if p.kind == "tool_call"]
+        assert [p.tool for p in tool_calls] == ["list_sections", "search_termsheet", "search_termsheet", "TermsheetData"]
+        assert tool_calls[1].query == "ISIN"
+        assert data.product.product_isin == "XS3184638594"
+
+    def test_phase_transitions_are_reported_in_order(self, scripted_model):
+        phases = []
+        extract_termsheet_data(MARKDOWN, on_progress=lambda p: phases.append(p.phase) if p.kind == "phase" else None)
+        assert phases == ["product", "events", "submit"]
+
+    def test_fraction_is_monotonic(self, scripted_model):
+        fractions = []
+        extract_termsheet_data(MARKDOWN, on_progress=lambda p: fractions.append(p.fraction))
+        assert fractions == sorted(fractions)
+        assert all(0.0 <= f <= 1.0 for f in fractions)
+
+
+class TestPhaseInference:
+    @pytest.mark.parametrize("tool,query,phase", [
+        ("list_sections", None, "explore"),
+        ("TermsheetData", None, "submit"),
+        ("search_termsheet", "SEDOL", "product"),
+        ("search_termsheet", "RI Initial Value", "underlyings"),
+        ("search_termsheet", "Knock-in Event", "events"),
+        ("read_lines", "lines 10-40", None),
+    ])
+    def test_infer_phase(self, tool, query, phase):
+        assert _infer_phase(tool, query) == phase
+
+    def test_estimate_stays_within_phase_band(self):
+        assert _estimate_fraction("product", 0) == pytest.approx(0.05)
+        assert _estimate_fraction("product", 100) < 0.3
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Cooperative cancellation
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestCancellation:
+    def test_cancel_stops_between_turns(self, scripted_model):
+        cancel = threading.Event()
+        seen = []
+
+        def on_progress(p: AgentProgress):
+            seen.append(p)
+            cancel.set()  # e.g. the SSE client disconnected
+
+        with pytest.raises(ExtractionCancelled):
+            for progress in stream_termsheet_extraction(MARKDOWN, cancel=cancel):
+                on_progress(progress)
+        assert [p.tool for p in seen if p.kind == "tool_call"] == ["list_sections"]
+
+    def test_disconnect_sets_cancel_and_drains_pipeline(self):
+        cancel = threading.Event()
+        drained = []
+
+        def pipeline():
+            yield "data: 1\n\n"
+            yield "data: 2\n\n"
+            drained.append(cancel.is_set())
+
+        async def client_reads_one_event_then_leaves():
+            relay = cancel_on_disconnect(pipeline(), cancel)
+            assert await relay.__anext__() == "data: 1\n\n"
+            await relay.aclose()
+
+        asyncio.run(client_reads_one_event_then_leaves())
+        assert drained == [True]
@@ -0,0 +1,168 @@
+"""Batch ingestion tests with parsing, the LLM and the DB stubbed."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import pytest
+
+from tests.conftest import DATA_DIR
+from tests.factories import make_product, make_termsheet, mock_db, mock_session_scope
+from services.pipeline import batch, orchestrator
+from services.pipeline.admission import AdmissionController
+from services.pipeline.validate import is_valid_isin
+from schemas.batch import BatchSummary
+from utils.upload import BatchFile
+
+LLM_SECONDS = 0.05
+PDF_PATH = DATA_DIR / "XS3184638594_Termsheet_Final.pdf"
+
+
+def _isin(n: int) -> str:
+    """A valid ISIN per number, so the files of a batch aren't duplicates of each other."""
+    body = f"XS{n:09d}"
+    return next(body + d for d in "0123456789" if is_valid_isin(body + d))
+# Batch stages as configured, parsing in the process pool
+POOLED_STAGES = list(batch.BATCH_STAGES)
+
+
+@pytest.fixture()
+def llm(monkeypatch, tmp_path):
+    """Stub everything but the engine; parse in-thread and record LLM concurrency.
+
+    The n-th extraction yields ISIN ``_isin(n)``, unless ``state["isin"]`` is set.
+    """
+    state = {"running": 0, "peak": 0, "lock": threading.Lock(), "isin": None, "extracted": 0}
+
+    def fake_extract(ctx):
+        with state["lock"]:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            state["extracted"] += 1
+            number = state["extracted"]
+        time.sleep(LLM_SECONDS)
+        with state["lock"]:
+            state["running"] -= 1
+        isin = state["isin"] or _isin(number)
+        ctx.termsheet_data = make_termsheet(product=make_product(product_isin=isin))
+        return None
+        yield  # makes this a generator
+
+    def fake_markdown(contents, filename):
+        if b"broken" in contents:
+            raise ValueError("cannot parse")
+        return "# md"
+
+    monkeypatch.setattr(orchestrator.run_store.settings, "BLOBSTORE_PATH", str(tmp_path))
+    monkeypatch.setattr(orchestrator, "extract_markdown", fake_markdown)
+    monkeypatch.setattr(orchestrator, "save_markdown", lambda isin, filename, text: f"{isin}/{filename}.md")
+    monkeypatch.setattr(orchestrator, "session_scope", mock_session_scope(mock_db()))
+    monkeypatch.setattr(orchestrator, "find_known_document", lambda sha, markdown, db: None)
+    monkeypatch.setattr(batch, "EXTRACT", replace(orchestrator.EXTRACT, run=fake_extract))
+    monkeypatch.setattr(batch.admission, "controller", AdmissionController(1, 100, max_batch_running=2))
+    stages = list(batch.BATCH_STAGES)
+    stages[0] = orchestrator.PARSE  # the process pool can't see monkeypatches
+    monkeypatch.setattr(batch, "BATCH_STAGES", stages)
+    return state
+
+
+def _files(n: int) -> list[BatchFile]:
+    return [BatchFile(f"ts{i}.pdf", b"%PDF-1.7 " + bytes([i]), f"{i:064x}") for i in range(n)]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Concurrency and per-file status
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestRunBatch:
+    def test_llm_concurrency_is_bounded(self, llm):
+        records = list(batch.run_batch(_files(6)))
+        summary = records[-1]
+        assert isinstance(summary, BatchSummary)
+        assert summary.by_status == {"extracted": 6}
+        assert summary.files_per_second > 0
+        assert 1 < llm["peak"] <= 2
+        assert sorted(r.index for r in records[:-1]) == list(range(6))
+        assert all(r.run_id and "llm_extraction" in r.stage_seconds for r in records[:-1])
+
+    def test_second_file_with_the_same_isin_fails_validation(self, llm, monkeypatch):
+        db = mock_db()
+        monkeypatch.setattr(orchestrator, "session_scope", mock_session_scope(db))
+        llm["isin"] = "XS3184638594"
+        records = [r for r in batch.run_batch(_files(2)) if r.type == "file"]
+        assert sorted(r.status for r in records) == ["extracted", "validation_failed"]
+        [repeat] = [r for r in records if r.status == "validation_failed"]
+        assert repeat.issues == ["ISIN 'XS3184638594' appears more than once in this batch"]
+        db.scalars.assert_called_once()  # one lookup for the batch's ISINs
+        db.scalar.assert_not_called()
+
+    def test_llm_concurrency_above_the_interactive_cap(self, llm, monkeypatch):
+        monkeypatch.setattr(batch.settings, "BATCH_PARSE_WORKERS", batch.settings.BATCH_PARSE_WORKERS)
+        monkeypatch.setattr(batch.settings, "BATCH_LLM_CONCURRENCY", batch.settings.BATCH_LLM_CONCURRENCY)
+        monkeypatch.setattr(batch, "_file_executor", ThreadPoolExecutor(1))  # replaced below, then restored
+        assert batch.admission.controller.max_running < 8
+        batch.configure_limits(parse_workers=1, llm_concurrency=8)
+        try:
+            records = list(batch.run_batch(_files(8)))
+        finally:
+            batch._file_executor.shutdown()
+        assert records[-1].by_status == {"extracted": 8}
+        assert batch.admission.controller.stats()["max_batch_running"] == 8
+        assert 4 < llm["peak"] <= 8
+
+    def test_interactive_waiters_hold_back_batch_files(self, llm):
+        controller = batch.admission.controller
+        controller.submit("interactive", lambda t: None)
+        waiting = controller.submit("interactive", lambda t: None)  # the interactive lane is full
+        cancel = threading.Event()
+        threading.Timer(0.3, cancel.set).start()
+        records = list(batch.run_batch(_files(2), cancel))
+        assert records[-1].by_status == {"cancelled": 2}
+        assert llm["peak"] == 0
+        controller.release(waiting)
+
+    def test_failures_and_rejections_do_not_stop_the_batch(self, llm):
+        files = _files(2) + [
+            BatchFile("broken.pdf", b"%PDF-broken", "f" * 64),
+            BatchFile("notes.txt", error="Not a PDF"),
+        ]
+        records = {r.filename: r for r in batch.run_batch(files) if r.type == "file"}
+        assert records["broken.pdf"].status == "failed"
+        assert records["broken.pdf"].error == "PDF extraction failed: cannot parse"
+        assert (records["notes.txt"].status, records["notes.txt"].error) == ("rejected", "Not a PDF")
+        assert records["ts0.pdf"].status == "extracted"
+
+    def test_cancel_stops_pending_files(self, llm):
+        cancel = threading.Event()
+        cancel.set()
+        records = list(batch.run_batch(_files(3), cancel))
+        assert records[-1].by_status == {"cancelled": 3}
+        assert llm["peak"] == 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Parsing in the process pool (real PDF)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestParsePool:
+    def test_parses_a_real_pdf_from_bytes_and_from_disk(self):
+        ctx = orchestrator.new_context(PDF_PATH.read_bytes(), PDF_PATH.name)
+        batch._parse_in_process(ctx)
+        assert "XS3184638594" in ctx.markdown_text
+
+        from_disk = orchestrator.new_context(b"", PDF_PATH.name, content_sha256="0" * 64)
+        from_disk.source_path = PDF_PATH
+        batch._parse_in_process(from_disk)
+        assert from_disk.markdown_text == ctx.markdown_text
+
+    def test_batch_parses_through_the_pool(self, llm, monkeypatch):
+        monkeypatch.setattr(batch, "BATCH_STAGES", POOLED_STAGES)
+        files = [BatchFile(PDF_PATH.name, PDF_PATH.read_bytes(), "a" * 64), BatchFile("broken.pdf", b"%PDF-broken", "b" * 64)]
+        records = {r.filename: r for r in batch.run_batch(files) if r.type == "file"}
+        assert records[PDF_PATH.name].status == "extracted"
+        assert records[PDF_PATH.name].stage_seconds["extracting_pdf"] > 0
+        assert records["broken.pdf"].status == "failed"
+        assert records["broken.pdf"].error.startswith("PDF extraction failed")
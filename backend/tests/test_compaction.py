@@ -0,0 +1,67 @@
+"""Unit tests for agent message-history compaction."""
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from services.llm.compaction import compact_messages, summarise_tool_output
+
+SEARCH_OUTPUT = "Found 1 match(es) for 'Barrier':\n\n" + "\n".join(
+    ["    filler text line without values"] * 20
+    + [">>> The Coupon Barrier is 75% of the Initial Value on 2026-04-27"]
+    + ["    more filler text"] * 20
+)
+
+
+def _turn(call_id: str, content: str = SEARCH_OUTPUT, ai_content: str = "") -> list:
+    return [
+        AIMessage(content=ai_content, tool_calls=[{"name": "search_termsheet", "args": {"query": "Barrier"}, "id": call_id}]),
+        ToolMessage(content=content, tool_call_id=call_id),
+    ]
+
+
+def _history(turns: int) -> list:
+    messages = [HumanMessage(content="Extract")]
+    for i in range(turns):
+        messages += _turn(str(i))
+    return messages
+
+
+class TestSummarise:
+    def test_keeps_match_lines_only(self):
+        summary = summarise_tool_output(SEARCH_OUTPUT)
+        assert "75%" in summary
+        assert "filler" not in summary
+        assert len(summary) < len(SEARCH_OUTPUT)
+
+
+class TestCompactMessages:
+    def test_recent_outputs_kept_verbatim(self):
+        messages = _history(10)
+        compacted = compact_messages(messages, char_budget=10**9, keep_recent=3)
+        tool_outputs = [m.content for m in compacted if isinstance(m, ToolMessage)]
+        assert all(c == SEARCH_OUTPUT for c in tool_outputs[-3:])
+        assert all(c.startswith("[compacted") for c in tool_outputs[:-3])
+
+    def test_original_messages_not_mutated(self):
+        messages = _history(10)
+        compact_messages(messages, char_budget=0, keep_recent=3)
+        assert all(m.content == SEARCH_OUTPUT for m in messages if isinstance(m, ToolMessage))
+
+    def test_cited_output_kept_verbatim(self):
+        messages = _history(5)
+        messages += [AIMessage(content="The coupon barrier is 75%.")]
+        messages += _turn("late")
+        compacted = compact_messages(messages, char_budget=10**9, keep_recent=1)
+        first_output = next(m for m in compacted if isinstance(m, ToolMessage))
+        assert first_output.content == SEARCH_OUTPUT
+
+    def test_budget_compacts_all_but_latest(self):
+        messages = _history(5)
+        compacted = compact_messages(messages, char_budget=0, keep_recent=5)
+        tool_outputs = [m.content for m in compacted if isinstance(m, ToolMessage)]
+        assert tool_outputs[-1] == SEARCH_OUTPUT
+        assert all(c.startswith("[compacted") for c in tool_outputs[:-1])
+
+    def test_tool_call_ids_preserved(self):
+        messages = _history(8)
+        compacted = compact_messages(messages, char_budget=0, keep_recent=0)
+        assert [m.tool_call_id for m in compacted if isinstance(m, ToolMessage)] == [str(i) for i in range(8)]
@@ -0,0 +1,55 @@
+"""Unit tests for the already-ingested document / ISIN short-circuit (mocked DB)."""
+
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from services.pipeline.dedupe import find_known_document, sniff_isin
+
+
+def _stored_product(**overrides) -> SimpleNamespace:
+    defaults = dict(
+        product_isin="XS3184638594", sedol=None, short_description="Stored", issuer="BBVA",
+        issue_date=date(2026, 2, 2), currency="GBP", maturity=date(2032, 2, 2),
+        product_type=None, word_description=None, approved=True,
+        underlyings=[SimpleNamespace(bbg_code="UKX Index", weight=None, initial_price=10148.85)],
+        events=[],
+    )
+    defaults.update(overrides)
+    return SimpleNamespace(**defaults)
+
+
+def _db(metadata=None, product=None) -> MagicMock:
+    db = MagicMock()
+    db.query.return_value.filter.return_value.order_by.return_value.first.return_value = metadata
+    db.query.return_value.filter_by.return_value.first.return_value = product
+    return db
+
+
+class TestSniffIsin:
+    def test_most_frequent_valid_isin_wins(self):
+        text = "ISIN: XS3184638594\nUnderlying GB0001383545\nXS3184638594 again"
+        assert sniff_isin(text) == "XS3184638594"
+
+    def test_ignores_luhn_failures(self):
+        assert sniff_isin("XS3184638595 XS3184638595 GB0001383545") == "GB0001383545"
+
+    def test_none_when_no_isin(self):
+        assert sniff_isin("no identifiers here") is None
+
+
+class TestFindKnownDocument:
+    def test_hash_hit_returns_stored_product(self):
+        metadata = SimpleNamespace(product=_stored_product())
+        known = find_known_document("abc", "", _db(metadata=metadata))
+        assert known.reason == "content_hash"
+        assert known.validation.is_valid
+        assert known.data.underlyings[0].bbg_code == "UKX Index"
+
+    def test_isin_hit_is_duplicate_error(self):
+        known = find_known_document("abc", "ISIN XS3184638594", _db(product=_stored_product()))
+        assert known.reason == "isin"
+        assert [i.rule for i in known.validation.issues] == ["duplicate_isin"]
+
+    def test_miss(self):
+        assert find_known_document("abc", "ISIN XS3184638594", _db()) is None
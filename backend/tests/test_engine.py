@@ -0,0 +1,73 @@
+"""Stage engine tests: ordering, timing/metrics, error mapping and early exit."""
+
+import threading
+
+import pytest
+
+from schemas.sse import SseAgentProgressEvent, SseCompleteEvent, SseErrorEvent, SseProgressEvent
+from services.llm import ExtractionCancelled
+from services.pipeline.engine import STAGE_DURATION, PipelineContext, Stage, run_stages
+
+
+def _ctx(cancel=None) -> PipelineContext:
+    return PipelineContext(filename="ts.pdf", contents=b"%PDF", content_sha256="0" * 64, cancel=cancel)
+
+
+def _count(stage: str, outcome: str) -> int:
+    return STAGE_DURATION.snapshot().get((stage, outcome), {"count": 0})["count"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Running stages
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestRunStages:
+    def test_runs_in_order_and_times_every_stage(self):
+        seen = []
+        before = _count("t_first", "ok")
+        stages = [
+            Stage("t_first", lambda ctx: seen.append("first"), progress=10),
+            Stage("t_silent", lambda ctx: seen.append("silent")),
+        ]
+        ctx = _ctx()
+        events = list(run_stages(ctx, stages))
+        assert seen == ["first", "silent"]
+        assert events == [SseProgressEvent(stage="t_first", progress=10)]  # silent stage emits nothing
+        assert set(ctx.timings) == {"t_first", "t_silent"}
+        assert _count("t_first", "ok") == before + 1
+
+    def test_generator_stage_events_are_forwarded(self):
+        def stage(ctx):
+            yield SseAgentProgressEvent(progress=55, kind="tool_call", phase="extract", tool="search", query="isin")
+            return SseCompleteEvent(data={"ok": True})
+
+        ctx = _ctx()
+        events = list(run_stages(ctx, [Stage("t_gen", stage), Stage("t_never", lambda ctx: pytest.fail())]))
+        assert isinstance(events[0], SseAgentProgressEvent)
+        assert events[-1] == SseCompleteEvent(data={"ok": True}, trace_id=ctx.trace_id)
+
+    def test_declared_errors_map_to_terminal_error_event(self):
+        def boom(ctx):
+            raise ValueError("not a PDF")
+
+        before = _count("t_parse", "error")
+        stages = [Stage("t_parse", boom, errors=(ValueError,), error_message="PDF extraction failed"),
+                  Stage("t_never", lambda ctx: pytest.fail())]
+        ctx = _ctx()
+        events = list(run_stages(ctx, stages))
+        assert events[-1] == SseErrorEvent(message="PDF extraction failed: not a PDF", trace_id=ctx.trace_id)
+        assert _count("t_parse", "error") == before + 1
+
+    def test_undeclared_errors_propagate(self):
+        def boom(ctx):
+            raise KeyError("bug")
+
+        with pytest.raises(KeyError):
+            list(run_stages(_ctx(), [Stage("t_bug", boom)]))
+
+    def test_cancel_is_checked_before_each_stage(self):
+        cancel = threading.Event()
+        cancel.set()
+        with pytest.raises(ExtractionCancelled):
+            list(run_stages(_ctx(cancel), [Stage("t_never", lambda ctx: pytest.fail())]))
@@ -0,0 +1,88 @@
+"""Unit tests for the typed entity index and find_values tool."""
+
+import pytest
+
+from services.llm.entities import build_entity_index, find_entities, format_digest
+from services.llm.tools import make_tools
+
+SYNTHETIC = """\
+# Product Terms
+
+**ISIN Code** XS3184638594
+
+Issue Date: 2 February 2026
+
+**Aggregate Nominal Amount** GBP 3,838,500
+
+The Knock-in Event occurs if the Worst Value is less than 65.00% of the Initial Value.
+
+|i|Coupon Valuation Dates|Interest Payment Dates|
+|---|---|---|
+|1|27 April 2026|5 May 2026|
+|2|27 July 2026|3 August 2026|
+"""
+
+
+@pytest.fixture(scope="module")
+def index():
+    return build_entity_index(SYNTHETIC)
+
+
+class TestEntityIndex:
+    def test_isin_with_bold_label(self, index):
+        isins = find_entities(index, "isin")
+        assert [(e.value, e.line, e.label) for e in isins] == [("XS3184638594", 3, "ISIN Code")]
+
+    def test_colon_label(self, index):
+        dates = find_entities(index, "date", near="Issue Date")
+        assert [d.value for d in dates] == ["2 February 2026"]
+
+    def test_currency_amount(self, index):
+        amounts = find_entities(index, "amount")
+        assert amounts[0].value == "GBP 3,838,500"
+        assert amounts[0].label == "Aggregate Nominal Amount"
+
+    def test_percentage_in_prose(self, index):
+        pcts = find_entities(index, "percentage")
+        assert pcts[0].value == "65.00%"
+        assert "less than" in pcts[0].label
+
+    def test_table_values_use_column_header_and_row(self, index):
+        coupons = find_entities(index, "date", near="Coupon Valuation")
+        assert [(e.value, e.line, e.row) for e in coupons] == [
+            ("27 April 2026", 13, "1"),
+            ("27 July 2026", 14, "2"),
+        ]
+        payments = find_entities(index, "date", near="Interest Payment")
+        assert [e.value for e in payments] == ["5 May 2026", "3 August 2026"]
+
+    def test_digest_groups_table_columns(self, index):
+        digest = format_digest(index)
+        assert "Coupon Valuation Dates ×2 L13-14" in digest
+        assert "isin (1)" in digest
+
+
+class TestFindValuesTool:
+    @pytest.fixture()
+    def find_values(self):
+        return {t.name: t for t in make_tools(SYNTHETIC)}["find_values"]
+
+    def test_lists_values_with_line_numbers(self, find_values):
+        result = find_values.invoke({"kind": "date", "near": "Interest Payment"})
+        assert "L13: 5 May 2026" in result
+        assert "L14: 3 August 2026" in result
+
+    def test_unknown_kind(self, find_values):
+        assert "Unknown kind" in find_values.invoke({"kind": "sedol"})
+
+    def test_no_matches(self, find_values):
+        assert "No isin values found near 'Underlying'" in find_values.invoke({"kind": "isin", "near": "Underlying"})
+
+
+def test_sample_termsheet_index(markdown_text):
+    if markdown_text is None:
+        pytest.skip("Sample markdown not found")
+    index = build_entity_index(markdown_text)
+    assert len(find_entities(index, "date", near="Coupon Valuation")) == 23
+    assert len(find_entities(index, "date", near="Automatic Early Redemption Valuation")) == 5
+    assert [e.value for e in find_entities(index, "isin")] == ["XS3184638594"]
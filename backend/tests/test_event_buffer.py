@@ -0,0 +1,109 @@
+"""In-memory SSE replay buffer: ids, Last-Event-ID replay and the disconnect grace period."""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routes import extraction
+from routes.extraction import router as extraction_router
+from schemas.sse import SseCompleteEvent, SseProgressEvent
+from utils import event_buffer, job_store
+
+
+@pytest.fixture(autouse=True)
+def _empty_buffer(monkeypatch):
+    monkeypatch.setattr(event_buffer, "_streams", {})
+    monkeypatch.setattr(event_buffer.settings, "SSE_DISCONNECT_GRACE_SECONDS", 0.05)
+
+
+class TestEventBuffer:
+    def test_events_are_numbered_and_replayed_after_an_id(self):
+        event_buffer.open_stream("job1", threading.Event())
+        for stage in ("a", "b", "c"):
+            event_buffer.append("job1", {"stage": stage})
+        events, finished = event_buffer.events_after("job1", 1)
+        assert events == [(2, {"stage": "b"}), (3, {"stage": "c"})]
+        assert not finished
+        assert event_buffer.events_after("nope", 0) is None
+
+    def test_run_is_cancelled_only_if_no_client_returns(self):
+        cancel = threading.Event()
+        event_buffer.open_stream("job1", cancel)
+        event_buffer.attach("job1")
+        event_buffer.detach("job1")
+        event_buffer.attach("job1")  # reconnected within the grace period
+        time.sleep(0.1)
+        assert not cancel.is_set()
+
+        event_buffer.detach("job1")
+        time.sleep(0.1)
+        assert cancel.is_set()
+
+    def test_finished_streams_expire(self, monkeypatch):
+        monkeypatch.setattr(event_buffer.settings, "SSE_REPLAY_TTL_SECONDS", 0)
+        event_buffer.open_stream("job1", threading.Event())
+        event_buffer.finish("job1")
+        time.sleep(0.01)
+        assert not event_buffer.exists("job1")
+
+    def test_concurrent_first_connections_start_the_run_once(self):
+        starts = []
+
+        def start(cancel):
+            starts.append(cancel)
+            time.sleep(0.05)  # widen the window between opening and starting
+            return True
+
+        opened = []
+        threads = [
+            threading.Thread(target=lambda: opened.append(event_buffer.get_or_open("job1", start)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(starts) == 1
+        assert opened == [True] * 8
+
+    def test_stream_is_closed_when_there_is_nothing_to_start(self):
+        assert not event_buffer.get_or_open("job1", lambda cancel: False)
+        assert not event_buffer.exists("job1")
+
+        def start(cancel):
+            raise RuntimeError("executor down")
+
+        with pytest.raises(RuntimeError):
+            event_buffer.get_or_open("job1", start)
+        assert not event_buffer.exists("job1")
+
+
+class TestReconnect:
+    def test_reconnect_replays_the_rest_of_an_in_process_run(self, monkeypatch):
+        def fake_run_events(contents, filename, cancel=None, content_sha256=None):
+            yield SseProgressEvent(stage="extracting_pdf", progress=15)
+            yield SseProgressEvent(stage="llm_extraction", progress=50)
+            yield SseCompleteEvent(data={"product_isin": "XS3184638594"})
+
+        monkeypatch.setattr(extraction, "run_events", fake_run_events)
+        monkeypatch.setattr(extraction.settings, "JOB_QUEUE_BACKEND", "memory")
+        job_id = job_store.create_job("ts.pdf", b"%PDF-1.7")
+
+        app = FastAPI()
+        app.include_router(extraction_router, prefix="/api")
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = await client.get(f"/api/extraction-stream/{job_id}")
+                again = await client.get(f"/api/extraction-stream/{job_id}", headers={"Last-Event-ID": "1"})
+            return first, again
+
+        first, again = asyncio.run(scenario())
+        assert [l for l in first.text.splitlines() if l.startswith("id:")] == ["id: 1", "id: 2", "id: 3"]
+        assert [l for l in again.text.splitlines() if l.startswith("id:")] == ["id: 2", "id: 3"]
+        assert '"stage": "complete"' in again.text
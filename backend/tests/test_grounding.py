@@ -0,0 +1,116 @@
+"""Source grounding: the Aho–Corasick matcher, normalization and ungrounded-value warnings."""
+
+from datetime import date
+
+import pytest
+
+from core.config import settings
+from services.pipeline import grounding
+from services.pipeline.validate import validate_termsheet
+from tests.conftest import MARKDOWN_PATH
+from tests.factories import make_event, make_product, make_termsheet, make_underlying, mock_db
+from utils.aho_corasick import AhoCorasick
+
+MARKDOWN = """# Term Sheet 26th January 2026
+**ISIN** XS3184638594 **SEDOL CODE** BVVJPF2
+**Issue Date** 2 February 2026 | **Maturity** 02/02/2032
+|Underlying|Initial Value|
+|---|---|
+|FTSE 100 Index|10,148.85|
+|i|Coupon Valuation Dates|Payment Dates|Barrier (%)|
+|---|---|---|---|
+|1|27 April 2026|5 May 2026|75.00|
+|2|July 27, 2026|3 August 2026|75.00|
+Coupon of **2.0375 %** per period.
+"""
+
+
+def _termsheet(**event_overrides):
+    event = dict(event_type="coupon", event_level_pct=75.0, event_amount=2.0375,
+                 event_date=date(2026, 4, 27), event_payment_date=date(2026, 5, 5))
+    event.update(event_overrides)
+    return make_termsheet(
+        product=make_product(maturity=date(2032, 2, 2)),
+        underlyings=[make_underlying()],
+        events=[make_event(**event), make_event(event_date=date(2026, 7, 27), event_payment_date=date(2026, 8, 3),
+                                                event_level_pct=75.0, event_amount=2.0375)],
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Matcher and normalization
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestAhoCorasick:
+    def test_finds_overlapping_matches_in_one_scan(self):
+        matches = sorted(AhoCorasick(["he", "she", "his", "hers"]).finditer("ushers"))
+        assert matches == [(1, "she"), (2, "he"), (2, "hers")]
+
+    def test_no_patterns_and_no_match(self):
+        assert list(AhoCorasick([]).finditer("text")) == []
+        assert list(AhoCorasick(["xyz", ""]).finditer("text")) == []
+
+
+class TestNormalization:
+    def test_markup_thousands_ordinals_and_percent_spacing(self):
+        text = grounding.normalize("|**Initial**|10,148.85|<br>26th January 2026, 2.0375 %")
+        assert text == "initial 10148.85 26 january 2026, 2.0375%"
+
+    def test_lines_are_preserved(self):
+        assert grounding.normalize(MARKDOWN).count("\n") == MARKDOWN.count("\n")
+
+    def test_date_and_number_forms(self):
+        forms = grounding.date_forms(date(2026, 2, 2))
+        assert {"2026-02-02", "02/02/2026", "2.2.2026", "2 february 2026", "feb 2, 2026"} <= forms
+        assert grounding.number_forms(75.0) == {"75", "75.0", "75.00", "75.000", "75.0000"}
+        assert grounding.number_forms(2.0375) == {"2.0375"}
+
+    def test_matches_only_on_token_boundaries(self):
+        assert grounding.found_forms("barrier 75% and 2.5 and x10", {"5", "75", "2", "10"}) == {"75"}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Ungrounded values
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestUngrounded:
+    def test_values_in_any_format_are_grounded(self):
+        assert list(grounding.ungrounded(_termsheet(), MARKDOWN)) == []
+
+    def test_reference_termsheet_is_fully_grounded(self, excel_termsheet):
+        assert list(grounding.ungrounded(excel_termsheet, MARKDOWN_PATH.read_text(encoding="utf-8"))) == []
+
+    def test_hallucinated_date_reports_the_nearest_dates(self):
+        [(field, message)] = grounding.ungrounded(_termsheet(event_date=date(2026, 4, 28)), MARKDOWN)
+        assert field == "events[0].event_date"
+        assert message.startswith("'2026-04-28' not found in the source document; nearest: L9 '27 april 2026'")
+
+    def test_hallucinated_numbers_and_identifiers(self):
+        data = _termsheet(event_amount=2.04)
+        data.product.sedol = "BVVJPF3"
+        issues = dict(grounding.ungrounded(data, MARKDOWN))
+        assert "nearest: L2 'bvvjpf2'" in issues["sedol"]
+        assert issues["events[0].event_amount"].startswith("'2.04%' not found")
+        assert "nearest: L11 '2.0375'" in issues["events[0].event_amount"]
+
+    def test_findings_are_capped(self):
+        data = make_termsheet(events=[make_event(event_date=date(2027, 1, day)) for day in range(1, 26)])
+        issues = list(grounding.ungrounded(data, "nothing to see here"))
+        assert len(issues) == grounding.MAX_FINDINGS + 1
+        assert issues[-1][1].startswith("... and ")
+
+
+class TestValidateWithMarkdown:
+    def test_grounding_issues_are_warnings(self):
+        result = validate_termsheet(_termsheet(event_level_pct=80.0), mock_db(), MARKDOWN)
+        [issue] = [i for i in result.issues if i.rule == "grounding"]
+        assert issue.severity == "warning" and issue.field == "events[0].event_level_pct"
+        assert result.is_valid and "grounding" in result.rule_seconds
+
+    @pytest.mark.parametrize("markdown, enabled", [(None, True), (MARKDOWN, False)])
+    def test_skipped_without_markdown_or_when_disabled(self, monkeypatch, markdown, enabled):
+        monkeypatch.setattr(settings, "GROUNDING_CHECK", enabled)
+        result = validate_termsheet(_termsheet(event_level_pct=80.0), mock_db(), markdown)
+        assert not any(i.rule == "grounding" for i in result.issues)
@@ -0,0 +1,80 @@
+"""Directory ingester tests: checkpoint/resume and the CSV report (pipeline stubbed)."""
+
+import csv
+import threading
+
+import pytest
+
+import ingest
+from schemas.batch import BatchFileStatus
+
+
+@pytest.fixture()
+def corpus(tmp_path):
+    root = tmp_path / "issuer"
+    (root / "sub").mkdir(parents=True)
+    for name in ("a.pdf", "b.pdf", "sub/c.pdf"):
+        (root / name).write_bytes(b"%PDF-1.7 " + name.encode())
+    (root / "d.pdf").write_bytes(b"not a pdf")
+    return root
+
+
+@pytest.fixture()
+def pipeline(monkeypatch):
+    """Stub batch.run_file; files named in ``fail`` fail, the rest are extracted."""
+    calls: list[str] = []
+    fail: set[str] = set()
+
+    def fake_run_file(index, file, cancel, source_path=None, isins=None):
+        calls.append(file.filename)
+        if file.error:
+            return BatchFileStatus(index=index, filename=file.filename, size_bytes=0, status="rejected", error=file.error)
+        status = "failed" if file.filename in fail else "extracted"
+        return BatchFileStatus(
+            index=index, filename=file.filename, size_bytes=len(file.contents), status=status,
+            seconds=0.5, stage_seconds={"extracting_pdf": 0.1, "llm_extraction": 0.4},
+        )
+
+    monkeypatch.setattr(ingest.batch, "run_file", fake_run_file)
+    return calls, fail
+
+
+def _ingest(root):
+    return ingest.ingest(root, root / ingest.CHECKPOINT_NAME, root / "report.csv", threading.Event())
+
+
+def _report(root) -> dict[str, dict]:
+    with (root / "report.csv").open() as f:
+        return {row["path"]: row for row in csv.DictReader(f)}
+
+
+class TestIngest:
+    def test_report_has_outcomes_and_stage_timings(self, corpus, pipeline):
+        _ingest(corpus)
+        report = _report(corpus)
+        assert set(report) == {"a.pdf", "b.pdf", "sub/c.pdf", "d.pdf"}
+        assert report["sub/c.pdf"]["status"] == "extracted"
+        assert report["sub/c.pdf"]["llm_extraction"] == "0.4"
+        assert (report["d.pdf"]["status"], report["d.pdf"]["error"]) == ("rejected", "Not a PDF")
+
+    def test_resume_skips_done_files_and_retries_failures(self, corpus, pipeline):
+        calls, fail = pipeline
+        fail.add("b.pdf")
+        _ingest(corpus)
+        calls.clear()
+        fail.clear()
+
+        _ingest(corpus)
+        assert calls == ["b.pdf"]
+        report = _report(corpus)
+        assert report["b.pdf"]["status"] == "extracted"
+        assert (report["a.pdf"]["status"], report["a.pdf"]["resumed"]) == ("extracted", "yes")
+
+    def test_torn_checkpoint_line_is_ignored(self, corpus, pipeline):
+        calls, _ = pipeline
+        _ingest(corpus)
+        with (corpus / ingest.CHECKPOINT_NAME).open("a") as f:
+            f.write('{"path": "a.p')
+        calls.clear()
+        _ingest(corpus)
+        assert calls == []
@@ -0,0 +1,53 @@
+"""Unit tests for the bounded in-memory job store."""
+
+import os
+
+import pytest
+
+from utils import job_store
+from utils.job_store import JobStoreFull, create_job, pop_job
+
+
+@pytest.fixture(autouse=True)
+def _empty_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(job_store, "_jobs", {})
+    monkeypatch.setattr(job_store, "_spill_dir", str(tmp_path))
+    monkeypatch.setattr(job_store, "_expired_total", 0)
+    monkeypatch.setattr(job_store, "_rejected_total", 0)
+    monkeypatch.setattr(job_store.settings, "JOB_STORE_MAX_BYTES", 100)
+    monkeypatch.setattr(job_store.settings, "JOB_STORE_TTL_SECONDS", 60)
+    monkeypatch.setattr(job_store.settings, "JOB_STORE_SPILL_BYTES", 20)
+
+
+class TestJobStore:
+    def test_round_trip(self):
+        job_id = create_job("a.pdf", b"%PDF small", "abc123")
+        assert pop_job(job_id) == ("a.pdf", b"%PDF small", "abc123")
+        assert pop_job(job_id) is None
+
+    def test_large_payload_spills_to_disk(self, tmp_path):
+        payload = b"%PDF" + b"x" * 40
+        job_id = create_job("big.pdf", payload)
+        assert os.listdir(tmp_path) == [f"{job_id}.pdf"]
+        assert job_store.stats()["spilled_bytes"] == len(payload)
+        assert pop_job(job_id) == ("big.pdf", payload, None)
+        assert os.listdir(tmp_path) == []
+
+    def test_byte_budget_rejects_uploads(self):
+        create_job("a.pdf", b"x" * 60)
+        with pytest.raises(JobStoreFull):
+            create_job("b.pdf", b"x" * 60)
+        assert job_store.stats()["rejected_total"] == 1
+
+    def test_expired_jobs_are_evicted(self, monkeypatch, tmp_path):
+        clock = [1000.0]
+        monkeypatch.setattr(job_store.time, "monotonic", lambda: clock[0])
+        small = create_job("a.pdf", b"x" * 10)
+        create_job("b.pdf", b"x" * 50)  # spilled
+
+        clock[0] += 61
+        assert pop_job(small) is None
+        stats = job_store.stats()
+        assert (stats["jobs"], stats["bytes_held"], stats["expired_total"]) == (0, 0, 2)
+        assert os.listdir(tmp_path) == []
+        create_job("c.pdf", b"x" * 90)  # the budget is free again
@@ -0,0 +1,281 @@
+"""Postgres job queue tests against mocked sessions (no DB)."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.dialects import postgresql
+
+from routes import extraction
+from routes.extraction import router as extraction_router
+from schemas.sse import SseCompleteEvent, SseErrorEvent, SseProgressEvent
+import worker
+from services import jobs
+from tests.factories import mock_db, mock_session_scope
+
+
+def _job(**overrides) -> SimpleNamespace:
+    defaults = dict(
+        id="job1", status="running", stage=None, progress=0, attempts=1,
+        heartbeat_at=None, finished_at=None, result=None, error_message=None, worker_id="w1",
+    )
+    defaults.update(overrides)
+    return SimpleNamespace(**defaults)
+
+
+def _db_holding(rows: int = 1) -> MagicMock:
+    """A session whose fenced UPDATE matches ``rows`` rows."""
+    db = MagicMock()
+    db.execute.return_value.rowcount = rows
+    return db
+
+
+def _update_values(db: MagicMock) -> dict:
+    """Bound parameters of the job UPDATE sent to ``db``."""
+    [update] = [c.args[0] for c in db.execute.call_args_list if c.args[0].is_dml]
+    return update.compile().params
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Queue operations
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestQueue:
+    def test_claim_uses_skip_locked(self):
+        db = MagicMock()
+        db.execute.return_value.scalar_one_or_none.return_value = None
+        assert jobs.claim_next("w1", db, stale_after_seconds=60, max_attempts=3) is None
+        claim = db.execute.call_args_list[-1].args[0]
+        assert "FOR UPDATE SKIP LOCKED" in str(claim.compile(dialect=postgresql.dialect()))
+
+    def test_claim_marks_job_running(self):
+        job = _job(status="queued", attempts=0, worker_id=None)
+        db = MagicMock()
+        db.execute.return_value.scalar_one_or_none.return_value = job
+        assert jobs.claim_next("w2", db, stale_after_seconds=60, max_attempts=3) is job
+        assert (job.status, job.worker_id, job.attempts) == ("running", "w2", 1)
+        assert job.heartbeat_at is not None
+
+    def test_claim_fails_exhausted_stale_jobs_with_a_terminal_event(self):
+        db = MagicMock()
+        db.execute.return_value.scalars.return_value.all.return_value = ["old"]
+        db.execute.return_value.scalar_one_or_none.return_value = None
+        jobs.claim_next("w1", db, stale_after_seconds=60, max_attempts=3)
+        stale_fail = db.execute.call_args_list[0].args[0]
+        assert "RETURNING" in str(stale_fail.compile(dialect=postgresql.dialect()))
+        [event] = [c.args[0] for c in db.add.call_args_list]
+        assert (event.job_id, event.payload["stage"]) == ("old", "error")
+
+    def test_progress_event_updates_stage(self):
+        db = _db_holding()
+        jobs.record_event("job1", "w1", SseProgressEvent(stage="llm_extraction", progress=50), db)
+        values = _update_values(db)
+        assert (values["stage"], values["progress"]) == ("llm_extraction", 50)
+        assert "status" not in values and "pdf_bytes" not in values
+        assert db.add.call_args.args[0].payload["stage"] == "llm_extraction"
+
+    def test_complete_event_stores_result(self):
+        db = _db_holding()
+        jobs.record_event("job1", "w1", SseCompleteEvent(data={"product_isin": "XS3184638594"}), db)
+        values = _update_values(db)
+        assert values["status"] == "succeeded"
+        assert values["result"] == {"product_isin": "XS3184638594"}
+        assert values["finished_at"] is not None
+        assert values["pdf_bytes"] is None  # the PDF is dropped once the job finishes
+
+    def test_error_event_fails_job(self):
+        db = _db_holding()
+        jobs.record_event("job1", "w1", SseErrorEvent(message="LLM extraction failed: boom"), db)
+        values = _update_values(db)
+        assert (values["status"], values["error_message"]) == ("failed", "LLM extraction failed: boom")
+
+    def test_writes_are_fenced_on_the_worker(self):
+        db = _db_holding()
+        jobs.heartbeat("job1", "w1", db)
+        where = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "ingestion_jobs.worker_id = " in where and "ingestion_jobs.status = " in where
+        assert _update_values(db)["worker_id_1"] == "w1"
+
+    def test_worker_that_lost_the_job_writes_nothing(self):
+        db = _db_holding(rows=0)
+        with pytest.raises(jobs.JobLost):
+            jobs.record_event("job1", "w1", SseProgressEvent(stage="llm_extraction", progress=50), db)
+        with pytest.raises(jobs.JobLost):
+            jobs.fail("job1", "w1", "worker crashed", db)
+        db.add.assert_not_called()
+
+    def test_fail_logs_a_terminal_event(self):
+        db = _db_holding()
+        jobs.fail("job1", "w1", "worker crashed", db)
+        assert _update_values(db)["status"] == "failed"
+        assert _update_values(db)["pdf_bytes"] is None
+        payload = db.add.call_args.args[0].payload
+        assert (payload["stage"], payload["message"]) == ("error", "worker crashed")
+
+    def test_enqueue_refuses_when_the_queue_is_full(self):
+        db = MagicMock()
+        db.execute.return_value.scalar_one.return_value = 3
+        with pytest.raises(jobs.JobQueueFull):
+            jobs.enqueue("ts.pdf", b"%PDF-1.7", db, max_queued=3)
+        db.add.assert_not_called()
+
+        db.execute.return_value.scalar_one.return_value = 2
+        assert jobs.enqueue("ts.pdf", b"%PDF-1.7", db, max_queued=3)
+        db.add.assert_called_once()
+
+    def test_sweep_deletes_only_jobs_finished_before_the_cutoff(self):
+        db = MagicMock()
+        db.execute.return_value.rowcount = 4
+        assert jobs.sweep_finished(db, retention_seconds=3600) == 4
+        statement = db.execute.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert sql.startswith("DELETE FROM ingestion_jobs")
+        assert "ingestion_jobs.status IN" in sql and "ingestion_jobs.finished_at <" in sql
+        params = statement.compile(dialect=postgresql.dialect()).params
+        assert set(params["status_1"]) == jobs.TERMINAL_JOB_STATUSES
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Worker heartbeat
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestWorker:
+    def test_reclaimed_job_is_cancelled_and_not_failed(self, monkeypatch):
+        recorded: list[str] = []
+
+        def run_events(contents, filename, cancel):
+            while not cancel.is_set():
+                yield SseProgressEvent(stage="llm_extraction", progress=50)
+                time.sleep(0.01)
+
+        def heartbeat(job_id, worker_id, db):
+            raise jobs.JobLost(job_id, worker_id)
+
+        monkeypatch.setattr(worker.settings, "JOB_HEARTBEAT_SECONDS", 0.02)
+        monkeypatch.setattr(worker, "session_scope", mock_session_scope(mock_db()))
+        monkeypatch.setattr(worker, "run_events", run_events)
+        monkeypatch.setattr(worker.jobs, "heartbeat", heartbeat)
+        monkeypatch.setattr(worker.jobs, "record_event", lambda job_id, worker_id, event, db: recorded.append(event.stage))
+        monkeypatch.setattr(worker.jobs, "fail", lambda *args: pytest.fail("a lost job must not be failed"))
+        claimed = SimpleNamespace(id="job1", filename="ts.pdf", pdf_bytes=b"%PDF-1.7")
+        monkeypatch.setattr(worker.jobs, "claim_next", lambda *args, **kwargs: claimed)
+
+        with pytest.raises(jobs.JobLost):
+            worker.run_job("job1", "w1", "ts.pdf", b"%PDF-1.7")
+        assert recorded  # ran until the heartbeat found the job gone
+        assert worker.process_next_job("w1") is True
+
+    def test_sweep_failure_does_not_stop_the_worker(self, monkeypatch):
+        def sweep(db, retention_seconds):
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(worker, "session_scope", mock_session_scope(mock_db()))
+        monkeypatch.setattr(worker.jobs, "sweep_finished", sweep)
+        worker.sweep_finished_jobs()
+
+    def test_heartbeat_runs_while_the_job_does(self, monkeypatch):
+        beats: list[str] = []
+
+        def run_events(contents, filename, cancel):
+            time.sleep(0.1)
+            yield SseCompleteEvent(data={"product_isin": "XS3184638594"})
+
+        monkeypatch.setattr(worker.settings, "JOB_HEARTBEAT_SECONDS", 0.02)
+        monkeypatch.setattr(worker, "session_scope", mock_session_scope(mock_db()))
+        monkeypatch.setattr(worker, "run_events", run_events)
+        monkeypatch.setattr(worker.jobs, "heartbeat", lambda job_id, worker_id, db: beats.append(worker_id))
+        monkeypatch.setattr(worker.jobs, "record_event", lambda *args: None)
+        worker.run_job("job1", "w1", "ts.pdf", b"%PDF-1.7")
+        assert len(beats) >= 2 and set(beats) == {"w1"}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SSE tailing
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+@pytest.fixture()
+def postgres_queue(monkeypatch):
+    """Serve job events from a scripted log instead of the database."""
+    log = [
+        (1, {"stage": "extracting_pdf", "progress": 15}),
+        (2, {"stage": "llm_extraction", "progress": 50}),
+        (3, {"stage": "error", "message": "boom"}),
+    ]
+    reads = iter([log[:2], [], log[2:]])  # the worker is still running on the second poll
+
+    monkeypatch.setattr(extraction.settings, "JOB_QUEUE_BACKEND", "postgres")
+    monkeypatch.setattr(extraction.settings, "JOB_POLL_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(extraction, "_job_status", lambda job_id: "running" if job_id == "job1" else None)
+    reads_after: list[int] = []
+
+    def events_after(job_id, after_id):
+        reads_after.append(after_id)
+        return next(reads), "running"
+
+    monkeypatch.setattr(extraction, "_job_events_after", events_after)
+    return reads_after
+
+
+class TestEventTailing:
+    def _get(self, path: str, **kwargs) -> httpx.Response:
+        app = FastAPI()
+        app.include_router(extraction_router, prefix="/api")
+
+        async def request():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get(path, **kwargs)
+
+        return asyncio.run(request())
+
+    def test_stream_relays_events_until_terminal(self, postgres_queue):
+        response = self._get("/api/extraction-stream/job1")
+        assert response.status_code == 200
+        stages = [line for line in response.text.splitlines() if line.startswith("data:")]
+        assert len(stages) == 3
+        assert '"stage": "error"' in stages[-1]
+
+    def test_events_carry_ids_and_reconnect_resumes_after_last_event_id(self, postgres_queue):
+        response = self._get("/api/extraction-stream/job1", headers={"Last-Event-ID": "1"})
+        ids = [line for line in response.text.splitlines() if line.startswith("id:")]
+        assert ids == ["id: 1", "id: 2", "id: 3"]  # the scripted log ignores after_id
+        assert postgres_queue[0] == 1
+
+    def test_idle_stream_sends_heartbeats(self, postgres_queue, monkeypatch):
+        monkeypatch.setattr(extraction.settings, "SSE_HEARTBEAT_SECONDS", 0.01)
+        monkeypatch.setattr(extraction.settings, "JOB_POLL_INTERVAL_SECONDS", 0.05)
+        response = self._get("/api/extraction-stream/job1")
+        assert ": keepalive" in response.text
+        assert '"stage": "error"' in response.text
+
+    def test_unknown_job_is_404(self, postgres_queue):
+        assert self._get("/api/extraction-stream/nope").status_code == 404
+
+
+class TestQueueLimit:
+    def test_full_postgres_queue_is_503(self, monkeypatch):
+        def enqueue(filename, contents):
+            raise jobs.JobQueueFull("3 jobs queued (limit 3)")
+
+        monkeypatch.setattr(extraction.settings, "JOB_QUEUE_BACKEND", "postgres")
+        monkeypatch.setattr(extraction, "_enqueue", enqueue)
+        app = FastAPI()
+        app.include_router(extraction_router, prefix="/api")
+
+        async def request():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(
+                    "/api/upload-termsheet-async", files={"file": ("ts.pdf", b"%PDF-1.7", "application/pdf")}
+                )
+
+        response = asyncio.run(request())
+        assert response.status_code == 503
+        assert response.json()["detail"] == "Too many pending uploads, try again later"
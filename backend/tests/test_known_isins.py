@@ -0,0 +1,83 @@
+"""Bloom filter and the known-ISIN filter built on it."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.pipeline import known_isins
+from utils.bloom import BloomFilter
+
+
+def _db_with(isins: list[str], during_read=None) -> MagicMock:
+    def rows():
+        for isin in isins:
+            if during_read is not None:
+                during_read()
+            yield isin
+
+    db = MagicMock()
+    db.execute.return_value.scalars.side_effect = rows
+    return db
+
+
+@pytest.fixture(autouse=True)
+def _cold_filter():
+    known_isins.reset()
+    yield
+    known_isins.reset()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BloomFilter
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000)
+        keys = [f"XS{i:010d}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        assert all(key in bloom for key in keys)
+        assert bloom.count == 1000
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        for i in range(2000):
+            bloom.add(f"XS{i:010d}")
+        false_positives = sum(f"US{i:010d}" in bloom for i in range(20_000))
+        assert false_positives / 20_000 < 0.03
+
+    def test_sizing(self):
+        bloom = BloomFilter(capacity=1_000_000, error_rate=0.01)
+        assert bloom.num_hashes == 7
+        assert 1.1e6 < bloom.size_bytes < 1.3e6  # ~9.6 bits per key
+
+    @pytest.mark.parametrize("capacity,error_rate", [(0, 0.01), (10, 0.0), (10, 1.0)])
+    def test_rejects_bad_parameters(self, capacity, error_rate):
+        with pytest.raises(ValueError):
+            BloomFilter(capacity, error_rate)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# known_isins
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestKnownIsins:
+    def test_cold_filter_reports_everything_as_possibly_known(self):
+        assert known_isins.might_exist("XS3184638594")
+        assert known_isins.stats()["warm"] is False
+
+    def test_warm_then_add(self):
+        assert known_isins.warm(_db_with(["XS3184638594"])) == 1
+        assert known_isins.might_exist("XS3184638594")
+        assert not known_isins.might_exist("US0378331005")
+        known_isins.add("US0378331005")
+        assert known_isins.might_exist("US0378331005")
+        assert known_isins.stats()["skipped_lookups"] == 1
+
+    def test_isins_persisted_during_warm_up_are_kept(self):
+        db = _db_with(["XS3184638594"], during_read=lambda: known_isins.add("GB0002634946"))
+        known_isins.warm(db)
+        assert known_isins.might_exist("GB0002634946")
@@ -0,0 +1,100 @@
+"""Metrics registry, text exposition format and the /metrics endpoint."""
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from core import metrics
+from core.metrics import HTTP_REQUEST_DURATION, Counter, Gauge, Histogram, HttpMetricsMiddleware
+from routes.metrics import router as metrics_router
+
+
+def _get(app: FastAPI, path: str) -> httpx.Response:
+    async def request():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+
+    return asyncio.run(request())
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Metric types
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestMetricTypes:
+    def test_histogram_samples_are_cumulative_with_inf_bucket(self):
+        h = Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+        h.observe(0.05, stage="parse")
+        h.observe(0.5, stage="parse")
+        h.observe(5.0, stage="parse")
+        assert h.samples() == [
+            't_seconds_bucket{stage="parse",le="0.1"} 1',
+            't_seconds_bucket{stage="parse",le="1"} 2',
+            't_seconds_bucket{stage="parse",le="+Inf"} 3',
+            't_seconds_sum{stage="parse"} 5.55',
+            't_seconds_count{stage="parse"} 3',
+        ]
+
+    def test_counter_adds_per_label_set(self):
+        c = Counter("t_total", "test", ("direction",))
+        c.inc(10, direction="input")
+        c.inc(5, direction="input")
+        c.inc(direction="output")
+        assert c.value(direction="input") == 15
+        assert c.samples() == ['t_total{direction="input"} 15', 't_total{direction="output"} 1']
+
+    def test_gauge_collect_runs_at_scrape_time(self):
+        depth = {"memory": 1}
+        g = Gauge("t_jobs", "test", ("storage",), collect=lambda: {(k,): v for k, v in depth.items()})
+        depth["memory"] = 3
+        assert g.samples() == ['t_jobs{storage="memory"} 3']
+
+    def test_label_values_are_escaped(self):
+        c = Counter("t_escaped_total", "test", ("name",))
+        c.inc(name='a "quoted"\\path\n')
+        assert c.samples() == ['t_escaped_total{name="a \\"quoted\\"\\\\path\\n"} 1']
+
+    def test_registry_returns_the_same_metric(self):
+        first = metrics.counter("t_registered_total", "test")
+        assert metrics.counter("t_registered_total", "other help") is first
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Endpoint and HTTP middleware
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestMetricsEndpoint:
+    def _app(self) -> FastAPI:
+        app = FastAPI()
+        app.add_middleware(HttpMetricsMiddleware)
+        app.include_router(metrics_router)
+
+        @app.get("/api/jobs/{job_id}")
+        async def job(job_id: str):
+            return {"job_id": job_id}
+
+        return app
+
+    def test_exposition_format(self):
+        metrics.counter("t_exposed_total", "Exposed in the scrape").inc(2)
+        response = _get(self._app(), "/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# HELP t_exposed_total Exposed in the scrape\n# TYPE t_exposed_total counter\nt_exposed_total 2\n" in response.text
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+    def test_http_latency_is_labelled_by_route_template(self):
+        def count(route: str, status: str) -> int:
+            return HTTP_REQUEST_DURATION.snapshot().get(("GET", route, status), {"count": 0})["count"]
+
+        before_ok, before_missing = count("/api/jobs/{job_id}", "200"), count("unmatched", "404")
+        app = self._app()
+        _get(app, "/api/jobs/abc")
+        _get(app, "/api/jobs/def")
+        _get(app, "/nowhere")
+        assert count("/api/jobs/{job_id}", "200") == before_ok + 2
+        assert count("unmatched", "404") == before_missing + 1
@@ -0,0 +1,162 @@
+"""Pipeline orchestration tests with the parse, LLM and blob steps stubbed (no DB, no LLM)."""
+
+import json
+import os
+import time
+
+import pytest
+
+from fastapi import HTTPException
+
+from tests.factories import make_product, make_termsheet, mock_db, mock_session_scope
+from services.pipeline import orchestrator
+from services.pipeline.dedupe import KnownDocument
+from services.pipeline.validate import ValidationIssue, ValidationResult
+
+SESSION = mock_db()
+
+
+@pytest.fixture()
+def pipeline(monkeypatch, tmp_path):
+    """Stub every step around the DB; record the order of LLM runs and session checkouts."""
+    timeline: list = []
+
+    def fake_extract(markdown_text):
+        timeline.append("llm")
+        return make_termsheet()
+
+    def fake_stream(markdown_text, cancel=None):
+        return fake_extract(markdown_text)
+        yield  # makes this a generator
+
+    monkeypatch.setattr(orchestrator.run_store.settings, "BLOBSTORE_PATH", str(tmp_path))
+    monkeypatch.setattr(orchestrator, "extract_markdown", lambda contents, filename: "# md")
+    monkeypatch.setattr(orchestrator, "save_markdown", lambda isin, filename, text: f"{isin}/{filename}.md")
+    monkeypatch.setattr(orchestrator, "stream_routed_extraction", fake_stream)
+    monkeypatch.setattr(orchestrator, "session_scope", mock_session_scope(SESSION, entered=timeline))
+    monkeypatch.setattr(orchestrator, "find_known_document", lambda sha, markdown, db: None)
+    return timeline
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Short-lived DB sessions
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestSessionScope:
+    def test_stream_opens_sessions_only_after_llm(self, pipeline):
+        events = list(orchestrator.stream(b"%PDF", "ts.pdf"))
+        assert '"stage": "complete"' in events[-1]
+        # the dedupe lookup, validate and persist each get their own short session;
+        # none is held during the LLM call
+        assert pipeline == [SESSION, "llm", SESSION, SESSION]
+
+    def test_run_sync_opens_sessions_only_after_llm(self, pipeline):
+        response = orchestrator.run_sync(b"%PDF", "ts.pdf")
+        assert response.product_isin == "XS3184638594"
+        assert pipeline == [SESSION, "llm", SESSION, SESSION]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Already-ingested documents
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _known(reason: str) -> KnownDocument:
+    issues = [] if reason == "content_hash" else [ValidationIssue(
+        field="product_isin", rule="duplicate_isin", message="exists", severity="error",
+    )]
+    return KnownDocument(reason=reason, data=make_termsheet(), approved=True, validation=ValidationResult(issues))
+
+
+class TestKnownDocuments:
+    def test_known_hash_returns_stored_result_without_llm(self, pipeline, monkeypatch):
+        monkeypatch.setattr(orchestrator, "find_known_document", lambda sha, markdown, db: _known("content_hash"))
+        response = orchestrator.run_sync(b"%PDF", "ts.pdf")
+        assert (response.status, response.approved) == ("already_extracted", True)
+        assert "llm" not in pipeline
+
+    def test_known_isin_streams_duplicate_without_llm(self, pipeline, monkeypatch):
+        monkeypatch.setattr(orchestrator, "find_known_document", lambda sha, markdown, db: _known("isin"))
+        events = list(orchestrator.stream(b"%PDF", "ts.pdf"))
+        assert '"stage": "validation_failed"' in events[-1]
+        assert "duplicate_isin" in events[-1]
+        assert "llm" not in pipeline
+
+    def test_known_isin_is_422_for_sync_upload(self, pipeline, monkeypatch):
+        monkeypatch.setattr(orchestrator, "find_known_document", lambda sha, markdown, db: _known("isin"))
+        with pytest.raises(HTTPException) as exc_info:
+            orchestrator.run_sync(b"%PDF", "ts.pdf")
+        assert exc_info.value.status_code == 422
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Checkpoints and resume
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _llm_returning(data):
+    def fake_stream(markdown_text, cancel=None):
+        return data
+        yield  # makes this a generator
+    return fake_stream
+
+
+class TestResume:
+    def test_validation_failure_can_be_resumed_without_llm(self, pipeline, monkeypatch):
+        bad = make_termsheet(product=make_product(product_isin="XS3184638595"))  # bad Luhn
+        monkeypatch.setattr(orchestrator, "stream_routed_extraction", _llm_returning(bad))
+        with pytest.raises(HTTPException) as exc_info:
+            orchestrator.run_sync(b"%PDF", "ts.pdf")
+        run_id = exc_info.value.detail["run_id"]
+        run = orchestrator.run_store.load_run(run_id)
+        assert run.status == "validation_failed"
+        assert orchestrator.run_store.load_markdown(run_id) == "# md"
+
+        monkeypatch.setattr(orchestrator, "stream_routed_extraction", lambda md, cancel=None: pytest.fail("LLM re-run"))
+        response = orchestrator.resume_run(run_id, make_termsheet())
+        assert (response.status, response.run_id) == ("extracted", run_id)
+        assert orchestrator.run_store.load_run(run_id).status == "persisted"
+
+    def test_resume_rejects_persisted_and_unknown_runs(self, pipeline):
+        events = list(orchestrator.stream(b"%PDF", "ts.pdf"))
+        run_id = json.loads(events[-1].removeprefix("data: "))["data"]["run_id"]
+        for bad_id, status in ((run_id, 409), ("0" * 32, 404), ("../etc", 404)):
+            with pytest.raises(HTTPException) as exc_info:
+                orchestrator.resume_run(bad_id, make_termsheet())
+            assert exc_info.value.status_code == status
+
+    def test_persisting_drops_the_checkpoints_but_keeps_the_manifest(self, pipeline, tmp_path):
+        events = list(orchestrator.stream(b"%PDF", "ts.pdf"))
+        run_id = json.loads(events[-1].removeprefix("data: "))["data"]["run_id"]
+        assert [p.name for p in (tmp_path / "runs" / run_id).iterdir()] == ["run.json"]
+        assert orchestrator.run_store.load_run(run_id).blob_path == "XS3184638594/ts.pdf.md"
+
+    def test_concurrent_resume_of_one_run_is_409(self, pipeline, monkeypatch):
+        bad = make_termsheet(product=make_product(product_isin="XS3184638595"))
+        monkeypatch.setattr(orchestrator, "stream_routed_extraction", _llm_returning(bad))
+        with pytest.raises(HTTPException) as exc_info:
+            orchestrator.run_sync(b"%PDF", "ts.pdf")
+        run_id = exc_info.value.detail["run_id"]
+
+        assert orchestrator.run_store.claim_run(run_id)  # another resume in flight
+        with pytest.raises(HTTPException) as exc_info:
+            orchestrator.resume_run(run_id, make_termsheet())
+        assert exc_info.value.status_code == 409
+        orchestrator.run_store.release_run(run_id)
+
+        assert orchestrator.resume_run(run_id, make_termsheet()).status == "extracted"
+        assert orchestrator.run_store.claim_run(run_id)  # released after the resume
+
+
+class TestRunStoreSweep:
+    def test_expired_runs_are_deleted(self, pipeline, monkeypatch, tmp_path):
+        run_store = orchestrator.run_store
+        old = run_store.create_run("old.pdf", 4, "a" * 64, "# old")
+        fresh = run_store.create_run("new.pdf", 4, "b" * 64, "# new")
+        stale = time.time() - run_store.settings.RUN_STORE_TTL_SECONDS - 60
+        os.utime(tmp_path / "runs" / old.run_id / "run.json", (stale, stale))
+
+        assert run_store.sweep_expired(force=True) == 1
+        assert run_store.load_run(old.run_id) is None
+        assert run_store.load_markdown(fresh.run_id) == "# new"
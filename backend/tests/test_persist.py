@@ -0,0 +1,50 @@
+"""Persisting an extraction: ORM product and metadata, bulk Core inserts for child rows."""
+
+from datetime import date, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from db.models.event import Event
+from db.models.extraction_metadata import ExtractionMetadata
+from db.models.product import Product
+from db.models.underlying import Underlying
+from services.pipeline.persist import persist_extraction
+from tests.factories import make_event, make_termsheet, make_underlying, mock_db
+
+
+class TestPersistExtraction:
+    def test_child_rows_are_one_insert_per_table(self):
+        db = mock_db()
+        data = make_termsheet(
+            underlyings=[make_underlying(), make_underlying(bbg_code="SX5E Index")],
+            events=[make_event(event_date=date(2026, 2, 2) + timedelta(days=k)) for k in range(500)],
+        )
+
+        product = persist_extraction(data, "ts.pdf", "XS/ts.md", "success", db, "0" * 64)
+
+        assert isinstance(product, Product)
+        assert [type(call.args[0]) for call in db.add.call_args_list] == [Product, ExtractionMetadata]
+        (underlyings, underlying_rows), (events, event_rows) = [call.args for call in db.execute.call_args_list]
+        assert underlyings.table is Underlying.__table__ and events.table is Event.__table__
+        assert str(events.compile(dialect=postgresql.dialect())).startswith("INSERT INTO events")
+        assert len(underlying_rows) == 2 and len(event_rows) == 500
+        assert event_rows[3] == {
+            "product_isin": data.product.product_isin,
+            "event_type": "coupon",
+            "event_level_pct": 75.0,
+            "event_strike_pct": None,
+            "event_date": date(2026, 2, 5),
+            "event_amount": 2.0375,
+            "event_payment_date": date(2026, 8, 4),
+        }
+
+    def test_parent_is_flushed_before_child_inserts(self):
+        db = mock_db()
+        persist_extraction(make_termsheet(), "ts.pdf", "XS/ts.md", "success", db)
+        calls = [name for name, *_ in db.mock_calls if name in ("add", "flush", "execute")]
+        assert calls == ["add", "flush", "execute", "execute", "add", "flush"]
+
+    def test_no_insert_without_events(self):
+        db = mock_db()
+        persist_extraction(make_termsheet(events=[]), "ts.pdf", "XS/ts.md", "success", db)
+        assert db.execute.call_count == 1  # underlyings only
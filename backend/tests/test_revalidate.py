@@ -0,0 +1,137 @@
+"""Product book revalidation: chunked reads, ordering, summary and the NDJSON endpoint."""
+
+import asyncio
+import json
+import threading
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import httpx
+from fastapi import FastAPI
+
+from routes import products as products_route
+from services.pipeline import revalidate
+from tests.factories import make_product, make_termsheet, mock_session_scope
+
+
+def _stored_product(isin: str, **overrides) -> SimpleNamespace:
+    defaults = dict(
+        product_isin=isin, sedol=None, short_description="Stored", issuer="BBVA",
+        issue_date=date(2026, 2, 2), currency="GBP", maturity=date(2032, 2, 2),
+        product_type=None, word_description=None,
+        underlyings=[SimpleNamespace(bbg_code="UKX Index", weight=None, initial_price=10148.85)],
+        events=[],
+    )
+    defaults.update(overrides)
+    return SimpleNamespace(**defaults)
+
+
+def _termsheet(isin: str, **product_overrides):
+    return make_termsheet(product=make_product(product_isin=isin, **product_overrides))
+
+
+def _fake_chunks(chunks):
+    def read_chunks(db, chunk_size):
+        yield from chunks
+
+    return read_chunks
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Reading the book
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestReadChunks:
+    def test_partitions_become_termsheets_and_session_is_cleared(self):
+        db = MagicMock()
+        db.scalars.return_value.partitions.return_value = iter([
+            [_stored_product("XS0000000017"), _stored_product("XS0000000025")],
+            [_stored_product("XS0000000033", currency=None)],
+        ])
+
+        chunks = list(revalidate.read_chunks(db, chunk_size=2))
+
+        [(first, no_failures), (empty, [failure])] = chunks
+        assert [ts.product.product_isin for ts in first] == ["XS0000000017", "XS0000000025"]
+        assert no_failures == [] and empty == []
+        assert failure.product_isin == "XS0000000033" and not failure.is_valid
+        assert failure.issues[0]["rule"] == "schema" and failure.issues[0]["field"] == "currency"
+        assert db.expunge_all.call_count == 2
+        statement = db.scalars.call_args.args[0]
+        assert statement.get_execution_options()["yield_per"] == 2
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Running a revalidation
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestRunRevalidation:
+    def _run(self, monkeypatch, chunks, **kwargs):
+        monkeypatch.setattr(revalidate, "session_scope", mock_session_scope())
+        monkeypatch.setattr(revalidate, "read_chunks", _fake_chunks(chunks))
+        return list(revalidate.run_revalidation(chunk_size=2, workers=1, **kwargs))
+
+    def test_only_products_with_issues_are_emitted_in_order_then_a_summary(self, monkeypatch):
+        schema_failure = revalidate.RevalidationRecord(
+            product_isin="XS0000000025", is_valid=False,
+            issues=[{"field": "currency", "rule": "schema", "message": "missing", "severity": "error"}],
+        )
+        chunks = [
+            ([_termsheet("XS0000000017"), _termsheet("XS0000000033", maturity=date(2020, 1, 1))], [schema_failure]),
+            ([_termsheet("BAD")], []),
+        ]
+
+        *records, summary = self._run(monkeypatch, chunks)
+
+        assert [r.product_isin for r in records] == ["XS0000000025", "XS0000000033", "BAD"]
+        assert summary.type == "summary"
+        assert summary.products == 4 and summary.invalid == 3 and not summary.cancelled
+        assert summary.by_rule["schema"] == 1
+        assert summary.by_rule["issue_before_maturity"] == 1
+        assert summary.by_rule["isin_format"] == 1
+        assert "duplicate_isin" not in summary.by_rule  # a stored product would match itself
+
+    def test_include_valid_emits_every_product(self, monkeypatch):
+        chunks = [([_termsheet("XS0000000017"), _termsheet("XS0000000025")], [])]
+        *records, summary = self._run(monkeypatch, chunks, include_valid=True)
+        assert [(r.product_isin, r.is_valid) for r in records] == [("XS0000000017", True), ("XS0000000025", True)]
+        assert summary.products == 2 and summary.invalid == 0
+
+    def test_cancel_stops_reading_and_marks_the_summary(self, monkeypatch):
+        cancel = threading.Event()
+        cancel.set()
+        [summary] = self._run(monkeypatch, [([_termsheet("XS0000000017")], [])], cancel=cancel)
+        assert summary.cancelled and summary.products == 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Endpoint
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestRevalidateEndpoint:
+    def test_streams_ndjson_records(self, monkeypatch):
+        seen = {}
+
+        def fake_run(cancel, include_valid):
+            seen["include_valid"] = include_valid
+            yield revalidate.RevalidationRecord(product_isin="XS0000000017", is_valid=True)
+            yield revalidate._Tally().summary(0.0, cancelled=False)
+
+        monkeypatch.setattr(products_route, "run_revalidation", fake_run)
+        app = FastAPI()
+        app.include_router(products_route.router, prefix="/api")
+
+        async def request():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/api/products/revalidate", params={"include_valid": "true"})
+
+        response = asyncio.run(request())
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["type"] for line in lines] == ["product", "summary"]
+        assert seen["include_valid"] is True
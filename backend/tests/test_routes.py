@@ -0,0 +1,246 @@
+"""API route tests against an app built from the routers (no DB, no LLM)."""
+
+import asyncio
+import hashlib
+import io
+import json
+import time
+import zipfile
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from routes import extraction
+from routes.extraction import router as extraction_router
+from routes.health import router as health_router
+from schemas.batch import BatchFileStatus, BatchSummary
+from schemas.product import ExtractionResponse, ValidationResultOut
+from utils import upload
+
+SLOW_EXTRACTION_SECONDS = 1.0
+
+
+@pytest.fixture()
+def app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(health_router, prefix="/api")
+    app.include_router(extraction_router, prefix="/api")
+    return app
+
+
+@pytest.fixture()
+def slow_pipeline(monkeypatch):
+    """Replace the sync pipeline with one that blocks like a long LLM call."""
+
+    def fake_run_sync(contents, filename, content_sha256=None):
+        time.sleep(SLOW_EXTRACTION_SECONDS)
+        return ExtractionResponse(
+            filename=filename,
+            size_bytes=len(contents),
+            status="extracted",
+            product_isin="XS3184638594",
+            approved=False,
+            data={},
+            validation=ValidationResultOut(is_valid=True, issues=[]),
+        )
+
+    monkeypatch.setattr(extraction, "run_sync", fake_run_sync)
+
+
+class TestSyncUploadDoesNotBlock:
+    def test_health_answers_during_slow_extraction(self, app, slow_pipeline):
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                upload = asyncio.create_task(client.post(
+                    "/api/upload-termsheet",
+                    files={"file": ("ts.pdf", b"%PDF-1.7 test", "application/pdf")},
+                ))
+                await asyncio.sleep(0.1)  # let the upload reach the pipeline
+
+                t0 = time.monotonic()
+                health = await client.get("/api/health")
+                health_latency = time.monotonic() - t0
+
+                assert not upload.done(), "extraction should still be running"
+                upload_response = await upload
+            return health, health_latency, upload_response
+
+        health, health_latency, upload_response = asyncio.run(scenario())
+        assert health.status_code == 200
+        assert health_latency < SLOW_EXTRACTION_SECONDS / 2
+        assert upload_response.status_code == 200
+        assert upload_response.json()["product_isin"] == "XS3184638594"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Streamed uploads
+# ═══════════════════════════════════════════════════════════════════════════════
+
+BOUNDARY = "testboundary"
+
+
+def _multipart_chunks(payload_chunks: list[bytes], sent: list[int]):
+    """Multipart body as an async stream; records how many payload chunks were consumed."""
+
+    async def body():
+        yield (
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="ts.pdf"\r\n'
+            "Content-Type: application/pdf\r\n\r\n"
+        ).encode()
+        for chunk in payload_chunks:
+            sent.append(len(chunk))
+            yield chunk
+        yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+    return body()
+
+
+class TestStreamedUpload:
+    def _post(self, app, **kwargs) -> httpx.Response:
+        async def request():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/api/upload-termsheet", **kwargs)
+
+        return asyncio.run(request())
+
+    def test_hash_is_passed_to_pipeline(self, app, monkeypatch):
+        seen = {}
+
+        def fake_run_sync(contents, filename, content_sha256=None):
+            seen["sha256"] = content_sha256
+            raise extraction.HTTPException(status_code=422, detail="stop")
+
+        monkeypatch.setattr(extraction, "run_sync", fake_run_sync)
+        payload = b"%PDF-1.7 " + b"x" * 100_000
+        self._post(app, files={"file": ("ts.pdf", payload, "application/pdf")})
+        assert seen["sha256"] == hashlib.sha256(payload).hexdigest()
+
+    def test_non_pdf_rejected_on_first_chunk(self, app, slow_pipeline):
+        sent: list[int] = []
+        response = self._post(
+            app,
+            content=_multipart_chunks([b"GIF89a"] + [b"x" * 1024] * 50, sent),
+            headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+        )
+        assert response.status_code == 400
+        assert len(sent) < 50
+
+    def test_oversize_rejected_while_streaming(self, app, slow_pipeline, monkeypatch):
+        monkeypatch.setattr(extraction.settings, "UPLOAD_MAX_BYTES", 4096)
+        sent: list[int] = []
+        response = self._post(
+            app,
+            content=_multipart_chunks([b"%PDF-1.7"] + [b"x" * 1024] * 50, sent),
+            headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+        )
+        assert response.status_code == 413
+        assert len(sent) < 50
+
+    def test_oversize_content_length_rejected_up_front(self, app, slow_pipeline, monkeypatch):
+        monkeypatch.setattr(extraction.settings, "UPLOAD_MAX_BYTES", 4096)
+        response = self._post(app, files={"file": ("ts.pdf", b"%PDF-1.7" + b"x" * 50_000, "application/pdf")})
+        assert response.status_code == 413
+
+    def test_wrong_content_type_rejected(self, app, slow_pipeline):
+        response = self._post(app, files={"file": ("ts.txt", b"%PDF-1.7", "text/plain")})
+        assert response.status_code == 400
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Batch uploads
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _zip(entries: dict[str, bytes], compression: int = zipfile.ZIP_STORED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+class TestBatchUpload:
+    @pytest.fixture()
+    def echo_batch(self, monkeypatch):
+        """Replace the batch runner with one that reports what it was given."""
+
+        def fake_run_batch(files, cancel=None):
+            for index, file in enumerate(files):
+                yield BatchFileStatus(
+                    index=index, filename=file.filename, size_bytes=file.size_bytes,
+                    status="rejected" if file.error else "extracted", error=file.error,
+                )
+            yield BatchSummary(
+                files=len(files), by_status={}, elapsed_seconds=0.0, files_per_second=0.0,
+                megabytes_per_second=0.0, stage_seconds={},
+            )
+
+        monkeypatch.setattr(extraction, "run_batch", fake_run_batch)
+
+    def _post(self, app, files, url="/api/upload-termsheets-batch") -> httpx.Response:
+        async def request():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(url, files=files)
+
+        return asyncio.run(request())
+
+    def test_pdfs_and_zip_entries_stream_as_ndjson(self, app, echo_batch):
+        archive = _zip({"a.pdf": b"%PDF-1.7 a", "dir/b.pdf": b"%PDF-1.7 b", "readme.txt": b"hi", "__MACOSX/._a.pdf": b""})
+        response = self._post(app, [
+            ("files", ("one.pdf", b"%PDF-1.7 one", "application/pdf")),
+            ("files", ("bundle.zip", archive, "application/zip")),
+        ])
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [(r["filename"], r["status"]) for r in records[:-1]] == [
+            ("one.pdf", "extracted"), ("a.pdf", "extracted"), ("b.pdf", "extracted"), ("readme.txt", "rejected"),
+        ]
+        assert records[-1]["type"] == "summary"
+
+    def test_sse_format(self, app, echo_batch):
+        response = self._post(
+            app, [("files", ("one.pdf", b"%PDF-1.7 one", "application/pdf"))],
+            url="/api/upload-termsheets-batch?format=sse",
+        )
+        assert response.text.startswith("data: ")
+
+    def test_non_pdf_part_and_corrupt_zip_rejected(self, app, echo_batch):
+        assert self._post(app, [("files", ("a.png", b"\x89PNG", "image/png"))]).status_code == 400
+        assert self._post(app, [("files", ("a.zip", b"PK\x03\x04junk", "application/zip"))]).status_code == 400
+
+    def test_file_count_limit(self, app, echo_batch, monkeypatch):
+        monkeypatch.setattr(extraction.settings, "BATCH_MAX_FILES", 2)
+        archive = _zip({f"{i}.pdf": b"%PDF-1.7" for i in range(3)})
+        assert self._post(app, [("files", ("a.zip", archive, "application/zip"))]).status_code == 413
+
+    def test_over_count_archive_is_rejected_before_extracting(self, app, echo_batch, monkeypatch):
+        monkeypatch.setattr(extraction.settings, "BATCH_MAX_FILES", 10)
+        monkeypatch.setattr(upload, "_extract_entry", lambda *args: pytest.fail("entry extracted"))
+        archive = _zip({f"{i}.pdf": b"%PDF-1.7" for i in range(11)})
+        response = self._post(app, [("files", ("a.zip", archive, "application/zip"))])
+        assert response.status_code == 413 and "file limit" in response.json()["detail"]
+
+    def test_archive_over_the_byte_limit_once_unzipped(self, app, echo_batch, monkeypatch):
+        monkeypatch.setattr(extraction.settings, "BATCH_MAX_BYTES", 1024 * 1024)
+        monkeypatch.setattr(upload, "_extract_entry", lambda *args: pytest.fail("entry extracted"))
+        bomb = {f"{i}.pdf": b"%PDF-" + bytes(400 * 1024) for i in range(3)}  # ~1.2 MB, compresses to a few KB
+        archive = _zip(bomb, zipfile.ZIP_DEFLATED)
+        assert len(archive) < 16 * 1024
+        response = self._post(app, [("files", ("bomb.zip", archive, "application/zip"))])
+        assert response.status_code == 413 and "once unzipped" in response.json()["detail"]
+
+    def test_extracted_bytes_are_counted_whatever_the_headers_say(self, monkeypatch):
+        monkeypatch.setattr(upload.settings, "BATCH_MAX_BYTES", 1024)
+        with zipfile.ZipFile(io.BytesIO(_zip({"a.pdf": b"%PDF-" + bytes(600)}))) as archive:
+            [info] = archive.infolist()
+            file, total = upload._extract_entry(archive, info, max_bytes=10_000, total=0)
+            assert file.size_bytes == 605 and total == 605 and file.read().startswith(b"%PDF-")
+            with pytest.raises(HTTPException) as exc:
+                upload._extract_entry(archive, info, max_bytes=10_000, total=500)  # as if the header said less
+            assert exc.value.status_code == 413
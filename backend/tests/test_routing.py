@@ -0,0 +1,118 @@
+"""Unit tests for fast/primary model routing (stubbed agent runs, no LLM)."""
+
+import pytest
+
+from tests.factories import make_product, make_termsheet
+from services.llm import AgentProgress
+from services.pipeline import orchestrator, routing
+from services.pipeline.routing import routing_stats, stream_routed_extraction
+
+
+@pytest.fixture(autouse=True)
+def _reset_stats(monkeypatch):
+    monkeypatch.setattr(routing, "_stats", {})
+    monkeypatch.setattr(routing, "_primary_runs", 0)
+    monkeypatch.setattr(routing, "_primary_seconds", 0.0)
+
+
+def _stub_agent(monkeypatch, results: dict):
+    """Make each model return (or raise) a scripted result; record which ran."""
+    calls = []
+
+    def fake_stream(markdown_text, model_name=None, cancel=None):
+        calls.append(model_name)
+        result = results[model_name]
+        if isinstance(result, Exception):
+            raise result
+        return result
+        yield  # makes this a generator
+
+    monkeypatch.setattr(routing, "stream_termsheet_extraction", fake_stream)
+    return calls
+
+
+def _route(markdown_text: str):
+    """Drive ``stream_routed_extraction`` as the LLM stage does; return the data and its progress."""
+    progress = []
+    stream = stream_routed_extraction(markdown_text)
+    while True:
+        try:
+            progress.append(next(stream))
+        except StopIteration as stop:
+            return stop.value, progress
+
+
+class TestRouting:
+    def test_disabled_uses_primary_only(self, monkeypatch):
+        monkeypatch.setattr(routing.settings, "LLM_FAST_MODEL", None)
+        calls = _stub_agent(monkeypatch, {None: make_termsheet()})
+        _route("md")
+        assert calls == [None]
+
+    def test_valid_fast_result_is_accepted(self, monkeypatch):
+        monkeypatch.setattr(routing.settings, "LLM_FAST_MODEL", "fast")
+        calls = _stub_agent(monkeypatch, {"fast": make_termsheet()})
+        data, progress = _route("md")
+        assert calls == ["fast"] and progress == []
+        assert data.product.product_isin == "XS3184638594"
+        assert routing_stats()["BBVA"]["escalations"] == 0
+
+    def test_invalid_fast_result_escalates(self, monkeypatch):
+        monkeypatch.setattr(routing.settings, "LLM_FAST_MODEL", "fast")
+        bad = make_termsheet(product=make_product(product_isin="XS3184638595"))  # bad Luhn
+        calls = _stub_agent(monkeypatch, {"fast": bad, None: make_termsheet()})
+        data, progress = _route("md")
+        assert calls == ["fast", None]
+        assert [p.phase for p in progress] == ["escalation"]
+        assert data.product.product_isin == "XS3184638594"
+        stats = routing_stats()["BBVA"]
+        assert stats["escalations"] == 1
+        assert stats["escalation_rate"] == 1.0
+
+    def test_parse_failure_escalates(self, monkeypatch):
+        monkeypatch.setattr(routing.settings, "LLM_FAST_MODEL", "fast")
+        calls = _stub_agent(monkeypatch, {"fast": ValueError("no structured output"), None: make_termsheet()})
+        _route("md")
+        assert calls == ["fast", None]
+
+    def test_escalation_check_runs_no_database_rules(self, monkeypatch):
+        monkeypatch.setattr(routing.settings, "LLM_FAST_MODEL", "fast")
+        checked = []
+        real_validate_many = routing.validate_many
+
+        def validate_many(items, db, include_db_rules=True):
+            checked.append((db, include_db_rules))
+            return real_validate_many(items, db, include_db_rules)
+
+        monkeypatch.setattr(routing, "validate_many", validate_many)
+        calls = _stub_agent(monkeypatch, {"fast": make_termsheet()})
+        _route("md")
+        assert calls == ["fast"]
+        assert checked == [(None, False)]  # the duplicate-ISIN query is left to the validation stage
+
+    def test_progress_stays_monotonic_across_an_escalation(self, monkeypatch):
+        monkeypatch.setattr(routing.settings, "LLM_FAST_MODEL", "fast")
+        bad = make_termsheet(product=make_product(product_isin="XS3184638595"))
+
+        def fake_stream(markdown_text, model_name=None, cancel=None):
+            for fraction in (0.2, 0.6):
+                yield AgentProgress(kind="tool_call", phase="search", fraction=fraction)
+            return bad if model_name == "fast" else make_termsheet()
+
+        monkeypatch.setattr(routing, "stream_termsheet_extraction", fake_stream)
+        _, progress = _route("md")
+        fractions = [p.fraction for p in progress]
+        assert [p.phase for p in progress][2] == "escalation"
+        assert fractions[2] == 0.6
+        assert fractions == sorted(fractions) and fractions[-1] <= 1.0
+
+    def test_llm_stage_streams_the_escalation(self, monkeypatch):
+        monkeypatch.setattr(routing.settings, "LLM_FAST_MODEL", "fast")
+        bad = make_termsheet(product=make_product(product_isin="XS3184638595"))
+        calls = _stub_agent(monkeypatch, {"fast": bad, None: make_termsheet()})
+        ctx = orchestrator.new_context(b"%PDF", "ts.pdf")
+        ctx.markdown_text = "md"
+        events = list(orchestrator.EXTRACT.run(ctx))
+        assert calls == ["fast", None]
+        assert [e.phase for e in events] == ["escalation"]
+        assert ctx.termsheet_data.product.product_isin == "XS3184638594"
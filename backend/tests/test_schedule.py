@@ -0,0 +1,144 @@
+"""Vectorized event-schedule rules: duplicates, order, payment lag, spacing and levels."""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+from services.pipeline import schedule
+from services.pipeline.validate import validate_termsheet
+from tests.factories import make_event, make_termsheet, mock_db
+
+
+def _quarterly(n: int, start: date = date(2026, 5, 4), **overrides) -> list:
+    return [
+        make_event(
+            event_date=start + timedelta(days=round(91.3 * k)),
+            event_payment_date=start + timedelta(days=round(91.3 * k) + 7),
+            **overrides,
+        )
+        for k in range(n)
+    ]
+
+
+def _daily(start: date, days: int) -> list:
+    """Weekday knock-in observations."""
+    dates = (start + timedelta(days=k) for k in range(days))
+    return [make_event(event_type="knock_in", event_level_pct=60.0, event_date=d) for d in dates if d.weekday() < 5]
+
+
+def _rules(ts) -> dict[str, list]:
+    rules: dict[str, list] = {}
+    for issue in validate_termsheet(ts, mock_db()).issues:
+        rules.setdefault(issue.rule, []).append(issue)
+    return rules
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Array conversion
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestEventArrays:
+    def test_columns_and_missing_values(self):
+        events = [make_event(event_level_pct=None, event_payment_date=None), make_event(event_type="strike")]
+        arrays = schedule.EventArrays.from_events(events)
+        assert arrays.dates.dtype == np.dtype("datetime64[D]")
+        assert np.isnat(arrays.payment_dates[0]) and np.isnan(arrays.levels[0])
+        assert arrays.of_type("strike").tolist() == [1] and arrays.of_type("knock_in").size == 0
+
+    def test_converted_once_per_schedule(self):
+        ts = make_termsheet(events=_quarterly(4))
+        assert schedule.event_arrays(ts) is schedule.event_arrays(ts)
+        assert schedule.event_arrays(make_termsheet(events=_quarterly(4))) is schedule.event_arrays(ts)
+        ts.events = _quarterly(5)
+        assert len(schedule.event_arrays(ts)) == 5
+
+    def test_edits_in_place_are_not_served_stale(self):
+        ts = make_termsheet(events=_quarterly(4))
+        assert schedule.event_arrays(ts).levels[2] == 75.0
+        ts.events[2].event_level_pct = 150.0  # same list, same length
+        assert schedule.event_arrays(ts).levels[2] == 150.0
+        ts.events[1] = make_event(event_type="strike", event_date=ts.events[1].event_date)
+        assert schedule.event_arrays(ts).of_type("strike").tolist() == [1]
+
+    def test_no_events(self):
+        assert _rules(make_termsheet(events=[])) == {}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Rules
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestScheduleRules:
+    def test_regular_quarterly_schedule_is_clean(self):
+        assert _rules(make_termsheet(events=_quarterly(8))) == {}
+
+    def test_duplicate_date_of_one_type_is_an_error(self):
+        events = _quarterly(4)
+        events.append(make_event(event_date=events[2].event_date))
+        events.append(make_event(event_type="auto_early_redemption", event_date=events[1].event_date))
+        [issue] = _rules(make_termsheet(events=events))["duplicate_dates"]
+        assert issue.severity == "error" and issue.field == "events[4].event_date"
+        assert "same date as events[2]" in issue.message
+
+    def test_duplicates_skip_the_spacing_check(self):
+        events = _quarterly(4)
+        events.append(make_event(event_date=events[0].event_date))
+        assert "schedule_spacing" not in _rules(make_termsheet(events=events))
+
+    def test_payment_before_observation_is_an_error(self):
+        events = _quarterly(3)
+        events[1] = make_event(event_date=events[1].event_date, event_payment_date=events[1].event_date - timedelta(days=1))
+        [issue] = _rules(make_termsheet(events=events))["payment_lag"]
+        assert issue.field == "events[1].event_payment_date" and issue.severity == "error"
+
+    def test_out_of_order_rows_are_a_warning(self):
+        events = _quarterly(4)
+        events[1], events[2] = events[2], events[1]
+        [issue] = _rules(make_termsheet(events=events))["schedule_order"]
+        assert issue.field == "events[2].event_date" and issue.severity == "warning"
+
+    def test_missing_coupon_rows_are_reported_with_a_count(self):
+        events = _quarterly(10)
+        del events[4:6]
+        [issue] = _rules(make_termsheet(events=events))["schedule_spacing"]
+        assert issue.field == "events[4].event_date"
+        assert "(quarterly); 2 coupon row(s) may be missing" in issue.message
+
+    def test_daily_schedule_allows_weekends_but_not_missing_weeks(self):
+        events = _daily(date(2026, 2, 2), 2000)
+        assert "schedule_spacing" not in _rules(make_termsheet(events=events))
+
+        gap = [e for e in events if not date(2027, 3, 1) <= e.event_date < date(2027, 3, 15)]
+        [issue] = _rules(make_termsheet(events=gap))["schedule_spacing"]
+        assert "(daily)" in issue.message and "2027-03-15" in issue.message
+
+    def test_knock_in_above_coupon_barrier(self):
+        events = [*_quarterly(3, event_level_pct=70.0), make_event(event_type="knock_in", event_level_pct=80.0)]
+        [issue] = _rules(make_termsheet(events=events))["level_consistency"]
+        assert issue.field == "events[3].event_level_pct" and "coupon barrier 70%" in issue.message
+
+    def test_coupon_barrier_above_same_day_autocall_trigger(self):
+        coupons = _quarterly(3, event_level_pct=75.0)
+        autocalls = [
+            make_event(event_type="auto_early_redemption", event_level_pct=level, event_date=c.event_date)
+            for c, level in zip(coupons, (100.0, 70.0, 90.0))
+        ]
+        [issue] = _rules(make_termsheet(events=[*coupons, *autocalls]))["level_consistency"]
+        assert issue.field == "events[1].event_level_pct" and "(events[4])" in issue.message
+
+    def test_findings_are_capped(self):
+        events = [make_event(event_type="coupon", event_level_pct=150.0) for _ in range(25)]
+        issues = list(schedule.barrier_range(make_termsheet(events=events)))
+        assert len(issues) == schedule.MAX_FINDINGS + 1
+        assert issues[-1] == ("events", "... and 15 more")
+
+
+class TestInferFrequency:
+    def test_snaps_to_nominal_frequency(self):
+        assert schedule.infer_frequency(np.array([91, 92, 90, 91])) == ("quarterly", 365.25 / 4)
+        assert schedule.infer_frequency(np.array([1, 1, 3, 1, 1]))[0] == "daily"
+
+    def test_unknown_frequency_uses_the_median(self):
+        assert schedule.infer_frequency(np.array([45, 45, 46])) == ("every ~45 days", 45.0)
@@ -0,0 +1,169 @@
+"""Span tracing: nesting, JSONL export, generator isolation, pipeline spans and the viewer."""
+
+import asyncio
+import logging
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from core import tracing
+from core.config import settings
+from schemas.sse import SseCompleteEvent, SseProgressEvent
+from scripts.trace_view import waterfall
+from services.pipeline.engine import PipelineContext, Stage, run_stages
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_PATH", str(tmp_path / "traces"))
+    return settings.TRACE_FILE
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Spans and export
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestSpans:
+    def test_nested_spans_share_the_trace_and_are_exported(self, trace_file):
+        with tracing.span("outer", filename="ts.pdf") as outer:
+            with tracing.span("inner") as inner:
+                assert tracing.current_span() is inner
+            assert tracing.current_span() is outer
+        assert tracing.current_span() is None
+
+        spans = tracing.read_spans(trace_file, outer.trace_id)
+        assert [s["name"] for s in spans] == ["inner", "outer"]  # exported as they end
+        assert spans[0]["parent_id"] == outer.span_id and spans[1]["parent_id"] is None
+        assert spans[1]["attributes"] == {"filename": "ts.pdf"}
+        assert all(s["duration"] >= 0 for s in spans)
+
+    def test_exception_marks_span_as_error(self, trace_file):
+        with pytest.raises(ValueError):
+            with tracing.span("failing") as failing:
+                raise ValueError("boom")
+        [exported] = tracing.read_spans(trace_file, failing.trace_id)
+        assert exported["status"] == "error"
+        assert exported["attributes"]["error"] == "ValueError: boom"
+
+    def test_export_rotates_and_keeps_a_bounded_number_of_files(self, trace_file, monkeypatch):
+        monkeypatch.setattr(settings, "TRACE_MAX_BYTES", 600)
+        monkeypatch.setattr(settings, "TRACE_BACKUP_COUNT", 2)
+        trace_ids = []
+        for i in range(30):
+            with tracing.span("work", index=i) as work:
+                trace_ids.append(work.trace_id)
+        traces = Path(trace_file).parent
+        assert sorted(p.name for p in traces.iterdir()) == ["spans.jsonl", "spans.jsonl.1", "spans.jsonl.2"]
+        assert all(p.stat().st_size <= 600 for p in traces.iterdir())
+
+        kept = tracing.read_spans(trace_file)  # oldest backup first, current file last
+        assert [s["attributes"]["index"] for s in kept] == list(range(30 - len(kept), 30))
+        assert tracing.read_spans(trace_file, trace_ids[-1])[0]["attributes"]["index"] == 29
+
+    def test_traced_records_keyword_arguments(self, trace_file):
+        @tracing.traced("tool.search", record_args=True)
+        def search(query: str) -> str:
+            return tracing.current_span().name
+
+        with tracing.span("step") as step:
+            assert search(query="x" * 500) == "tool.search"
+        [tool] = [s for s in tracing.read_spans(trace_file, step.trace_id) if s["name"] == "tool.search"]
+        assert tool["parent_id"] == step.span_id
+        assert len(tool["attributes"]["query"]) == tracing.MAX_ATTRIBUTE_CHARS
+
+    def test_nothing_is_written_without_trace_path(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "TRACE_PATH", None)
+        with tracing.span("unexported") as span:
+            pass
+        assert span.duration is not None
+        assert not any(tmp_path.iterdir())
+
+    def test_traced_steps_do_not_leak_the_span_to_the_consumer(self):
+        active = tracing.start_span("stage")
+
+        def stage():
+            yield tracing.current_span()
+            yield tracing.current_span()
+            return "done"
+
+        gen = tracing.traced_steps(stage(), active)
+        assert next(gen) is active
+        assert tracing.current_span() is None  # suspended: consumer's context is untouched
+        assert next(gen) is active
+        with pytest.raises(StopIteration) as stop:
+            next(gen)
+        assert stop.value.value == "done"
+
+    def test_log_records_carry_the_trace_id(self):
+        record = logging.LogRecord("t", logging.INFO, __file__, 1, "msg", None, None)
+        tracing.TraceIdFilter().filter(record)
+        assert record.trace_id == "-"
+        with tracing.span("request") as request:
+            tracing.TraceIdFilter().filter(record)
+        assert record.trace_id == request.trace_id
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Pipeline and HTTP spans
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestPipelineSpans:
+    def test_run_and_stage_spans_and_terminal_event_trace_id(self, trace_file):
+        def extract(ctx):
+            with tracing.span("tool.search"):
+                pass
+            yield SseProgressEvent(stage="t_extract", progress=50)
+            return SseCompleteEvent(data={})
+
+        ctx = PipelineContext(filename="ts.pdf", contents=b"%PDF", content_sha256="0" * 64)
+        events = list(run_stages(ctx, [Stage("t_parse", lambda ctx: None), Stage("t_extract", extract)]))
+        assert events[-1].trace_id == ctx.trace_id
+
+        spans = {s["name"]: s for s in tracing.read_spans(trace_file, ctx.trace_id)}
+        run = spans["pipeline.run"]
+        assert run["parent_id"] is None and run["attributes"]["outcome"] == "complete"
+        assert spans["stage.t_parse"]["parent_id"] == run["span_id"]
+        assert spans["tool.search"]["parent_id"] == spans["stage.t_extract"]["span_id"]
+
+    def test_request_span_and_trace_id_header(self, trace_file):
+        app = FastAPI()
+        app.add_middleware(tracing.TracingMiddleware)
+
+        @app.get("/api/jobs/{job_id}")
+        async def job(job_id: str):
+            return {"trace_id": tracing.current_trace_id()}
+
+        async def request():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/jobs/abc")
+
+        response = asyncio.run(request())
+        trace_id = response.headers["x-trace-id"]
+        assert response.json() == {"trace_id": trace_id}
+        [span] = tracing.read_spans(trace_file, trace_id)
+        assert span["name"] == "http GET /api/jobs/{job_id}"
+        assert span["attributes"]["status"] == 200
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Waterfall viewer
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestWaterfall:
+    def test_children_are_indented_and_placed_on_the_timeline(self):
+        spans = [
+            {"trace_id": "t", "span_id": "b", "parent_id": "a", "name": "stage.llm_extraction",
+             "start": 101.0, "duration": 3.0, "status": "error", "attributes": {}},
+            {"trace_id": "t", "span_id": "a", "parent_id": None, "name": "pipeline.run",
+             "start": 100.0, "duration": 4.0, "status": "ok", "attributes": {"filename": "ts.pdf"}},
+        ]
+        root, child = waterfall(spans, width=8)
+        assert root.startswith("  pipeline.run ts.pdf") and root.endswith("│████████│")
+        assert child.startswith("✗   stage.llm_extraction") and child.endswith("│  ██████│")
+        assert "1.00s" in child and "3.00s" in child
@@ -4,13 +4,22 @@ from datetime import date
 from unittest.mock import MagicMock
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
+from services.pipeline import known_isins
 from tests.factories import make_event, make_product, make_termsheet, make_underlying, mock_db
 from services.pipeline.validate import (
+    RULE_DURATION,
+    RULES,
+    BatchIsins,
+    Rule,
     ValidationResult,
     ValidationIssue,
     _check_isin_format,
     _check_isin_luhn,
+    _execution_order,
+    is_valid_isin,
+    validate_many,
     validate_termsheet,
 )
 
@@ -65,6 +74,11 @@ class TestISINLuhn:
         # Swap two adjacent digits — should break checksum
         assert not _check_isin_luhn("XS3184683594")
 
+    def test_public_check_needs_format_and_check_digit(self):
+        assert is_valid_isin("XS3184638594")
+        assert not is_valid_isin("XS3184638595")
+        assert not is_valid_isin("xs3184638594")  # lowercase is not an ISIN
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # validate_termsheet — full rule suite
@@ -187,6 +201,13 @@ class TestValidateTermsheet:
         result = validate_termsheet(make_termsheet(), mock_db(existing_product=None))
         assert "duplicate_isin" not in {i.rule for i in result.issues}
 
+    def test_duplicate_check_selects_only_the_key(self):
+        db = mock_db()
+        validate_termsheet(make_termsheet(), db)
+        db.query.assert_not_called()
+        sql = str(db.scalar.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "SELECT products.product_isin" in sql and "LIMIT" in sql
+
     # ── event_within_lifetime ─────────────────────────────────────────────
 
     def test_event_before_issue_is_warning(self):
@@ -284,3 +305,123 @@ class TestMultipleErrors:
         assert "min_underlyings" in error_rules
         assert "barrier_range" in error_rules
         assert not result.is_valid
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Rule registry and batch validation
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestRuleRegistry:
+    def test_pure_rules_run_before_db_rules(self):
+        order = _execution_order(RULES)
+        first_db = next(i for i, r in enumerate(order) if r.needs_db)
+        assert all(r.needs_db for r in order[first_db:])
+
+    def test_dependency_must_run_first(self):
+        rules = [Rule("b", "error", lambda d: iter(()), depends_on=("a",)), Rule("a", "error", lambda d: iter(()))]
+        with pytest.raises(ValueError, match="'b' depends on"):
+            _execution_order(rules)
+
+    def test_bad_checksum_skips_duplicate_query(self):
+        db = mock_db(existing_product=MagicMock())
+        result = validate_termsheet(make_termsheet(product=make_product(product_isin="XS3184638595")), db)
+        assert {i.rule for i in result.issues} == {"isin_luhn"}
+        db.scalar.assert_not_called()
+        assert "duplicate_isin" not in result.rule_seconds
+
+    def test_bad_dates_skip_lifetime_warnings(self):
+        ts = make_termsheet(
+            product=make_product(issue_date=date(2032, 2, 2), maturity=date(2026, 2, 2)),
+            events=[make_event(event_date=date(2029, 1, 1))],
+        )
+        rules = {i.rule for i in validate_termsheet(ts, mock_db()).issues}
+        assert "issue_before_maturity" in rules
+        assert "event_within_lifetime" not in rules
+
+    def test_each_rule_is_timed(self):
+        before = RULE_DURATION.snapshot().get(("isin_format",), {"count": 0})["count"]
+        result = validate_termsheet(make_termsheet(), mock_db())
+        assert set(result.rule_seconds) == {r.name for r in RULES}
+        assert RULE_DURATION.snapshot()[("isin_format",)]["count"] == before + 1
+
+    def test_validate_many_returns_one_result_per_item(self):
+        good = make_termsheet()
+        bad = make_termsheet(product=make_product(product_isin="BAD"), underlyings=[])
+        other = make_termsheet(product=make_product(product_isin="US0378331005"))
+        results = validate_many([good, bad, other], batch_db())
+        assert [r.is_valid for r in results] == [True, False, True]
+        assert {i.rule for i in results[1].issues} == {"isin_format", "min_underlyings"}
+        assert results[0].to_dict() == validate_termsheet(good, mock_db()).to_dict()
+
+
+def batch_db(existing: list[str] = ()) -> MagicMock:
+    """Mock session answering the set-based ISIN query with ``existing``."""
+    db = MagicMock()
+    db.scalars.return_value = list(existing)
+    return db
+
+
+class TestBatchDuplicateCheck:
+    def test_one_query_for_the_whole_batch(self):
+        isins = ["XS3184638594", "US0378331005", "GB0002634946"]
+        db = batch_db(existing=["US0378331005"])
+        results = validate_many([make_termsheet(product=make_product(product_isin=i)) for i in isins], db)
+        assert [r.is_valid for r in results] == [True, False, True]
+        assert "already exists" in results[1].issues[0].message
+        db.scalars.assert_called_once()
+        db.query.assert_not_called()
+
+        statement = db.scalars.call_args.args[0]
+        compiled = statement.compile(dialect=postgresql.dialect())
+        assert "= ANY (%(isins)s" in str(compiled)
+        assert compiled.params["isins"] == sorted(isins)
+
+    def test_repeats_within_the_batch_are_duplicates(self):
+        ts = make_termsheet()
+        results = validate_many([ts, ts, ts], batch_db())
+        assert [r.is_valid for r in results] == [True, False, False]
+        assert "more than once in this batch" in results[1].issues[0].message
+
+    def test_invalid_isins_are_not_queried(self):
+        db = batch_db()
+        validate_many([make_termsheet(product=make_product(product_isin="BAD"))], db)
+        db.scalars.assert_not_called()
+
+    def test_bloom_filter_skips_the_query_for_new_isins(self):
+        db = batch_db()
+        known_isins.warm(MagicMock(execute=MagicMock(return_value=MagicMock(scalars=lambda: ["GB0002634946"]))))
+        try:
+            validate_many([make_termsheet(product=make_product(product_isin="US0378331005"))], db)
+            db.scalars.assert_not_called()
+            assert "duplicate_isin" not in {i.rule for i in validate_termsheet(make_termsheet(), db).issues}
+            db.scalar.assert_not_called()
+
+            validate_many([make_termsheet(product=make_product(product_isin="GB0002634946"))], db)
+            assert db.scalars.call_args.args[0].compile(dialect=postgresql.dialect()).params["isins"] == [
+                "GB0002634946"
+            ]
+        finally:
+            known_isins.reset()
+
+
+class TestBatchIsins:
+    def test_isins_extracted_so_far_are_looked_up_together(self):
+        batch, db = BatchIsins(), batch_db(existing=["US0378331005"])
+        batch.expect("XS3184638594")
+        batch.expect("US0378331005")
+        assert validate_termsheet(make_termsheet(), db, batch=batch).is_valid
+        stored = validate_termsheet(make_termsheet(product=make_product(product_isin="US0378331005")), db, batch=batch)
+        assert "already exists" in stored.issues[0].message
+        db.scalars.assert_called_once()
+        assert db.scalars.call_args.args[0].compile(dialect=postgresql.dialect()).params["isins"] == [
+            "US0378331005", "XS3184638594"
+        ]
+        db.scalar.assert_not_called()
+
+    def test_second_file_with_an_isin_is_a_repeat(self):
+        batch, db = BatchIsins(), batch_db()
+        assert validate_termsheet(make_termsheet(), db, batch=batch).is_valid
+        repeat = validate_termsheet(make_termsheet(), db, batch=batch)
+        assert [i.rule for i in repeat.issues] == ["duplicate_isin"]
+        assert "more than once in this batch" in repeat.issues[0].message
@@ -0,0 +1,201 @@
+"""Replay buffer for the SSE streams of in-process jobs (JOB_QUEUE_BACKEND=memory).
+
+The pipeline for an async upload runs in the background and appends its events
+here under increasing ids. SSE connections read from the buffer, so a client
+that reconnects (EventSource does on proxy timeouts) resumes from its
+``Last-Event-ID`` instead of orphaning the run. A run is cancelled only when no
+client has been connected for ``SSE_DISCONNECT_GRACE_SECONDS``; finished
+streams stay replayable for ``SSE_REPLAY_TTL_SECONDS``.
+
+``subscribe`` / ``notify`` wake connected streams as soon as events arrive; the
+Postgres job queue's LISTEN/NOTIFY listener notifies through them too.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ── Wake-ups ──────────────────────────────────────────────────────────────────
+
+
+class Subscription:
+    """Wakes one async SSE connection when ``notify(key)`` is called from any thread."""
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        with _waiters_lock:
+            _waiters.setdefault(key, set()).add(self)
+
+    def clear(self) -> None:
+        """Forget earlier wake-ups; call before reading new events."""
+        self._event.clear()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a wake-up; False if ``timeout`` passed without one."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def close(self) -> None:
+        with _waiters_lock:
+            waiters = _waiters.get(self.key)
+            if waiters is not None:
+                waiters.discard(self)
+                if not waiters:
+                    del _waiters[self.key]
+
+    def _wake(self) -> None:
+        self._loop.call_soon_threadsafe(self._event.set)
+
+
+_waiters_lock = threading.Lock()
+_waiters: dict[str, set[Subscription]] = {}
+
+
+def subscribe(key: str) -> Subscription:
+    return Subscription(key)
+
+
+def notify(key: str) -> None:
+    """Wake every connection subscribed to ``key``; safe to call from any thread."""
+    with _waiters_lock:
+        waiters = list(_waiters.get(key, ()))
+    for waiter in waiters:
+        try:
+            waiter._wake()
+        except RuntimeError:
+            pass  # its event loop has closed
+
+
+# ── In-memory replay buffer ───────────────────────────────────────────────────
+
+
+@dataclass
+class _Stream:
+    cancel: threading.Event
+    events: list[dict[str, Any]] = field(default_factory=list)  # event id = index + 1
+    finished_at: float | None = None
+    clients: int = 0
+    idle_since: float = field(default_factory=time.monotonic)
+
+
+_lock = threading.Lock()
+_streams: dict[str, _Stream] = {}
+# Held while a stream is opened and its run started, never inside ``_lock``
+_open_lock = threading.Lock()
+
+
+def _evict_expired() -> None:
+    """Drop finished streams past their TTL (called with ``_lock`` held)."""
+    cutoff = time.monotonic() - settings.SSE_REPLAY_TTL_SECONDS
+    for job_id in [j for j, s in _streams.items() if s.finished_at is not None and s.finished_at < cutoff]:
+        del _streams[job_id]
+
+
+def open_stream(job_id: str, cancel: threading.Event) -> None:
+    """Start buffering a job's events; ``cancel`` is set if every client leaves for good."""
+    with _lock:
+        _evict_expired()
+        _streams[job_id] = _Stream(cancel=cancel)
+
+
+def get_or_open(job_id: str, start: Callable[[threading.Event], bool]) -> bool:
+    """Open a job's stream and start its run as one step, unless the stream is already open.
+
+    Concurrent first connections to a job call ``start`` once; the others
+    wait for it and then find the stream open. ``start(cancel)`` starts the
+    run and returns False if there is nothing to run; the stream is closed
+    again then, or if ``start`` raises. Returns whether the stream is open.
+    """
+    with _open_lock:
+        if exists(job_id):
+            return True
+        cancel = threading.Event()
+        open_stream(job_id, cancel)
+        started = False
+        try:
+            started = start(cancel)
+        finally:
+            if not started:
+                with _lock:
+                    _streams.pop(job_id, None)
+        return started
+
+
+def exists(job_id: str) -> bool:
+    with _lock:
+        _evict_expired()
+        return job_id in _streams
+
+
+def append(job_id: str, payload: dict[str, Any]) -> int:
+    """Buffer an event and wake its readers; returns the event id."""
+    with _lock:
+        stream = _streams[job_id]
+        stream.events.append(payload)
+        event_id = len(stream.events)
+    notify(job_id)
+    return event_id
+
+
+def finish(job_id: str) -> None:
+    """Mark the stream complete; readers stop once they have replayed everything."""
+    with _lock:
+        stream = _streams.get(job_id)
+        if stream is not None:
+            stream.finished_at = time.monotonic()
+    notify(job_id)
+
+
+def events_after(job_id: str, after_id: int) -> tuple[list[tuple[int, dict[str, Any]]], bool] | None:
+    """Events with ids above ``after_id`` and whether the stream is finished; None if unknown."""
+    with _lock:
+        stream = _streams.get(job_id)
+        if stream is None:
+            return None
+        events = list(enumerate(stream.events[after_id:], start=after_id + 1))
+        return events, stream.finished_at is not None
+
+
+def attach(job_id: str) -> None:
+    """Count a connected client."""
+    with _lock:
+        stream = _streams.get(job_id)
+        if stream is not None:
+            stream.clients += 1
+
+
+def detach(job_id: str) -> None:
+    """Count a client leaving; cancel the run if nobody reconnects within the grace period."""
+    with _lock:
+        stream = _streams.get(job_id)
+        if stream is None:
+            return
+        stream.clients -= 1
+        if stream.clients > 0 or stream.finished_at is not None:
+            return
+        stream.idle_since = idle_since = time.monotonic()
+
+    def cancel_if_still_idle() -> None:
+        with _lock:
+            if stream.clients == 0 and stream.finished_at is None and stream.idle_since == idle_since:
+                logger.info(f"No client reconnected to job {job_id}; cancelling the run")
+                stream.cancel.set()
+
+    timer = threading.Timer(settings.SSE_DISCONNECT_GRACE_SECONDS, cancel_if_still_idle)
+    timer.daemon = True
+    timer.start()
@@ -1,23 +1,139 @@
-"""In-memory job store for async upload → SSE extraction flow."""
+"""In-memory job store for async upload → SSE extraction flow.
+
+Bounded so abandoned uploads can't grow the process without limit: jobs
+expire after ``JOB_STORE_TTL_SECONDS``, the total bytes held (in memory and
+spilled) are capped at ``JOB_STORE_MAX_BYTES``, and payloads larger than
+``JOB_STORE_SPILL_BYTES`` are written to a temp directory instead of memory.
+Expired jobs are evicted lazily on every store operation.
+"""
 
 from __future__ import annotations
 
+import logging
+import os
+import tempfile
+import time
 import uuid
+from dataclasses import dataclass
 from threading import Lock
 
+from core.config import settings
+from core.metrics import gauge
+
+logger = logging.getLogger(__name__)
+
+
+class JobStoreFull(Exception):
+    """Raised when accepting a job would exceed the store's byte budget."""
+
+
+@dataclass
+class _Job:
+    filename: str
+    size: int
+    created_at: float
+    sha256: str | None = None
+    data: bytes | None = None  # None when spilled to ``path``
+    path: str | None = None
+
+
 _lock = Lock()
-_jobs: dict[str, tuple[str, bytes]] = {}
+_jobs: dict[str, _Job] = {}
+_spill_dir: str | None = None
+_expired_total = 0
+_rejected_total = 0
+
+
+def _spill(job_id: str, pdf_bytes: bytes) -> str:
+    global _spill_dir
+    if _spill_dir is None:
+        _spill_dir = tempfile.mkdtemp(prefix="job-store-")
+    path = os.path.join(_spill_dir, f"{job_id}.pdf")
+    with open(path, "wb") as f:
+        f.write(pdf_bytes)
+    return path
+
 
+def _discard(job: _Job) -> None:
+    if job.path is not None:
+        try:
+            os.remove(job.path)
+        except FileNotFoundError:
+            pass
 
-def create_job(filename: str, pdf_bytes: bytes) -> str:
-    """Store a PDF and return a unique job ID."""
+
+def _evict_expired(now: float) -> None:
+    """Drop jobs older than the TTL. Caller holds ``_lock``."""
+    global _expired_total
+    expired = [job_id for job_id, job in _jobs.items() if now - job.created_at > settings.JOB_STORE_TTL_SECONDS]
+    for job_id in expired:
+        job = _jobs.pop(job_id)
+        _discard(job)
+        logger.info(f"Evicted expired job {job_id} ({job.filename}, {job.size} bytes)")
+    _expired_total += len(expired)
+
+
+def create_job(filename: str, pdf_bytes: bytes, sha256: str | None = None) -> str:
+    """Store a PDF and return a unique job ID.
+
+    Raises:
+        JobStoreFull: If the store's byte budget can't fit the payload.
+    """
+    global _rejected_total
     job_id = uuid.uuid4().hex
+    size = len(pdf_bytes)
     with _lock:
-        _jobs[job_id] = (filename, pdf_bytes)
+        now = time.monotonic()
+        _evict_expired(now)
+        held = sum(job.size for job in _jobs.values())
+        if held + size > settings.JOB_STORE_MAX_BYTES:
+            _rejected_total += 1
+            raise JobStoreFull(f"Job store full ({held} of {settings.JOB_STORE_MAX_BYTES} bytes held)")
+        if size > settings.JOB_STORE_SPILL_BYTES:
+            _jobs[job_id] = _Job(filename, size, now, sha256, path=_spill(job_id, pdf_bytes))
+        else:
+            _jobs[job_id] = _Job(filename, size, now, sha256, data=pdf_bytes)
     return job_id
 
 
-def pop_job(job_id: str) -> tuple[str, bytes] | None:
-    """Remove and return the job data, or None if not found."""
+def pop_job(job_id: str) -> tuple[str, bytes, str | None] | None:
+    """Remove and return (filename, PDF bytes, SHA-256), or None if not found or expired."""
     with _lock:
-        return _jobs.pop(job_id, None)
+        _evict_expired(time.monotonic())
+        job = _jobs.pop(job_id, None)
+    if job is None:
+        return None
+    if job.data is not None:
+        return job.filename, job.data, job.sha256
+    with open(job.path, "rb") as f:
+        data = f.read()
+    _discard(job)
+    return job.filename, data, job.sha256
+
+
+def stats() -> dict:
+    """Counts and bytes held, split into in-memory and spilled payloads."""
+    with _lock:
+        _evict_expired(time.monotonic())
+        in_memory = [job.size for job in _jobs.values() if job.data is not None]
+        spilled = [job.size for job in _jobs.values() if job.data is None]
+        return {
+            "jobs": len(_jobs),
+            "bytes_held": sum(in_memory) + sum(spilled),
+            "max_bytes": settings.JOB_STORE_MAX_BYTES,
+            "in_memory_jobs": len(in_memory),
+            "in_memory_bytes": sum(in_memory),
+            "spilled_jobs": len(spilled),
+            "spilled_bytes": sum(spilled),
+            "expired_total": _expired_total,
+            "rejected_total": _rejected_total,
+        }
+
+
+def _by_storage(kind: str) -> dict[tuple[str, ...], int]:
+    current = stats()
+    return {("memory",): current[f"in_memory_{kind}"], ("spilled",): current[f"spilled_{kind}"]}
+
+
+gauge("job_store_jobs", "Jobs waiting in the in-memory job store", ("storage",), collect=lambda: _by_storage("jobs"))
+gauge("job_store_bytes", "PDF bytes held by the in-memory job store", ("storage",), collect=lambda: _by_storage("bytes"))
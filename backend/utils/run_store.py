@@ -0,0 +1,164 @@
+"""Local filesystem store for pipeline run checkpoints.
+
+Each run gets a directory <BLOBSTORE_PATH>/runs/<run_id>/ holding the parsed
+markdown, the LLM output and the validation result as they are produced, plus
+a run.json manifest. A validation-failed run can then be resumed with
+corrected data without re-running parsing or the LLM.
+
+Once a run is persisted its checkpoints are deleted and only the manifest is
+kept, so a second resume is refused. Run directories untouched for
+``RUN_STORE_TTL_SECONDS`` are swept when new runs are created. A resume
+claims its run with an O_EXCL lock file, so two resumes of one run can't
+both persist it.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from core.config import settings
+from schemas.termsheet import TermsheetData
+
+logger = logging.getLogger(__name__)
+
+# Minimum time between sweeps of expired run directories
+_SWEEP_INTERVAL_SECONDS = 3600
+_CHECKPOINT_FILES = ("markdown.md", "llm_output.json", "validation.json")
+_CLAIM_FILE = "resume.lock"
+
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+@dataclass
+class RunManifest:
+    run_id: str
+    filename: str
+    size_bytes: int
+    content_sha256: str
+    status: str  # parsed | extracted | validation_failed | persisted
+    blob_path: str | None = None
+
+
+def _runs_root() -> Path:
+    return Path(settings.BLOBSTORE_PATH) / "runs"
+
+
+def _run_dir(run_id: str) -> Path:
+    # run ids are uuid hex; reject anything else so a path can't escape the store
+    if not run_id.isalnum():
+        raise ValueError(f"Invalid run id: {run_id!r}")
+    return _runs_root() / run_id
+
+
+def _write_json(path: Path, payload: Any) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def create_run(filename: str, size_bytes: int, content_sha256: str, markdown: str) -> RunManifest:
+    """Start a run: checkpoint the parsed markdown and return the manifest."""
+    sweep_expired()
+    manifest = RunManifest(
+        run_id=uuid.uuid4().hex,
+        filename=filename,
+        size_bytes=size_bytes,
+        content_sha256=content_sha256,
+        status="parsed",
+    )
+    run_dir = _run_dir(manifest.run_id)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "markdown.md").write_text(markdown, encoding="utf-8")
+    _write_json(run_dir / "run.json", asdict(manifest))
+    return manifest
+
+
+def markdown_blob_path(run_id: str) -> str:
+    """The run's markdown checkpoint as a path relative to BLOBSTORE_PATH."""
+    return f"runs/{_run_dir(run_id).name}/markdown.md"
+
+
+def update_run(manifest: RunManifest) -> None:
+    _write_json(_run_dir(manifest.run_id) / "run.json", asdict(manifest))
+
+
+def save_llm_output(run_id: str, data: TermsheetData) -> None:
+    _write_json(_run_dir(run_id) / "llm_output.json", data.model_dump(mode="json"))
+
+
+def save_validation(run_id: str, validation: dict) -> None:
+    _write_json(_run_dir(run_id) / "validation.json", validation)
+
+
+def load_run(run_id: str) -> RunManifest | None:
+    """Read a run's manifest, or None if there is no such run."""
+    try:
+        path = _run_dir(run_id) / "run.json"
+    except ValueError:
+        return None
+    if not path.exists():
+        return None
+    return RunManifest(**json.loads(path.read_text(encoding="utf-8")))
+
+
+def load_markdown(run_id: str) -> str:
+    return (_run_dir(run_id) / "markdown.md").read_text(encoding="utf-8")
+
+
+def discard_checkpoints(run_id: str) -> None:
+    """Delete a run's checkpoints, keeping the manifest (called once it is persisted)."""
+    run_dir = _run_dir(run_id)
+    for name in _CHECKPOINT_FILES:
+        (run_dir / name).unlink(missing_ok=True)
+
+
+def claim_run(run_id: str) -> bool:
+    """Take the run's resume lock; False if another resume holds it."""
+    try:
+        fd = os.open(_run_dir(run_id) / _CLAIM_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    return True
+
+
+def release_run(run_id: str) -> None:
+    (_run_dir(run_id) / _CLAIM_FILE).unlink(missing_ok=True)
+
+
+def sweep_expired(force: bool = False) -> int:
+    """Delete run directories whose manifest is older than ``RUN_STORE_TTL_SECONDS``.
+
+    Runs at most once per ``_SWEEP_INTERVAL_SECONDS`` unless ``force``.
+    Returns the number of runs deleted.
+    """
+    global _last_sweep
+    now = time.time()
+    with _sweep_lock:
+        if not force and now - _last_sweep < _SWEEP_INTERVAL_SECONDS:
+            return 0
+        _last_sweep = now
+    root = _runs_root()
+    if not root.is_dir():
+        return 0
+    deleted = 0
+    cutoff = now - settings.RUN_STORE_TTL_SECONDS
+    for run_dir in root.iterdir():
+        try:
+            expired = (run_dir / "run.json").stat().st_mtime < cutoff
+        except FileNotFoundError:
+            expired = run_dir.stat().st_mtime < cutoff  # never got a manifest
+        if expired:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            deleted += 1
+    if deleted:
+        logger.info(f"Swept {deleted} expired pipeline runs")
+    return deleted
@@ -0,0 +1,33 @@
+"""Relaying sync generators to streaming responses."""
+
+import threading
+from typing import AsyncGenerator, Iterator
+
+import anyio
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+
+def _drain(events: Iterator[str]) -> None:
+    for _ in events:
+        pass
+
+
+async def cancel_on_disconnect(
+    events: Iterator[str], cancel: threading.Event
+) -> AsyncGenerator[str, None]:
+    """Relay a sync SSE (or NDJSON) generator; if the client goes away, cancel the run.
+
+    On disconnect the pipeline is signalled via ``cancel`` and then drained in
+    a worker thread so it can stop at the next agent turn, record the
+    cancellation and release its resources before the request finishes.
+    """
+    finished = False
+    try:
+        async for event in iterate_in_threadpool(events):
+            yield event
+        finished = True
+    finally:
+        if not finished:
+            cancel.set()
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(_drain, events)
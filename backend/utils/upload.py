@@ -0,0 +1,431 @@
+"""Streamed, size-capped PDF (and batch) uploads.
+
+Reads the multipart request body chunk by chunk instead of letting the framework
+buffer the whole upload first: the ``file`` part is sniffed for the PDF magic
+bytes as soon as they arrive, written to a spooled temp file, hashed
+incrementally, and the request is aborted as soon as it exceeds
+``UPLOAD_MAX_BYTES``.
+
+Batch uploads take any number of ``files`` parts, each a PDF or a zip of PDFs,
+under an overall ``BATCH_MAX_BYTES`` cap. The cap (and ``BATCH_MAX_FILES``)
+also applies to the unzipped batch: entry counts and declared sizes are
+checked before anything is extracted, and the bytes actually extracted are
+counted too, since zip headers can lie. Every file stays spooled (on disk
+above 1 MB) until it runs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import tempfile
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import IO, Any
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.metrics import SIZE_BUCKETS, histogram
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+
+# Allowance for multipart boundaries and part headers in the Content-Length precheck
+_MULTIPART_OVERHEAD = 16 * 1024
+
+UPLOAD_SIZE = histogram("upload_size_bytes", "Size of each accepted uploaded PDF", ("endpoint",), SIZE_BUCKETS)
+
+# Uploads up to this size stay in memory; larger ones roll over to disk
+_SPOOL_MEMORY_BYTES = 1024 * 1024
+# Zip entries are extracted this much at a time
+_ZIP_READ_CHUNK = 64 * 1024
+
+# OpenAPI request body for endpoints that take a PDF via receive_pdf_upload()
+PDF_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                },
+            },
+        },
+    },
+}
+
+# OpenAPI request body for the batch endpoint (receive_batch_upload())
+BATCH_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+                    "required": ["files"],
+                },
+            },
+        },
+    },
+}
+
+
+@dataclass
+class PdfUpload:
+    """A received PDF: spooled contents plus its size and SHA-256."""
+
+    filename: str
+    file: IO[bytes]
+    size_bytes: int
+    sha256: str
+
+    def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+@dataclass
+class BatchFile:
+    """One file of a batch upload, or the reason it was rejected.
+
+    Uploaded files are kept in ``spool`` and read only when they run; files
+    built in memory (the ingester, tests) pass ``contents`` instead.
+    """
+
+    filename: str
+    contents: bytes = b""
+    sha256: str = ""
+    error: str | None = None
+    spool: IO[bytes] | None = None
+    size_bytes: int = 0
+
+    def __post_init__(self) -> None:
+        if self.spool is None:
+            self.size_bytes = len(self.contents)
+
+    def read(self) -> bytes:
+        if self.spool is None:
+            return self.contents
+        self.spool.seek(0)
+        return self.spool.read()
+
+    def close(self) -> None:
+        if self.spool is not None:
+            self.spool.close()
+
+
+@dataclass
+class _FilePart:
+    """Parser state for one file form field while the body streams in."""
+
+    max_bytes: int
+    magic: bytes = PDF_MAGIC
+    reject_detail: str = "Only PDF files are accepted"
+    filename: str | None = None
+    content_type: str | None = None
+    size: int = 0
+    head: bytes = b""
+    hasher: Any = field(default_factory=hashlib.sha256)
+    spool: IO[bytes] = field(default_factory=lambda: tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES))
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"File exceeds the {self.max_bytes} byte upload limit")
+        if len(self.head) < len(self.magic):
+            self.head += chunk[: len(self.magic) - len(self.head)]
+            if not self.magic.startswith(self.head):
+                raise HTTPException(status_code=400, detail=self.reject_detail)
+        self.hasher.update(chunk)
+        self.spool.write(chunk)
+
+    def check_complete(self) -> None:
+        if self.size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+        if self.head != self.magic:
+            raise HTTPException(status_code=400, detail=self.reject_detail)
+
+
+async def _receive_file_parts(
+    request: Request,
+    field_name: str,
+    accept: dict[str, tuple[bytes, int]],
+    max_parts: int,
+    max_total_bytes: int,
+    reject_detail: str,
+) -> list[_FilePart]:
+    """Stream the ``field_name`` parts of a multipart request into spooled temp files.
+
+    ``accept`` maps each allowed part content type to its magic bytes and size
+    limit. With ``max_parts=1`` further parts are ignored; otherwise they are
+    rejected with 413. On error every spooled part is closed.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    content_length = request.headers.get("content-length")
+    if (
+        content_length
+        and content_length.isdigit()
+        and int(content_length) > max_total_bytes + _MULTIPART_OVERHEAD * max_parts
+    ):
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_total_bytes} byte limit")
+
+    parts: list[_FilePart] = []
+    current: _FilePart | None = None
+    total = 0
+    headers: dict[bytes, bytes] = {}
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_part_begin() -> None:
+        headers.clear()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header_value.extend(data[start:end])
+
+    def on_header_end() -> None:
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished() -> None:
+        nonlocal current
+        current = None
+        _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+        if disposition.get(b"name") != field_name.encode():
+            return
+        if len(parts) == max_parts:
+            if max_parts == 1:
+                return
+            raise HTTPException(status_code=413, detail=f"Batch exceeds the {max_parts} file limit")
+        part_type = headers.get(b"content-type", b"").decode("latin-1")
+        if part_type not in accept:
+            raise HTTPException(status_code=400, detail=reject_detail)
+        magic, max_bytes = accept[part_type]
+        filename = disposition.get(b"filename")
+        current = _FilePart(
+            max_bytes=max_bytes,
+            magic=magic,
+            reject_detail=reject_detail,
+            filename=filename.decode("utf-8", "replace") if filename else None,
+            content_type=part_type,
+        )
+        parts.append(current)
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        nonlocal total
+        if current is None:
+            return
+        total += end - start
+        if total > max_total_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_total_bytes} byte limit")
+        current.write(data[start:end])
+
+    parser = MultipartParser(boundary, callbacks={
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+        if not parts:
+            raise HTTPException(status_code=422, detail=f"Missing '{field_name}' form field")
+        for part in parts:
+            part.check_complete()
+    except BaseException:
+        for part in parts:
+            part.spool.close()
+        raise
+    return parts
+
+
+async def receive_pdf_upload(request: Request, max_bytes: int | None = None) -> PdfUpload:
+    """Stream the ``file`` field of a multipart request into a spooled temp file.
+
+    Raises:
+        HTTPException: 400 for a non-PDF or empty file, 413 if the body is over
+            the size limit (checked against Content-Length up front, then as
+            chunks arrive), 422 if there is no ``file`` field.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    [part] = await _receive_file_parts(
+        request,
+        "file",
+        accept={"application/pdf": (PDF_MAGIC, max_bytes)},
+        max_parts=1,
+        max_total_bytes=max_bytes,
+        reject_detail="Only PDF files are accepted",
+    )
+    UPLOAD_SIZE.observe(part.size, endpoint="single")
+    return PdfUpload(
+        filename=part.filename or "termsheet.pdf",
+        file=part.spool,
+        size_bytes=part.size,
+        sha256=part.hasher.hexdigest(),
+    )
+
+
+def _new_spool() -> IO[bytes]:
+    return tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES)
+
+
+def _over_file_limit() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Batch exceeds the {settings.BATCH_MAX_FILES} file limit")
+
+
+def _over_byte_limit() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Batch exceeds the {settings.BATCH_MAX_BYTES} byte limit once unzipped")
+
+
+def _extract_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int, total: int) -> tuple[BatchFile, int]:
+    """Spool one PDF entry, counting the bytes actually extracted against both caps.
+
+    Returns the file (rejected if over ``max_bytes`` or not a PDF) and the
+    batch's new byte total.
+    """
+    name = PurePosixPath(info.filename).name
+    spool, size, hasher = _new_spool(), 0, hashlib.sha256()
+    try:
+        with archive.open(info) as entry:
+            while chunk := entry.read(_ZIP_READ_CHUNK):
+                size += len(chunk)
+                total += len(chunk)
+                if size > max_bytes:
+                    spool.close()
+                    return BatchFile(name, error=f"File exceeds the {max_bytes} byte upload limit"), total
+                if total > settings.BATCH_MAX_BYTES:
+                    raise _over_byte_limit()
+                hasher.update(chunk)
+                spool.write(chunk)
+        spool.seek(0)
+        if spool.read(len(PDF_MAGIC)) != PDF_MAGIC:
+            spool.close()
+            return BatchFile(name, error="Not a PDF"), total
+    except BaseException:
+        spool.close()
+        raise
+    return BatchFile(name, sha256=hasher.hexdigest(), spool=spool, size_bytes=size), total
+
+
+def _expand_zip(part: _FilePart, max_bytes: int, files: list[BatchFile], total: int) -> int:
+    """Append the PDFs in a zip archive to ``files`` (other entries as rejected).
+
+    Returns the batch's byte total including the extracted entries.
+
+    Raises:
+        HTTPException: 400 for a corrupt archive, 413 if its entries would take
+            the batch over ``BATCH_MAX_FILES`` or ``BATCH_MAX_BYTES``.
+    """
+    try:
+        archive = zipfile.ZipFile(part.spool)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"'{part.filename}' is not a valid zip archive")
+    with archive:
+        entries = [
+            info for info in archive.infolist()
+            if not (info.is_dir() or info.filename.startswith("__MACOSX/") or PurePosixPath(info.filename).name.startswith("."))
+        ]
+        # Reject before extracting anything, on the declared counts and sizes
+        if len(files) + len(entries) > settings.BATCH_MAX_FILES:
+            raise _over_file_limit()
+        declared = sum(
+            info.file_size for info in entries
+            if info.filename.lower().endswith(".pdf") and info.file_size <= max_bytes
+        )
+        if total + declared > settings.BATCH_MAX_BYTES:
+            raise _over_byte_limit()
+
+        for info in entries:
+            name = PurePosixPath(info.filename).name
+            if not name.lower().endswith(".pdf"):
+                files.append(BatchFile(name, error="Not a PDF"))
+            elif info.file_size > max_bytes:
+                files.append(BatchFile(name, error=f"File exceeds the {max_bytes} byte upload limit"))
+            else:
+                try:
+                    file, total = _extract_entry(archive, info, max_bytes, total)
+                except (zipfile.BadZipFile, zlib.error, EOFError):
+                    raise HTTPException(status_code=400, detail=f"'{part.filename}' is not a valid zip archive")
+                files.append(file)
+    return total
+
+
+def _batch_files(parts: list[_FilePart]) -> list[BatchFile]:
+    files: list[BatchFile] = []
+    total = 0
+    try:
+        for part in parts:
+            if part.magic == ZIP_MAGIC:
+                total = _expand_zip(part, settings.UPLOAD_MAX_BYTES, files, total)
+                part.spool.close()
+            else:
+                total += part.size
+                files.append(BatchFile(
+                    part.filename or "termsheet.pdf", sha256=part.hasher.hexdigest(),
+                    spool=part.spool, size_bytes=part.size,
+                ))
+                if total > settings.BATCH_MAX_BYTES:
+                    raise _over_byte_limit()
+        if len(files) > settings.BATCH_MAX_FILES:
+            raise _over_file_limit()
+    except BaseException:
+        for part in parts:
+            part.spool.close()
+        for file in files:
+            file.close()
+        raise
+    for file in files:
+        if file.error is None:
+            UPLOAD_SIZE.observe(file.size_bytes, endpoint="batch")
+    return files
+
+
+async def receive_batch_upload(request: Request) -> list[BatchFile]:
+    """Stream the ``files`` fields (PDFs and/or zips of PDFs) of a multipart request.
+
+    Each PDF is capped at ``UPLOAD_MAX_BYTES`` and the whole body, before and
+    after unzipping, at ``BATCH_MAX_BYTES``. Zip entries that aren't PDFs (or
+    are over the per-file cap) are returned with an ``error`` rather than
+    failing the batch. The caller owns the returned files' spools.
+
+    Raises:
+        HTTPException: 400 for a part that isn't a PDF or zip, or a corrupt zip,
+            413 over the size or ``BATCH_MAX_FILES`` limit, 422 if there are no
+            ``files`` fields.
+    """
+    pdf = (PDF_MAGIC, settings.UPLOAD_MAX_BYTES)
+    zip_ = (ZIP_MAGIC, settings.BATCH_MAX_BYTES)
+    parts = await _receive_file_parts(
+        request,
+        "files",
+        accept={"application/pdf": pdf, "application/zip": zip_, "application/x-zip-compressed": zip_},
+        max_parts=settings.BATCH_MAX_FILES,
+        max_total_bytes=settings.BATCH_MAX_BYTES,
+        reject_detail="Only PDF or zip files are accepted",
+    )
+    return await run_in_threadpool(_batch_files, parts)
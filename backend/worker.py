@@ -0,0 +1,130 @@
+"""Ingestion worker: claims queued jobs from Postgres and runs the extraction pipeline.
+
+Used with JOB_QUEUE_BACKEND=postgres. Workers scale independently of the API:
+run as many processes as the LLM provider's rate limits allow, e.g.
+
+    poetry run python worker.py
+    docker compose up --scale worker=4
+
+SIGTERM/SIGINT stop the worker after the job in hand has finished. Between
+jobs, a worker deletes jobs finished over ``JOB_RETENTION_SECONDS`` ago
+(at most once per ``SWEEP_INTERVAL_SECONDS``). While a
+job runs, a heartbeat thread bumps it every ``JOB_HEARTBEAT_SECONDS``; if the
+job turns out to have been reclaimed by another worker (``jobs.JobLost``), the
+run is cancelled and nothing more is written for it.
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from core.config import settings
+from core.log import setup_logging
+from db.db import session_scope, test_database_connection
+from services import jobs
+from services.pipeline import run_events
+
+logger = logging.getLogger(__name__)
+
+# Minimum time between sweeps of finished jobs, per worker
+SWEEP_INTERVAL_SECONDS = 3600
+
+
+def _heartbeat(job_id: str, worker_id: str, done: threading.Event, lost: threading.Event) -> None:
+    """Bump the job's heartbeat until ``done``; sets ``lost`` if the job was reclaimed."""
+    while not done.wait(settings.JOB_HEARTBEAT_SECONDS):
+        try:
+            with session_scope() as db:
+                jobs.heartbeat(job_id, worker_id, db)
+        except jobs.JobLost as exc:
+            logger.warning(f"{exc}; cancelling the run")
+            lost.set()
+            return
+        except Exception as exc:
+            logger.warning(f"Heartbeat for job {job_id} failed: {exc}")
+
+
+def run_job(job_id: str, worker_id: str, filename: str, contents: bytes) -> None:
+    """Run the pipeline for one claimed job, logging every event to the database.
+
+    Raises:
+        jobs.JobLost: the job was reclaimed by another worker mid-run.
+    """
+    done, lost = threading.Event(), threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job_id, worker_id, done, lost), daemon=True)
+    beat.start()
+    try:
+        for event in run_events(contents, filename, cancel=lost):
+            with session_scope() as db:
+                jobs.record_event(job_id, worker_id, event, db)
+    finally:
+        done.set()
+        beat.join()
+    if lost.is_set():
+        raise jobs.JobLost(job_id, worker_id)
+
+
+def process_next_job(worker_id: str) -> bool:
+    """Claim and run one job. Returns False if the queue was empty."""
+    with session_scope() as db:
+        job = jobs.claim_next(
+            worker_id, db,
+            stale_after_seconds=settings.JOB_STALE_AFTER_SECONDS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+        )
+        if job is None:
+            return False
+        job_id, filename, contents = job.id, job.filename, job.pdf_bytes
+
+    logger.info(f"Worker {worker_id} running job {job_id} ({filename}, {len(contents)} bytes)")
+    try:
+        run_job(job_id, worker_id, filename, contents)
+    except jobs.JobLost as exc:
+        logger.warning(f"Stopped job {job_id}: {exc}")
+    except Exception as exc:
+        logger.exception(f"Job {job_id} crashed: {exc}")
+        try:
+            with session_scope() as db:
+                jobs.fail(job_id, worker_id, str(exc), db)
+        except jobs.JobLost as lost:
+            logger.warning(f"Not failing job {job_id}: {lost}")
+    return True
+
+
+def sweep_finished_jobs() -> None:
+    """Delete finished jobs past their retention; errors are logged, not raised."""
+    try:
+        with session_scope() as db:
+            deleted = jobs.sweep_finished(db, settings.JOB_RETENTION_SECONDS)
+    except Exception as exc:
+        logger.warning(f"Sweeping finished jobs failed: {exc}")
+        return
+    if deleted:
+        logger.info(f"Deleted {deleted} finished jobs")
+
+
+def main() -> None:
+    setup_logging()
+    test_database_connection()
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    logger.info(f"Ingestion worker {worker_id} started")
+    last_sweep = float("-inf")
+    while not stop.is_set():
+        if time.monotonic() - last_sweep >= SWEEP_INTERVAL_SECONDS:
+            sweep_finished_jobs()
+            last_sweep = time.monotonic()
+        if not process_next_job(worker_id):
+            stop.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+    logger.info(f"Ingestion worker {worker_id} stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,12 +21,14 @@ interface ProcessingStagesProps {
   currentStage: Stage
   progress: number
   filename: string
+  activity?: string
 }
 
 export default function ProcessingStages({
   currentStage,
   progress,
   filename,
+  activity,
 }: ProcessingStagesProps) {
   const currentIndex = STAGES.findIndex((s) => s.key === currentStage)
 
@@ -62,6 +64,9 @@ export default function ProcessingStages({
                 >
                   {stage.label}
                 </span>
+                {isCurrent && activity && (
+                  <span className="text-xs text-muted-foreground truncate">{activity}</span>
+                )}
               </div>
             )
           })}
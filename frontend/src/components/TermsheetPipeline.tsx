@@ -52,6 +52,7 @@ export default function TermsheetPipeline({ onComplete }: TermsheetPipelineProps
           currentStage={state.stage}
           progress={state.progress}
           filename={state.filename}
+          activity={state.activity}
         />
       )
 
@@ -1,5 +1,5 @@
 import { useCallback, useReducer, useRef } from 'react'
-import type { ExtractionResponse, SseEvent } from '@/types/extraction'
+import type { ExtractionResponse, SseAgentProgressEvent, SseEvent, SseQueuedEvent } from '@/types/extraction'
 import { approveProduct, connectExtractionStream, uploadTermsheetAsync } from '@/lib/api'
 
 // ── State ──────────────────────────────────────────────
@@ -26,6 +26,7 @@ interface ProcessingState {
   filename: string
   stage: Stage
   progress: number
+  activity?: string
 }
 
 interface ReviewState {
@@ -58,7 +59,7 @@ type Action =
   | { type: 'START_UPLOAD'; filename: string }
   | { type: 'UPLOAD_PROGRESS'; percent: number }
   | { type: 'UPLOAD_DONE' }
-  | { type: 'SSE_PROGRESS'; stage: Stage; progress: number }
+  | { type: 'SSE_PROGRESS'; stage: Stage; progress: number; activity?: string }
   | { type: 'SSE_COMPLETE'; data: ExtractionResponse }
   | { type: 'SSE_VALIDATION_FAILED'; data: ExtractionResponse }
   | { type: 'APPROVE_START' }
@@ -80,7 +81,7 @@ function reducer(_state: PipelineState, action: Action): PipelineState {
       return { phase: 'processing', filename: _state.filename, stage: 'extracting_pdf', progress: 0 }
     case 'SSE_PROGRESS':
       if (_state.phase !== 'processing') return _state
-      return { ..._state, stage: action.stage, progress: action.progress }
+      return { ..._state, stage: action.stage, progress: action.progress, activity: action.activity }
     case 'SSE_COMPLETE':
       return { phase: 'review', extraction: action.data, approving: false }
     case 'SSE_VALIDATION_FAILED':
@@ -98,6 +99,18 @@ function reducer(_state: PipelineState, action: Action): PipelineState {
   }
 }
 
+function describeAgentProgress(event: SseAgentProgressEvent): string {
+  if (event.kind === 'phase') return `Phase: ${event.phase}`
+  return event.query ? `${event.tool}: ${event.query}` : `${event.tool}`
+}
+
+function describeQueuePosition(event: SseQueuedEvent): string {
+  const wait = event.estimated_wait_seconds
+  return wait === null
+    ? `Queued (position ${event.position})`
+    : `Queued (position ${event.position}, ~${Math.ceil(wait)}s)`
+}
+
 // ── Hook ───────────────────────────────────────────────
 
 export function useExtractionPipeline() {
@@ -118,9 +131,24 @@ export function useExtractionPipeline() {
           job.job_id,
           (event: SseEvent) => {
             switch (event.stage) {
+              case 'queued':
+                dispatch({
+                  type: 'SSE_PROGRESS',
+                  stage: 'extracting_pdf',
+                  progress: 0,
+                  activity: describeQueuePosition(event),
+                })
+                break
+              case 'llm_extraction':
+                dispatch({
+                  type: 'SSE_PROGRESS',
+                  stage: event.stage,
+                  progress: event.progress,
+                  activity: 'kind' in event ? describeAgentProgress(event) : undefined,
+                })
+                break
               case 'extracting_pdf':
               case 'saving_blob':
-              case 'llm_extraction':
               case 'validation':
               case 'persisting':
                 dispatch({ type: 'SSE_PROGRESS', stage: event.stage, progress: event.progress })
@@ -41,9 +41,15 @@ export function uploadTermsheetAsync(
   })
 }
 
+const TERMINAL_STAGES = new Set(['complete', 'validation_failed', 'error'])
+const MAX_STREAM_RECONNECTS = 5
+
 /**
  * Connect to the SSE extraction stream.
  * Calls onEvent for each SSE message. Returns an abort function.
+ *
+ * If the connection drops before a terminal event (e.g. a proxy timeout), it
+ * reconnects with Last-Event-ID and the server replays what was missed.
  */
 export function connectExtractionStream(
   jobId: string,
@@ -51,47 +57,70 @@ export function connectExtractionStream(
   onError: (error: Error) => void,
 ): () => void {
   const controller = new AbortController()
+  let lastEventId: string | null = null
+  let finished = false
 
-  fetch(`${API_URL}/extraction-stream/${jobId}`, {
-    signal: controller.signal,
-  })
-    .then(async (response) => {
-      if (!response.ok) {
-        const body = await response.json().catch(() => null)
-        throw new Error(body?.detail ?? `Stream failed (${response.status})`)
-      }
-
-      const reader = response.body!.getReader()
-      const decoder = new TextDecoder()
-      let buffer = ''
-
-      while (true) {
-        const { done, value } = await reader.read()
-        if (done) break
-
-        buffer += decoder.decode(value, { stream: true })
-
-        // Parse SSE lines: "data: {...}\n\n"
-        const parts = buffer.split('\n\n')
-        buffer = parts.pop() ?? ''
-
-        for (const part of parts) {
-          const line = part.trim()
-          if (line.startsWith('data: ')) {
-            const json = line.slice(6)
+  const readStream = async () => {
+    const response = await fetch(`${API_URL}/extraction-stream/${jobId}`, {
+      signal: controller.signal,
+      headers: lastEventId ? { 'Last-Event-ID': lastEventId } : undefined,
+    })
+    if (!response.ok) {
+      const body = await response.json().catch(() => null)
+      throw new Error(body?.detail ?? `Stream failed (${response.status})`)
+    }
+
+    const reader = response.body!.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+
+      buffer += decoder.decode(value, { stream: true })
+
+      // Parse SSE messages: "id: 3\ndata: {...}\n\n"; ": keepalive" comments are skipped
+      const parts = buffer.split('\n\n')
+      buffer = parts.pop() ?? ''
+
+      for (const part of parts) {
+        for (const line of part.split('\n')) {
+          if (line.startsWith('id: ')) {
+            lastEventId = line.slice(4).trim()
+          } else if (line.startsWith('data: ')) {
             try {
-              onEvent(JSON.parse(json) as SseEvent)
+              const event = JSON.parse(line.slice(6)) as SseEvent
+              if (TERMINAL_STAGES.has(event.stage)) finished = true
+              onEvent(event)
             } catch {
               // skip malformed events
             }
           }
         }
       }
-    })
-    .catch((err: unknown) => {
-      if (err instanceof Error && err.name === 'AbortError') return
-      onError(err instanceof Error ? err : new Error(String(err)))
-    })
+    }
+  }
+
+  const run = async () => {
+    for (let attempt = 0; ; attempt++) {
+      try {
+        await readStream()
+        if (finished) return
+        if (attempt >= MAX_STREAM_RECONNECTS) throw new Error('Stream ended before extraction finished')
+      } catch (err: unknown) {
+        if (err instanceof Error && err.name === 'AbortError') return
+        // HTTP errors (e.g. 404 for an expired job) are not retried
+        if (attempt >= MAX_STREAM_RECONNECTS || !(err instanceof TypeError)) {
+          onError(err instanceof Error ? err : new Error(String(err)))
+          return
+        }
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt))
+    }
+  }
+
+  run()
 
   return () => controller.abort()
 }
@@ -82,6 +82,10 @@ export interface ExtractionResponse {
   approved: boolean
   data: TermsheetData
   validation: ValidationResult
+  /** Checkpointed run; POST corrected data to /runs/{run_id}/resume */
+  run_id?: string | null
+  /** Trace of the run; render with backend/scripts/trace_view.py */
+  trace_id?: string | null
 }
 
 export interface JobCreatedResponse {
@@ -96,25 +100,46 @@ export type SseProgressEvent = {
   progress: number
 }
 
+export type SseQueuedEvent = {
+  stage: 'queued'
+  progress: 0
+  position: number
+  estimated_wait_seconds: number | null
+}
+
+export type SseAgentProgressEvent = {
+  stage: 'llm_extraction'
+  progress: number
+  kind: 'tool_call' | 'phase'
+  phase: string
+  tool: string | null
+  query: string | null
+}
+
 export type SseCompleteEvent = {
   stage: 'complete'
   progress: 100
   data: ExtractionResponse
+  trace_id?: string | null
 }
 
 export type SseValidationFailedEvent = {
   stage: 'validation_failed'
   progress: 100
   data: ExtractionResponse
+  trace_id?: string | null
 }
 
 export type SseErrorEvent = {
   stage: 'error'
   message: string
+  trace_id?: string | null
 }
 
 export type SseEvent =
   | SseProgressEvent
+  | SseQueuedEvent
+  | SseAgentProgressEvent
   | SseCompleteEvent
   | SseValidationFailedEvent
   | SseErrorEvent